@@ -0,0 +1,33 @@
+"""
+Compare forecast parser backends using the test fixtures.
+
+Usage: python -m benchmarks.parse_forecast [repeat]
+"""
+import sys
+import timeit
+
+import test.test_data as test_data
+from fmi_weather_client.parsers.forecast import parse_forecast, parse_forecast_xmltodict
+
+BACKENDS = {
+    'stream': parse_forecast,
+    'xmltodict': parse_forecast_xmltodict,
+}
+
+
+def run(repeat: int = 500):
+    print(f"{'fixture':45} {'backend':10} {'us/parse':>10} {'speedup':>8}")
+    for filename in test_data.FORECAST_FILES:
+        body = test_data.read_file(filename)
+        results = {}
+        for name, parser in BACKENDS.items():
+            best = min(timeit.repeat(lambda: parser(body), number=repeat, repeat=5))
+            results[name] = best / repeat * 1e6
+
+        for name, micros in results.items():
+            speedup = results['xmltodict'] / micros
+            print(f"{filename:45} {name:10} {micros:10.1f} {speedup:7.2f}x")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,58 @@
+"""
+Local HTTP server answering every request with a fixed response body.
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubServer:
+    """
+    Serve a fixed body on localhost in a background thread.
+
+    Usage:
+        with StubServer(body) as server:
+            client = FMIClient(url=server.url)
+    """
+
+    def __init__(self, body: str, status: int = 200):
+        """
+        :param body: Response body of every request
+        :param status: Response status of every request
+        """
+        payload = body.encode('utf-8')
+
+        class Handler(BaseHTTPRequestHandler):
+            """Answer GET requests with the payload"""
+            protocol_version = 'HTTP/1.1'
+            # Send headers and body without waiting for delayed ACKs
+            disable_nagle_algorithm = True
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                """Send the payload"""
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/xml; charset=UTF-8')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """URL of the server"""
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/wfs'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
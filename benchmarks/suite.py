@@ -0,0 +1,281 @@
+"""
+Measure parser, model construction and end-to-end request performance.
+
+Cases use the test fixtures and synthetic large responses. For each case
+throughput, latency percentiles and peak memory of a single call are
+reported. Results can be saved as a baseline and compared against later.
+
+Usage: python -m benchmarks.suite [--quick] [--filter TEXT] [--save FILE] [--compare FILE] [--tolerance 0.1]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+import xmltodict
+
+import fmi_weather_client
+import test.test_data as test_data
+from benchmarks import synthetic
+from benchmarks.stub_server import StubServer
+from fmi_weather_client import http
+from fmi_weather_client.parsers import forecast as forecast_parser
+
+# Synthetic responses: (timesteps, points, members)
+SYNTHETIC_RESPONSES = {
+    'long': (240, 1, 1),
+    'batch': (24, 100, 1),
+    'members': (24, 1, 50),
+}
+
+
+class Case(NamedTuple):
+    """Benchmarked function and size of its input in bytes"""
+    name: str
+    function: Callable[[], object]
+    size: int = 0
+
+
+class Result(NamedTuple):
+    """Measurements of a case. Latencies are in microseconds and memory in bytes."""
+    name: str
+    calls: int
+    size: int
+    throughput: float
+    p50: float
+    p95: float
+    p99: float
+    peak_memory: int
+
+
+class Regression(NamedTuple):
+    """Measurement that is worse than in the baseline"""
+    name: str
+    metric: str
+    baseline: float
+    current: float
+
+
+def parser_cases() -> Iterator[Case]:
+    """Parse fixtures and synthetic responses with both parser backends"""
+    for filename in test_data.FORECAST_FILES:
+        body = test_data.read_file(filename)
+        name = os.path.splitext(filename)[0]
+        yield Case(f'parse_forecast[{name}]', lambda body=body: forecast_parser.parse_forecast(body), len(body))
+        yield Case(f'parse_forecast_xmltodict[{name}]',
+                   lambda body=body: forecast_parser.parse_forecast_xmltodict(body), len(body))
+
+    for name, (timesteps, points, members) in SYNTHETIC_RESPONSES.items():
+        body = synthetic.forecast_response(timesteps, points, members)
+        yield Case(f'parse_forecasts[{name}]', lambda body=body: forecast_parser.parse_forecasts(body), len(body))
+        yield Case(f'parse_forecast_arrays[{name}]',
+                   lambda body=body: forecast_parser.parse_forecast_arrays(body), len(body))
+
+    body = synthetic.forecast_response(*SYNTHETIC_RESPONSES['long'])
+    yield Case('parse_forecast_xmltodict[long]', lambda: forecast_parser.parse_forecast_xmltodict(body), len(body))
+
+
+def model_cases() -> Iterator[Case]:
+    """Decode values and create models from already parsed data"""
+    body = synthetic.forecast_response(*SYNTHETIC_RESPONSES['long'])
+    data = xmltodict.parse(body)
+    yield Case('_get_values[long]', lambda: forecast_parser._get_values(data))  # pylint: disable=protected-access
+
+    types = forecast_parser._get_value_types(data)  # pylint: disable=protected-access
+    rows = [dict(zip(types, values)) for values in forecast_parser._get_values(data)]  # pylint: disable=protected-access
+    time_point = datetime(2022, 9, 19, 12, tzinfo=timezone.utc)
+    yield Case('_create_weather_data[long]',
+               lambda: [forecast_parser._create_weather_data(time_point, row, None)  # pylint: disable=protected-access
+                        for row in rows])
+    yield Case('_feels_like[long]',
+               lambda: [forecast_parser._feels_like(row) for row in rows])  # pylint: disable=protected-access
+
+    columns = {name: [row[name] for row in rows] for name in ('Temperature', 'WindSpeedMS', 'Humidity')}
+    yield Case('_feels_like_series[long]',
+               lambda: forecast_parser._feels_like_series(  # pylint: disable=protected-access
+                   columns['Temperature'], columns['WindSpeedMS'], columns['Humidity'], None))
+
+
+def request_cases(server_urls: Dict[str, str]) -> Iterator[Case]:
+    """Request forecasts from local stub servers through the public API"""
+    def with_server(name: str, function: Callable[[], object]) -> Callable[[], object]:
+        client = http.FMIClient(url=server_urls[name])
+
+        def call():
+            http.set_default_client(client)
+            try:
+                return function()
+            finally:
+                http.set_default_client(None)
+        return call
+
+    yield Case('forecast_by_coordinates[place]',
+               with_server('place', lambda: fmi_weather_client.forecast_by_coordinates(63.55915, 27.19067, 1)))
+    yield Case('forecast_by_place_name[place]',
+               with_server('place', lambda: fmi_weather_client.forecast_by_place_name('Iisalmi', 1)))
+    coordinates = [(60.0 + index / 100, 25.0) for index in range(SYNTHETIC_RESPONSES['batch'][1])]
+    yield Case('forecasts_by_coordinates_batch[batch]',
+               with_server('batch', lambda: fmi_weather_client.forecasts_by_coordinates_batch(coordinates, 1)))
+
+
+def measure(case: Case, min_time: float = 1.0, min_calls: int = 5) -> Result:
+    """
+    Call case function repeatedly and measure it.
+    :param case: Case to measure
+    :param min_time: Minimum total time of timed calls in seconds
+    :param min_calls: Minimum number of timed calls
+    :return: Measurements
+    """
+    case.function()
+
+    timings: List[int] = []
+    started = time.perf_counter()
+    while len(timings) < min_calls or time.perf_counter() - started < min_time:
+        call_started = time.perf_counter_ns()
+        case.function()
+        timings.append(time.perf_counter_ns() - call_started)
+
+    tracemalloc.start()
+    try:
+        case.function()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return Result(case.name, len(timings), case.size, len(timings) / (sum(timings) / 1e9),
+                  _percentile(timings, 50) / 1000, _percentile(timings, 95) / 1000, _percentile(timings, 99) / 1000,
+                  peak_memory)
+
+
+def compare(baseline: Dict[str, Result], results: List[Result], tolerance: float = 0.1) -> List[Regression]:
+    """
+    Find measurements that are worse than in the baseline.
+    :param baseline: Baseline results by case name
+    :param results: Current results
+    :param tolerance: Allowed relative increase of median latency and peak memory
+    :return: Regressions
+    """
+    regressions = []
+    for result in results:
+        previous = baseline.get(result.name)
+        if previous is None:
+            continue
+        for metric in ('p50', 'peak_memory'):
+            before, after = getattr(previous, metric), getattr(result, metric)
+            if after > before * (1 + tolerance):
+                regressions.append(Regression(result.name, metric, before, after))
+    return regressions
+
+
+def save_baseline(path: str, results: List[Result]):
+    """
+    Save results as a baseline.
+    :param path: JSON file
+    :param results: Results to save
+    """
+    data = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': {result.name: result._asdict() for result in results},
+    }
+    with open(path, 'w', encoding='utf-8') as baseline_file:
+        json.dump(data, baseline_file, indent=1)
+
+
+def load_baseline(path: str) -> Dict[str, Result]:
+    """
+    Load baseline results.
+    :param path: JSON file saved by save_baseline
+    :return: Results by case name
+    """
+    with open(path, 'r', encoding='utf-8') as baseline_file:
+        data = json.load(baseline_file)
+    return {name: Result(**values) for name, values in data['results'].items()}
+
+
+def report(results: List[Result], baseline: Optional[Dict[str, Result]] = None):
+    """Print results and change of median latency against the baseline"""
+    print(f"{'case':60} {'calls':>6} {'ops/s':>10} {'MB/s':>8} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10} "
+          f"{'peak KiB':>9} {'p50 change':>10}")
+    for result in results:
+        megabytes = f'{result.throughput * result.size / 1e6:.1f}' if result.size else '-'
+        change = '-'
+        if baseline is not None and result.name in baseline:
+            change = f'{(result.p50 / baseline[result.name].p50 - 1) * 100:+.1f}%'
+        print(f"{result.name:60} {result.calls:6} {result.throughput:10.1f} {megabytes:>8} {result.p50:10.1f} "
+              f"{result.p95:10.1f} {result.p99:10.1f} {result.peak_memory / 1024:9.1f} {change:>10}")
+
+
+def run(min_time: float = 1.0, name_filter: str = '') -> List[Result]:
+    """
+    Run all cases.
+    :param min_time: Minimum measuring time of each case in seconds
+    :param name_filter: Run only cases with this text in the name
+    :return: Results
+    """
+    bodies = {
+        'place': test_data.read_file('valid_place_forecast_response.xml'),
+        'batch': synthetic.forecast_response(*SYNTHETIC_RESPONSES['batch']),
+    }
+    previous_cache = http.get_cache()
+    http.set_cache(None)
+    try:
+        with ExitStack() as stack:
+            urls = {name: stack.enter_context(StubServer(body)).url for name, body in bodies.items()}
+            cases = [*parser_cases(), *model_cases(), *request_cases(urls)]
+            return [measure(case, min_time) for case in cases if name_filter in case.name]
+    finally:
+        http.set_cache(previous_cache)
+
+
+def _percentile(values: List[int], percentile: float) -> float:
+    """Get nearest-rank percentile of sorted values"""
+    rank = max(0, int(round(percentile / 100 * len(values))) - 1)
+    return values[rank]
+
+
+def _parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help="Measure each case for 0.2 s instead of 1 s")
+    parser.add_argument('--filter', default='', help="Run only cases with this text in the name")
+    parser.add_argument('--save', metavar='FILE', help="Save results as a baseline")
+    parser.add_argument('--compare', metavar='FILE', help="Compare results against a baseline")
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help="Allowed relative increase of median latency and peak memory")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str]) -> int:
+    """Run benchmarks; return 1 if results regressed from the baseline"""
+    args = _parse_args(argv)
+    baseline = None
+    if args.compare:
+        if os.path.exists(args.compare):
+            baseline = load_baseline(args.compare)
+        else:
+            print(f"Baseline {args.compare} not found. Save one with --save {args.compare}")
+
+    results = run(0.2 if args.quick else 1.0, args.filter)
+    report(results, baseline)
+
+    if args.save:
+        save_baseline(args.save, results)
+        print(f"Baseline saved to {args.save}")
+
+    regressions = compare(baseline, results, args.tolerance) if baseline is not None else []
+    for regression in regressions:
+        print(f"REGRESSION {regression.name} {regression.metric}: "
+              f"{regression.baseline:.1f} -> {regression.current:.1f}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,113 @@
+"""
+Generate synthetic FMI forecast responses of any size.
+
+Responses have the same structure as multipointcoverage responses of
+FMI service: one wfs:member per location group with all rows of its
+points in a single value block.
+"""
+import random
+from typing import List
+
+from fmi_weather_client.http import FORECAST_PARAMETERS
+
+_HEADER = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+           '<wfs:FeatureCollection timeStamp="2022-09-19T12:00:00Z" numberMatched="{members}" '
+           'numberReturned="{members}" '
+           'xmlns:wfs="http://www.opengis.net/wfs/2.0" '
+           'xmlns:xlink="http://www.w3.org/1999/xlink" '
+           'xmlns:om="http://www.opengis.net/om/2.0" '
+           'xmlns:omso="http://inspire.ec.europa.eu/schemas/omso/3.0" '
+           'xmlns:gml="http://www.opengis.net/gml/3.2" '
+           'xmlns:swe="http://www.opengis.net/swe/2.0" '
+           'xmlns:gmlcov="http://www.opengis.net/gmlcov/1.0" '
+           'xmlns:sam="http://www.opengis.net/sampling/2.0" '
+           'xmlns:sams="http://www.opengis.net/samplingSpatial/2.0" '
+           'xmlns:target="http://xml.fmi.fi/namespace/om/atmosphericfeatures/1.1">\n')
+
+_MEMBER = '''    <wfs:member>
+        <omso:GridSeriesObservation gml:id="obs-{member}">
+            <om:featureOfInterest>
+                <sams:SF_SpatialSamplingFeature gml:id="sf-{member}">
+                    <sams:shape>
+                        <gml:MultiPoint gml:id="mp-{member}">
+                            <gml:pointMembers>
+{points}                            </gml:pointMembers>
+                        </gml:MultiPoint>
+                    </sams:shape>
+                </sams:SF_SpatialSamplingFeature>
+            </om:featureOfInterest>
+            <om:result>
+                <gmlcov:MultiPointCoverage gml:id="mpcv-{member}">
+                    <gml:domainSet>
+                        <gmlcov:SimpleMultiPoint gml:id="smp-{member}" srsDimension="3">
+                            <gmlcov:positions>
+{positions}                </gmlcov:positions>
+                        </gmlcov:SimpleMultiPoint>
+                    </gml:domainSet>
+                    <gml:rangeSet>
+                        <gml:DataBlock>
+                            <gml:rangeParameters/>
+                            <gml:doubleOrNilReasonTupleList>
+{values}                </gml:doubleOrNilReasonTupleList>
+                        </gml:DataBlock>
+                    </gml:rangeSet>
+                    <gmlcov:rangeType>
+                        <swe:DataRecord>
+{fields}                        </swe:DataRecord>
+                    </gmlcov:rangeType>
+                </gmlcov:MultiPointCoverage>
+            </om:result>
+        </omso:GridSeriesObservation>
+    </wfs:member>
+'''
+
+_POINT = '''                                <gml:Point gml:id="point-{id}" srsDimension="2">
+                                    <gml:name>Place {id}</gml:name>
+                                    <gml:pos>{lat:.5f} {lon:.5f} </gml:pos>
+                                </gml:Point>
+'''
+
+_FIELD = '                            <swe:field name="{name}" xlink:href="#{name}"/>\n'
+
+# First forecast time and step between forecast times in seconds
+_START_TIME = 1663588800
+_TIMESTEP = 3600
+
+
+def forecast_response(timesteps: int = 24,
+                      points: int = 1,
+                      members: int = 1,
+                      parameters: List[str] = None,
+                      seed: int = 0) -> str:
+    """
+    Create a forecast response body.
+    :param timesteps: Number of forecast times of each point
+    :param points: Number of points in each member
+    :param members: Number of wfs:member elements
+    :param parameters: FMI parameters of each row; all forecast parameters if None
+    :param seed: Seed of the random values
+    :return: Response body
+    """
+    parameters = FORECAST_PARAMETERS if parameters is None else parameters
+    rand = random.Random(seed)
+    parts = [_HEADER.format(members=members)]
+    for member in range(members):
+        coordinates = [(60 + rand.uniform(0, 8), 21 + rand.uniform(0, 9)) for _ in range(points)]
+        parts.append(_MEMBER.format(
+            member=member,
+            points=''.join(_POINT.format(id=member * points + index, lat=lat, lon=lon)
+                           for index, (lat, lon) in enumerate(coordinates)),
+            positions=''.join(f'                {lat:.5f} {lon:.5f}  {_START_TIME + step * _TIMESTEP}\n'
+                              for lat, lon in coordinates for step in range(timesteps)),
+            values=''.join('                ' + ' '.join(_value(rand) for _ in parameters) + ' \n'
+                           for _ in range(points * timesteps)),
+            fields=''.join(_FIELD.format(name=name) for name in parameters)))
+    parts.append('</wfs:FeatureCollection>\n')
+    return ''.join(parts)
+
+
+def _value(rand: random.Random) -> str:
+    """Random value with occasional missing values"""
+    if rand.random() < 0.02:
+        return 'NaN'
+    return f'{rand.uniform(-20, 30):.1f}'
@@ -1,110 +1,628 @@
-from typing import Optional
+from concurrent import futures
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import (AsyncIterator, Awaitable, Callable, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple,
+                    TypeVar, Union)
 
 import asyncio
 
-from fmi_weather_client import http
-from fmi_weather_client.models import Weather
+from fmi_weather_client import async_http, http
+from fmi_weather_client.models import FMIPlace, Forecast, ForecastResult, Observation, Weather, WeatherData
 from fmi_weather_client.parsers import forecast as forecast_parser
+from fmi_weather_client.parsers import observation as observation_parser
+from fmi_weather_client.places import normalize_name
+from fmi_weather_client.singleflight import AsyncSingleFlight, SingleFlight, call_key
 
+# Number of locations sent in a single batch request
+BATCH_SIZE = 100
 
-def weather_by_coordinates(lat: float, lon: float) -> Optional[Weather]:
+# Place name or latitude and longitude pair
+Location = Union[str, Tuple[float, float]]
+
+_T = TypeVar('_T')
+
+# Parses of the same response body in progress
+_PARSES = SingleFlight()
+_ASYNC_PARSES = AsyncSingleFlight()
+
+
+def weather_by_coordinates(lat: float, lon: float, parameters: Optional[Iterable[str]] = None) -> Optional[Weather]:
     """
     Get the latest weather information by coordinates.
 
     :param lat: Latitude (e.g. 25.67087)
     :param lon: Longitude (e.g. 62.39758)
+    :param parameters: WeatherData fields to fetch; other fields are None. All fields if None
     :return: Latest weather information if available; None otherwise
     """
-    response = http.request_weather_by_coordinates(lat, lon)
-    forecast = forecast_parser.parse_forecast(response)
+    parameters = _as_list(parameters)
 
-    if len(forecast.forecasts) == 0:
-        return None
+    def fetch() -> Optional[Weather]:
+        response = http.request_weather_by_coordinates(lat, lon, parameters)
+        return _latest_weather(_parse(forecast_parser.parse_forecast, response))
 
-    weather_state = forecast.forecasts[-1]
-    return Weather(forecast.place, forecast.lat, forecast.lon, weather_state)
+    return _serve_weather(call_key('coordinates', lat, lon, parameters), fetch)
 
 
-async def async_weather_by_coordinates(lat: float, lon: float) -> Optional[Weather]:
+async def async_weather_by_coordinates(lat: float,
+                                       lon: float,
+                                       parameters: Optional[Iterable[str]] = None) -> Optional[Weather]:
     """
     Get the latest weather information by coordinates asynchronously.
 
     :param lat: Latitude (e.g. 25.67087)
     :param lon: Longitude (e.g. 62.39758)
+    :param parameters: WeatherData fields to fetch; other fields are None. All fields if None
     :return: Latest weather information if available; None otherwise
     """
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, weather_by_coordinates, lat, lon)
+    parameters = _as_list(parameters)
 
+    async def fetch() -> Optional[Weather]:
+        response = await async_http.request_weather_by_coordinates(lat, lon, parameters)
+        return _latest_weather(await _async_parse(forecast_parser.parse_forecast, response))
 
-def weather_by_place_name(name: str) -> Optional[Weather]:
+    return await _async_serve_weather(call_key('coordinates', lat, lon, parameters), fetch)
+
+
+def weather_by_place_name(name: str, parameters: Optional[Iterable[str]] = None) -> Optional[Weather]:
     """
     Get the latest weather information by place name.
 
     :param name: Place name (e.g. Kaisaniemi, Helsinki)
+    :param parameters: WeatherData fields to fetch; other fields are None. All fields if None
     :return: Latest weather information if available; None otherwise
     """
-    response = http.request_weather_by_place(name)
-    forecast = forecast_parser.parse_forecast(response)
-    if len(forecast.forecasts) == 0:
-        return None
+    parameters = _as_list(parameters)
 
-    weather_state = forecast.forecasts[-1]
-    return Weather(forecast.place, forecast.lat, forecast.lon, weather_state)
+    def fetch() -> Optional[Weather]:
+        forecast = _fetch_by_place_name(name,
+                                        lambda place: http.request_weather_by_place(place, parameters),
+                                        lambda lat, lon: http.request_weather_by_coordinates(lat, lon, parameters))
+        return _latest_weather(forecast)
 
+    return _serve_weather(call_key('place', normalize_name(name), parameters), fetch)
 
-async def async_weather_by_place_name(name: str) -> Weather:
+
+async def async_weather_by_place_name(name: str, parameters: Optional[Iterable[str]] = None) -> Weather:
     """
     Get the latest weather information by place name asynchronously.
 
     :param name: Place name (e.g. Kaisaniemi, Helsinki)
+    :param parameters: WeatherData fields to fetch; other fields are None. All fields if None
     :return: Latest weather information if available, None otherwise
     """
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, weather_by_place_name, name)
+    parameters = _as_list(parameters)
+
+    async def fetch() -> Optional[Weather]:
+        forecast = await _async_fetch_by_place_name(
+            name,
+            lambda place: async_http.request_weather_by_place(place, parameters),
+            lambda lat, lon: async_http.request_weather_by_coordinates(lat, lon, parameters))
+        return _latest_weather(forecast)
 
+    return await _async_serve_weather(call_key('place', normalize_name(name), parameters), fetch)
 
-def forecast_by_place_name(name: str, timestep_hours: int = 24):
+
+def forecast_by_place_name(name: str, timestep_hours: int = 24, parameters: Optional[Iterable[str]] = None):
     """
     Get the latest forecast by place name.
     :param name: Place name
     :param timestep_hours: Hours between forecasts
+    :param parameters: WeatherData fields to fetch; other fields are None. All fields if None
     :return: Latest forecast
     """
-    response = http.request_forecast_by_place(name, timestep_hours)
-    return forecast_parser.parse_forecast(response)
+    return _fetch_by_place_name(
+        name,
+        lambda place: http.request_forecast_by_place(place, timestep_hours, parameters),
+        lambda lat, lon: http.request_forecast_by_coordinates(lat, lon, timestep_hours, parameters))
 
 
-async def async_forecast_by_place_name(name: str, timestep_hours: int = 24):
+async def async_forecast_by_place_name(name: str,
+                                       timestep_hours: int = 24,
+                                       parameters: Optional[Iterable[str]] = None):
     """
     Get the latest forecast by place name asynchronously.
     :param name: Place name
     :param timestep_hours: Hours between forecasts
+    :param parameters: WeatherData fields to fetch; other fields are None. All fields if None
     :return: Latest forecast
     """
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, forecast_by_place_name, name, timestep_hours)
+    return await _async_fetch_by_place_name(
+        name,
+        lambda place: async_http.request_forecast_by_place(place, timestep_hours, parameters),
+        lambda lat, lon: async_http.request_forecast_by_coordinates(lat, lon, timestep_hours, parameters))
 
 
-def forecast_by_coordinates(lat: float, lon: float, timestep_hours: int = 24):
+def forecast_by_coordinates(lat: float,
+                            lon: float,
+                            timestep_hours: int = 24,
+                            parameters: Optional[Iterable[str]] = None):
     """
     Get the latest forecast by coordinates
     :param lat: Latitude (e.g. 25.67087)
     :param lon: Longitude (e.g. 62.39758)
     :param timestep_hours: Hours between forecasts
+    :param parameters: WeatherData fields to fetch; other fields are None. All fields if None
     :return: Latest forecast
     """
-    response = http.request_forecast_by_coordinates(lat, lon, timestep_hours)
-    return forecast_parser.parse_forecast(response)
+    response = http.request_forecast_by_coordinates(lat, lon, timestep_hours, parameters)
+    return _parse(forecast_parser.parse_forecast, response)
 
 
-async def async_forecast_by_coordinates(lat: float, lon: float, timestep_hours: int = 24):
+async def async_forecast_by_coordinates(lat: float,
+                                        lon: float,
+                                        timestep_hours: int = 24,
+                                        parameters: Optional[Iterable[str]] = None):
     """
     Get the latest forecast by coordinates
     :param lat: Latitude (e.g. 25.67087)
     :param lon: Longitude (e.g. 62.39758)
     :param timestep_hours: Hours between forecasts
+    :param parameters: WeatherData fields to fetch; other fields are None. All fields if None
     :return: Latest forecast
     """
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, forecast_by_coordinates, lat, lon, timestep_hours)
+    response = await async_http.request_forecast_by_coordinates(lat, lon, timestep_hours, parameters)
+    return await _async_parse(forecast_parser.parse_forecast, response)
+
+
+def refresh_forecast(forecast: Forecast,
+                     timestep_hours: int = 24,
+                     stale_from: Optional[datetime] = None,
+                     parameters: Optional[Iterable[str]] = None) -> Forecast:
+    """
+    Bring a forecast up to date by fetching only the rows it is missing.
+    Past rows are dropped and rows from stale_from on are fetched again,
+    e.g. after a new model run has been published. Only the time range
+    after the last row that is kept is requested.
+    :param forecast: Forecast fetched earlier by coordinates or place name
+    :param timestep_hours: Hours between forecasts; same as in the earlier request
+    :param stale_from: Time from which rows are fetched again; only missing rows are fetched if None
+    :param parameters: WeatherData fields to fetch; same as in the earlier request
+    :return: Forecast with the same place and coordinates covering the full forecast horizon
+    """
+    kept, time_range = _refresh_range(forecast, timedelta(hours=timestep_hours), stale_from)
+    if time_range is None:
+        return forecast._replace(forecasts=kept)
+
+    response = http.request_forecast_by_coordinates(forecast.lat, forecast.lon, timestep_hours, parameters,
+                                                    time_range=time_range)
+    return _merge_forecast(forecast, kept, _parse(forecast_parser.parse_forecast, response))
+
+
+async def async_refresh_forecast(forecast: Forecast,
+                                 timestep_hours: int = 24,
+                                 stale_from: Optional[datetime] = None,
+                                 parameters: Optional[Iterable[str]] = None) -> Forecast:
+    """
+    Bring a forecast up to date by fetching only the rows it is missing asynchronously.
+    Past rows are dropped and rows from stale_from on are fetched again,
+    e.g. after a new model run has been published. Only the time range
+    after the last row that is kept is requested.
+    :param forecast: Forecast fetched earlier by coordinates or place name
+    :param timestep_hours: Hours between forecasts; same as in the earlier request
+    :param stale_from: Time from which rows are fetched again; only missing rows are fetched if None
+    :param parameters: WeatherData fields to fetch; same as in the earlier request
+    :return: Forecast with the same place and coordinates covering the full forecast horizon
+    """
+    kept, time_range = _refresh_range(forecast, timedelta(hours=timestep_hours), stale_from)
+    if time_range is None:
+        return forecast._replace(forecasts=kept)
+
+    response = await async_http.request_forecast_by_coordinates(forecast.lat, forecast.lon, timestep_hours,
+                                                                parameters, time_range=time_range)
+    return _merge_forecast(forecast, kept, await _async_parse(forecast_parser.parse_forecast, response))
+
+
+def forecasts_by_coordinates_batch(coordinates: Sequence[Tuple[float, float]],
+                                   timestep_hours: int = 24,
+                                   batch_size: int = BATCH_SIZE,
+                                   parameters: Optional[Iterable[str]] = None) -> List[Forecast]:
+    """
+    Get the latest forecasts for multiple coordinates.
+    Coordinates are sent in requests of batch_size locations.
+    :param coordinates: Latitude and longitude pairs (e.g. [(25.67087, 62.39758)])
+    :param timestep_hours: Hours between forecasts
+    :param batch_size: Maximum number of locations per request
+    :param parameters: WeatherData fields to fetch; other fields are None. All fields if None
+    :return: Latest forecast for each location
+    """
+    parameters = _as_list(parameters)
+    forecasts = []
+    for batch in _batches(coordinates, batch_size):
+        forecasts.extend(_forecasts_by_grid_points(batch, timestep_hours, parameters))
+    return forecasts
+
+
+async def async_forecasts_by_coordinates_batch(coordinates: Sequence[Tuple[float, float]],
+                                               timestep_hours: int = 24,
+                                               batch_size: int = BATCH_SIZE,
+                                               parameters: Optional[Iterable[str]] = None) -> List[Forecast]:
+    """
+    Get the latest forecasts for multiple coordinates asynchronously.
+    Coordinates are sent in concurrent requests of batch_size locations.
+    :param coordinates: Latitude and longitude pairs (e.g. [(25.67087, 62.39758)])
+    :param timestep_hours: Hours between forecasts
+    :param batch_size: Maximum number of locations per request
+    :param parameters: WeatherData fields to fetch; other fields are None. All fields if None
+    :return: Latest forecast for each location
+    """
+    parameters = _as_list(parameters)
+    parsed = await asyncio.gather(*[_async_forecasts_by_grid_points(batch, timestep_hours, parameters)
+                                    for batch in _batches(coordinates, batch_size)])
+    return [forecast for forecasts in parsed for forecast in forecasts]
+
+
+def forecasts_by_place_names(names: Sequence[str],
+                             timestep_hours: int = 24,
+                             batch_size: int = BATCH_SIZE,
+                             parameters: Optional[Iterable[str]] = None) -> List[Forecast]:
+    """
+    Get the latest forecasts for multiple place names.
+    Place names are sent in requests of batch_size locations.
+    :param names: Place names (e.g. ["Kaisaniemi, Helsinki"])
+    :param timestep_hours: Hours between forecasts
+    :param batch_size: Maximum number of locations per request
+    :param parameters: WeatherData fields to fetch; other fields are None. All fields if None
+    :return: Latest forecast for each location
+    """
+    parameters = _as_list(parameters)
+    places = _known_places(names)
+    unknown_names = [name for name, place in zip(names, places) if place is None]
+    by_name = []
+    for batch in _batches(unknown_names, batch_size):
+        response = http.request_forecasts_by_places(batch, timestep_hours, parameters)
+        by_name.extend(_parse(forecast_parser.parse_forecasts, response))
+
+    by_coordinates = []
+    for batch in _batches([(place.lat, place.lon) for place in places if place is not None], batch_size):
+        by_coordinates.extend(_forecasts_by_grid_points(batch, timestep_hours, parameters))
+
+    forecasts = _join_places(places, by_name, by_coordinates)
+    _remember_places(unknown_names, by_name)
+    return forecasts
+
+
+async def async_forecasts_by_place_names(names: Sequence[str],
+                                         timestep_hours: int = 24,
+                                         batch_size: int = BATCH_SIZE,
+                                         parameters: Optional[Iterable[str]] = None) -> List[Forecast]:
+    """
+    Get the latest forecasts for multiple place names asynchronously.
+    Place names are sent in concurrent requests of batch_size locations.
+    :param names: Place names (e.g. ["Kaisaniemi, Helsinki"])
+    :param timestep_hours: Hours between forecasts
+    :param batch_size: Maximum number of locations per request
+    :param parameters: WeatherData fields to fetch; other fields are None. All fields if None
+    :return: Latest forecast for each location
+    """
+    parameters = _as_list(parameters)
+    places = _known_places(names)
+    unknown_names = [name for name, place in zip(names, places) if place is None]
+    coordinates = [(place.lat, place.lon) for place in places if place is not None]
+    name_batches = list(_batches(unknown_names, batch_size))
+    parsed = await asyncio.gather(
+        *[_async_forecasts_by_places(batch, timestep_hours, parameters) for batch in name_batches],
+        *[_async_forecasts_by_grid_points(batch, timestep_hours, parameters)
+          for batch in _batches(coordinates, batch_size)])
+
+    by_name = [forecast for forecasts in parsed[:len(name_batches)] for forecast in forecasts]
+    by_coordinates = [forecast for forecasts in parsed[len(name_batches):] for forecast in forecasts]
+    forecasts = _join_places(places, by_name, by_coordinates)
+    _remember_places(unknown_names, by_name)
+    return forecasts
+
+
+def iter_forecasts(locations: Iterable[Location],
+                   timestep_hours: int = 24,
+                   parameters: Optional[Iterable[str]] = None,
+                   *,
+                   concurrency: int = 8) -> Iterator[ForecastResult]:
+    """
+    Get the latest forecasts for locations as they are received.
+    Locations are read only when there is room for a new request, so at most
+    concurrency forecasts are in flight or waiting to be consumed.
+    :param locations: Place names or latitude and longitude pairs
+    :param timestep_hours: Hours between forecasts
+    :param parameters: WeatherData fields to fetch; other fields are None. All fields if None
+    :param concurrency: Maximum number of requests in flight
+    :return: Iterator of results in the order they are received; failed locations have an error
+    """
+    if concurrency < 1:
+        raise ValueError(f"Invalid concurrency {concurrency}")
+    parameters = _as_list(parameters)
+
+    pending_locations = iter(locations)
+    with futures.ThreadPoolExecutor(concurrency, thread_name_prefix='fmi-iter') as executor:
+        in_flight = set()
+        for location in islice(pending_locations, concurrency):
+            in_flight.add(executor.submit(_forecast_result, location, timestep_hours, parameters))
+
+        while in_flight:
+            done, in_flight = futures.wait(in_flight, return_when=futures.FIRST_COMPLETED)
+            for future in done:
+                location = next(pending_locations, None)
+                if location is not None:
+                    in_flight.add(executor.submit(_forecast_result, location, timestep_hours, parameters))
+                yield future.result()
+
+
+async def aiter_forecasts(locations: Iterable[Location],
+                          timestep_hours: int = 24,
+                          parameters: Optional[Iterable[str]] = None,
+                          *,
+                          concurrency: int = 8) -> AsyncIterator[ForecastResult]:
+    """
+    Get the latest forecasts for locations asynchronously as they are received.
+    Locations are read only when there is room for a new request, so at most
+    concurrency forecasts are in flight or waiting to be consumed.
+    :param locations: Place names or latitude and longitude pairs
+    :param timestep_hours: Hours between forecasts
+    :param parameters: WeatherData fields to fetch; other fields are None. All fields if None
+    :param concurrency: Maximum number of requests in flight
+    :return: Asynchronous iterator of results in the order they are received; failed locations have an error
+    """
+    if concurrency < 1:
+        raise ValueError(f"Invalid concurrency {concurrency}")
+    parameters = _as_list(parameters)
+
+    pending_locations = iter(locations)
+    in_flight = {asyncio.ensure_future(_async_forecast_result(location, timestep_hours, parameters))
+                 for location in islice(pending_locations, concurrency)}
+    try:
+        while in_flight:
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                location = next(pending_locations, None)
+                if location is not None:
+                    in_flight.add(asyncio.ensure_future(_async_forecast_result(location, timestep_hours, parameters)))
+                yield task.result()
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+
+def observations_by_station_ids(station_ids: Sequence[int],
+                                timestep_minutes: int = 10,
+                                batch_size: int = BATCH_SIZE,
+                                parameters: Optional[Iterable[str]] = None) -> List[Observation]:
+    """
+    Get the latest observations of multiple weather stations.
+    Station ids are sent in requests of batch_size stations.
+    :param station_ids: FMI station ids (fmisid, e.g. [100971, 101004])
+    :param timestep_minutes: Minutes between observations
+    :param batch_size: Maximum number of stations per request
+    :param parameters: WeatherData fields to fetch; other fields are None. All observed fields if None
+    :return: Observations of each station in station_ids order; stations without observations are left out
+    """
+    parameters = _as_list(parameters)
+    observations = []
+    for batch in _batches(station_ids, batch_size):
+        response = http.request_observations_by_station_ids(batch, timestep_minutes, parameters)
+        observations.extend(_parse(observation_parser.parse_observations, response))
+    return _in_station_order(station_ids, observations)
+
+
+async def async_observations_by_station_ids(station_ids: Sequence[int],
+                                            timestep_minutes: int = 10,
+                                            batch_size: int = BATCH_SIZE,
+                                            parameters: Optional[Iterable[str]] = None) -> List[Observation]:
+    """
+    Get the latest observations of multiple weather stations asynchronously.
+    Station ids are sent in concurrent requests of batch_size stations.
+    :param station_ids: FMI station ids (fmisid, e.g. [100971, 101004])
+    :param timestep_minutes: Minutes between observations
+    :param batch_size: Maximum number of stations per request
+    :param parameters: WeatherData fields to fetch; other fields are None. All observed fields if None
+    :return: Observations of each station in station_ids order; stations without observations are left out
+    """
+    parameters = _as_list(parameters)
+    responses = await asyncio.gather(*[async_http.request_observations_by_station_ids(batch, timestep_minutes,
+                                                                                      parameters)
+                                       for batch in _batches(station_ids, batch_size)])
+    parsed = await asyncio.gather(*[_async_parse(observation_parser.parse_observations, response)
+                                    for response in responses])
+    return _in_station_order(station_ids, [observation for observations in parsed for observation in observations])
+
+
+def _forecast_result(location: Location,
+                     timestep_hours: int,
+                     parameters: Optional[Iterable[str]]) -> ForecastResult:
+    """Fetch forecast for a place name or coordinates, returning an error instead of raising it"""
+    try:
+        if isinstance(location, str):
+            forecast = forecast_by_place_name(location, timestep_hours, parameters)
+        else:
+            forecast = forecast_by_coordinates(location[0], location[1], timestep_hours, parameters)
+    except Exception as err:  # pylint: disable=broad-except
+        return ForecastResult(location, None, err)
+    return ForecastResult(location, forecast, None)
+
+
+async def _async_forecast_result(location: Location,
+                                 timestep_hours: int,
+                                 parameters: Optional[Iterable[str]]) -> ForecastResult:
+    """Fetch forecast asynchronously for a place name or coordinates, returning an error instead of raising it"""
+    try:
+        if isinstance(location, str):
+            forecast = await async_forecast_by_place_name(location, timestep_hours, parameters)
+        else:
+            forecast = await async_forecast_by_coordinates(location[0], location[1], timestep_hours, parameters)
+    except Exception as err:  # pylint: disable=broad-except
+        return ForecastResult(location, None, err)
+    return ForecastResult(location, forecast, None)
+
+
+def _forecasts_by_grid_points(coordinates: Sequence[Tuple[float, float]],
+                              timestep_hours: int,
+                              parameters: Optional[List[str]]) -> List[Forecast]:
+    """Fetch forecasts for a batch of coordinates, requesting each grid point once"""
+    points, indices = http.unique_grid_points(coordinates)
+    response = http.request_forecasts_by_coordinates(points, timestep_hours, parameters)
+    return _expand(_parse(forecast_parser.parse_forecasts, response), points, indices)
+
+
+async def _async_forecasts_by_grid_points(coordinates: Sequence[Tuple[float, float]],
+                                          timestep_hours: int,
+                                          parameters: Optional[List[str]]) -> List[Forecast]:
+    """Fetch forecasts asynchronously for a batch of coordinates, requesting each grid point once"""
+    points, indices = http.unique_grid_points(coordinates)
+    response = await async_http.request_forecasts_by_coordinates(points, timestep_hours, parameters)
+    return _expand(await _async_parse(forecast_parser.parse_forecasts, response), points, indices)
+
+
+async def _async_forecasts_by_places(names: Sequence[str],
+                                     timestep_hours: int,
+                                     parameters: Optional[List[str]]) -> List[Forecast]:
+    """Fetch forecasts asynchronously for a batch of place names"""
+    response = await async_http.request_forecasts_by_places(names, timestep_hours, parameters)
+    return await _async_parse(forecast_parser.parse_forecasts, response)
+
+
+def _expand(forecasts: List[Forecast], points: Sequence[Tuple[float, float]], indices: Sequence[int]) -> List[Forecast]:
+    """Map forecasts of unique grid points back to every requested coordinate pair"""
+    if len(forecasts) != len(points):
+        raise ValueError(f"Expected forecasts for {len(points)} locations, received {len(forecasts)}")
+    return [forecasts[index] for index in indices]
+
+
+def _fetch_by_place_name(name: str,
+                         request_by_place: Callable[[str], str],
+                         request_by_coordinates: Callable[[float, float], str]) -> Forecast:
+    """Fetch forecast by place name, or by coordinates if the place name has been resolved before"""
+    place = _known_places([name])[0]
+    if place is not None:
+        return _with_place(_parse(forecast_parser.parse_forecast, request_by_coordinates(place.lat, place.lon)), place)
+
+    forecast = _parse(forecast_parser.parse_forecast, request_by_place(name))
+    _remember_places([name], [forecast])
+    return forecast
+
+
+async def _async_fetch_by_place_name(name: str,
+                                     request_by_place: Callable[[str], Awaitable[str]],
+                                     request_by_coordinates: Callable[[float, float], Awaitable[str]]) -> Forecast:
+    """Fetch forecast asynchronously by place name, or by coordinates if the place name has been resolved before"""
+    place = _known_places([name])[0]
+    if place is not None:
+        response = await request_by_coordinates(place.lat, place.lon)
+        return _with_place(await _async_parse(forecast_parser.parse_forecast, response), place)
+
+    forecast = await _async_parse(forecast_parser.parse_forecast, await request_by_place(name))
+    _remember_places([name], [forecast])
+    return forecast
+
+
+def _known_places(names: Sequence[str]) -> List[Optional[FMIPlace]]:
+    """Get place each name has been resolved to; None for names that have not been resolved"""
+    cache = http.get_place_cache()
+    if cache is None:
+        return [None] * len(names)
+    return [cache.get(name) for name in names]
+
+
+def _remember_places(names: Sequence[str], forecasts: Sequence[Forecast]):
+    """Store places of forecasts requested by names to the place cache"""
+    cache = http.get_place_cache()
+    if cache is None or len(names) != len(forecasts):
+        return
+    cache.update({name: FMIPlace(forecast.place, forecast.lat, forecast.lon)
+                  for name, forecast in zip(names, forecasts)})
+
+
+def _join_places(places: Sequence[Optional[FMIPlace]],
+                 by_name: List[Forecast],
+                 by_coordinates: List[Forecast]) -> List[Forecast]:
+    """Combine forecasts requested by names and by coordinates of known places in original order"""
+    unknown = sum(place is None for place in places)
+    if len(by_name) != unknown or len(by_coordinates) != len(places) - unknown:
+        raise ValueError(f"Expected forecasts for {unknown} place names and {len(places) - unknown} known places, "
+                         f"received {len(by_name)} and {len(by_coordinates)}")
+
+    names = iter(by_name)
+    coordinates = iter(by_coordinates)
+    return [next(names) if place is None else _with_place(next(coordinates), place) for place in places]
+
+
+def _with_place(forecast: Forecast, place: FMIPlace) -> Forecast:
+    return forecast._replace(place=place.name, lat=place.lat, lon=place.lon)
+
+
+def _parse(parser: Callable[[str], _T], body: str) -> _T:
+    """Parse response body; threads parsing the same body at the same time share the result"""
+    return _PARSES.do((parser, body), lambda: parser(body))
+
+
+async def _async_parse(parser: Callable[[str], _T], body: str) -> _T:
+    """Parse response body; coroutines parsing the same body at the same time share the result"""
+    async def parse() -> _T:
+        return parser(body)
+
+    return await _ASYNC_PARSES.do((parser, body), parse)
+
+
+def _refresh_range(forecast: Forecast,
+                   timestep: timedelta,
+                   stale_from: Optional[datetime]) -> Tuple[List[WeatherData], Optional[Tuple[datetime, datetime]]]:
+    """
+    Split forecast to rows that are still valid and the time range that has to be fetched.
+    :return: Valid rows and start and end time of missing rows; None if no rows are missing
+    """
+    now = datetime.now(timezone.utc)
+    kept = [data for data in forecast.forecasts if data.time >= now and (stale_from is None or data.time < stale_from)]
+
+    start_time = kept[-1].time + timestep if kept else now
+    end_time = now + http.FORECAST_HORIZON
+    if start_time > end_time:
+        return kept, None
+    return kept, (start_time, end_time)
+
+
+def _merge_forecast(forecast: Forecast, kept: List[WeatherData], update: Forecast) -> Forecast:
+    """Append rows of update after the kept rows of forecast"""
+    new_rows = [data for data in update.forecasts if not kept or data.time > kept[-1].time]
+    return forecast._replace(forecasts=kept + new_rows)
+
+
+def _batches(items: Sequence[_T], batch_size: int) -> Iterator[Sequence[_T]]:
+    """Split items to batches of at most batch_size items"""
+    if batch_size < 1:
+        raise ValueError(f"Invalid batch_size {batch_size}")
+    for start in range(0, len(items), batch_size):
+        yield items[start:start + batch_size]
+
+
+def _in_station_order(station_ids: Sequence[int], observations: List[Observation]) -> List[Observation]:
+    """Sort observations to the order their stations were requested in"""
+    order = {int(station_id): index for index, station_id in enumerate(station_ids)}
+    return sorted(observations, key=lambda observation: order.get(observation.station_id, len(order)))
+
+
+def _serve_weather(key: Hashable, fetch: Callable[[], Optional[Weather]]) -> Optional[Weather]:
+    """Serve weather from the stale-while-revalidate store if one is set; fetch it otherwise"""
+    store = http.get_stale_while_revalidate()
+    if store is None:
+        return fetch()
+    return store.get(key, fetch)
+
+
+async def _async_serve_weather(key: Hashable,
+                               fetch: Callable[[], Awaitable[Optional[Weather]]]) -> Optional[Weather]:
+    """Serve weather asynchronously from the stale-while-revalidate store if one is set; fetch it otherwise"""
+    store = http.get_stale_while_revalidate()
+    if store is None:
+        return await fetch()
+    return await store.get_async(key, fetch)
+
+
+def _as_list(parameters: Optional[Iterable[str]]) -> Optional[List[str]]:
+    """Copy parameters to a list, so that they can be used by repeated requests"""
+    return None if parameters is None else list(parameters)
+
+
+def _latest_weather(forecast: Forecast) -> Optional[Weather]:
+    """Get the latest weather state from forecast; None if forecast is empty"""
+    if len(forecast.forecasts) == 0:
+        return None
+
+    weather_state = forecast.forecasts[-1]
+    return Weather(forecast.place, forecast.lat, forecast.lon, weather_state)
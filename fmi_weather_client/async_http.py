@@ -0,0 +1,370 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+import aiohttp
+
+from fmi_weather_client import http, instrumentation, retry
+from fmi_weather_client.cache import DiskCache
+from fmi_weather_client.http import (RequestType, _create_batch_params, _create_params, _create_station_params,
+                                     _learn_grid_point, _raise_error, _store, flight_key)
+from fmi_weather_client.singleflight import AsyncSingleFlight
+from fmi_weather_client.throttle import Throttle
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar('_T')
+
+
+class AsyncFMIClient:  # pylint: disable=too-many-instance-attributes
+    """
+    Asynchronous HTTP client for FMI service.
+
+    Owns a pooled keep-alive connection set that is shared by all requests
+    made through the client. Connections are bound to the event loop that
+    made the first request; the pool is recreated if the loop changes. The
+    pool of a loop is closed when the loop cancels its remaining tasks, as
+    asyncio.run does before closing the loop.
+    """
+
+    def __init__(self,
+                 max_connections: int = 100,
+                 max_concurrency: Optional[int] = None,
+                 timeout: float = 10,
+                 keepalive_timeout: float = 30,
+                 throttle: Optional[Throttle] = None):
+        """
+        :param max_connections: Maximum number of open connections to FMI service
+        :param max_concurrency: Maximum number of requests in flight; unlimited if None
+        :param timeout: Total timeout of a single request in seconds
+        :param keepalive_timeout: Seconds an idle connection is kept open
+        :param throttle: Rate and concurrency limits of requests; unlimited if None
+        """
+        # pylint: disable=too-many-arguments
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.keepalive_timeout = keepalive_timeout
+        self.throttle = throttle
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closer: Optional[asyncio.Task] = None
+
+    async def get(self, params: Dict[str, Any]) -> str:
+        """
+        Send a request to FMI service and return the body
+        :param params: Query parameters
+        :return: Response body
+        """
+        session = self._get_session()
+        if self._semaphore is None:
+            status, body = await self._throttled(session, params)
+        else:
+            async with self._semaphore:
+                status, body = await self._throttled(session, params)
+
+        if status != 200:
+            _raise_error(status, body)
+        return body
+
+    async def close(self):
+        """Close all pooled connections"""
+        if self._closer is not None and self._loop is asyncio.get_running_loop():
+            self._closer.cancel()
+        self._closer = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            if self._session is not None and self._loop is not loop:
+                _close_in_loop(self._session, self._loop)
+            connector = aiohttp.TCPConnector(limit=self.max_connections,
+                                             keepalive_timeout=self.keepalive_timeout)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout),
+                                                  trace_configs=[_create_trace_config()])
+            self._semaphore = asyncio.Semaphore(self.max_concurrency) if self.max_concurrency else None
+            self._loop = loop
+            self._closer = loop.create_task(_close_when_cancelled(self._session))
+
+        return self._session
+
+    async def _throttled(self, session: aiohttp.ClientSession, params: Dict[str, Any]) -> Tuple[int, str]:
+        if self.throttle is None:
+            return await self._send(session, params)
+
+        await self.throttle.acquire_async()
+        status = None
+        try:
+            status, body = await self._send(session, params)
+            return status, body
+        finally:
+            self.throttle.release(status)
+
+    @staticmethod
+    async def _send(session: aiohttp.ClientSession, params: Dict[str, Any]) -> Tuple[int, str]:
+        _LOGGER.debug("GET request to %s. Parameters: %s", http.URL, params)
+        started = time.perf_counter()
+        async with session.get(http.URL, params=_query_items(params)) as response:
+            headers_received = time.perf_counter()
+            data = await response.read()
+            body = data.decode(response.get_encoding())
+            status = response.status
+
+        finished = time.perf_counter()
+        if instrumentation.enabled():
+            instrumentation.record_span(instrumentation.SPAN_HTTP_WAIT, headers_received - started)
+            instrumentation.record_span(instrumentation.SPAN_HTTP_TRANSFER, finished - headers_received)
+            instrumentation.record_span(instrumentation.SPAN_HTTP_REQUEST, finished - started, status_code=status)
+            instrumentation.count(instrumentation.COUNTER_BYTES_RECEIVED, len(data))
+
+        _LOGGER.debug("GET response from %s in %d ms. Status: %d.",
+                      http.URL,
+                      (finished - started) * 1000,
+                      status)
+        return status, body
+
+
+async def _close_when_cancelled(session: aiohttp.ClientSession):
+    """Wait until cancelled and close session; asyncio.run cancels remaining tasks before closing the loop"""
+    try:
+        await asyncio.get_running_loop().create_future()
+    finally:
+        if not session.closed:
+            await session.close()
+
+
+def _close_in_loop(session: aiohttp.ClientSession, loop: Optional[asyncio.AbstractEventLoop]):
+    """Close session of another event loop if the loop is still running"""
+    if session.closed or loop is None or loop.is_closed() or not loop.is_running():
+        return
+    asyncio.run_coroutine_threadsafe(session.close(), loop)
+
+
+def _create_trace_config() -> aiohttp.TraceConfig:
+    """Create trace config emitting host name resolution and connection spans"""
+    config = aiohttp.TraceConfig()
+    _trace_span(config.on_dns_resolvehost_start, config.on_dns_resolvehost_end, instrumentation.SPAN_HTTP_DNS)
+    _trace_span(config.on_connection_create_start, config.on_connection_create_end,
+                instrumentation.SPAN_HTTP_CONNECT)
+    return config
+
+
+def _trace_span(start_signal, end_signal, name: str):
+    """Emit the time between two trace signals of a request as a span"""
+    async def on_start(_session, context, _params):
+        setattr(context, name, time.perf_counter())
+
+    async def on_end(_session, context, _params):
+        started = getattr(context, name, None)
+        if started is not None:
+            instrumentation.record_span(name, time.perf_counter() - started)
+
+    start_signal.append(on_start)
+    end_signal.append(on_end)
+
+
+_DEFAULT_CLIENT: Optional[AsyncFMIClient] = None
+
+_FLIGHTS = AsyncSingleFlight()
+
+
+def get_default_client() -> AsyncFMIClient:
+    """
+    Get the client used by the module level request functions.
+    :return: Default client
+    """
+    global _DEFAULT_CLIENT  # pylint: disable=global-statement
+    if _DEFAULT_CLIENT is None:
+        _DEFAULT_CLIENT = AsyncFMIClient()
+    return _DEFAULT_CLIENT
+
+
+def set_default_client(client: Optional[AsyncFMIClient]):
+    """
+    Set the client used by the module level request functions.
+    :param client: Client to use; None restores a default client
+    """
+    global _DEFAULT_CLIENT  # pylint: disable=global-statement
+    _DEFAULT_CLIENT = client
+
+
+async def request_weather_by_coordinates(lat: float, lon: float, parameters: Optional[Iterable[str]] = None) -> str:
+    """
+    Get the latest weather information by coordinates asynchronously.
+
+    :param lat: Latitude (e.g. 25.67087)
+    :param lon: Longitude (e.g. 62.39758)
+    :param parameters: WeatherData fields or FMI parameters to request; all if None
+    :return: Latest weather information
+    """
+    params = _create_params(RequestType.WEATHER, 10, lat=lat, lon=lon, parameters=parameters)
+    return await _send_request(params, RequestType.WEATHER)
+
+
+async def request_weather_by_place(place: str, parameters: Optional[Iterable[str]] = None) -> str:
+    """
+    Get the latest weather information by place name asynchronously.
+
+    :param place: Place name (e.g. Kaisaniemi, Helsinki)
+    :param parameters: WeatherData fields or FMI parameters to request; all if None
+    :return: Latest weather information
+    """
+    params = _create_params(RequestType.WEATHER, 10, place=place, parameters=parameters)
+    return await _send_request(params, RequestType.WEATHER)
+
+
+async def request_forecast_by_coordinates(lat: float,
+                                          lon: float,
+                                          timestep_hours: int = 24,
+                                          parameters: Optional[Iterable[str]] = None,
+                                          *,
+                                          time_range: Optional[Tuple[datetime, datetime]] = None) -> str:
+    """
+    Get the latest forecast by place coordinates asynchronously.
+
+    :param lat: Latitude (e.g. 25.67087)
+    :param lon: Longitude (e.g. 62.39758)
+    :param timestep_hours: Forecast steps in hours
+    :param parameters: WeatherData fields or FMI parameters to request; all if None
+    :param time_range: Start and end time of forecast; FORECAST_HORIZON from now if None
+    :return: Forecast response
+    """
+    timestep_minutes = timestep_hours * 60
+    params = _create_params(RequestType.FORECAST, timestep_minutes, lat=lat, lon=lon, parameters=parameters,
+                            time_range=time_range)
+    return await _send_request(params, RequestType.FORECAST, exact_times=time_range is not None)
+
+
+async def request_forecast_by_place(place: str,
+                                    timestep_hours: int = 24,
+                                    parameters: Optional[Iterable[str]] = None) -> str:
+    """
+    Get the latest forecast by place name asynchronously.
+
+    :param place: Place name (e.g. Kaisaniemi,Helsinki)
+    :param timestep_hours: Forecast steps in hours
+    :param parameters: WeatherData fields or FMI parameters to request; all if None
+    :return: Forecast response
+    """
+    timestep_minutes = timestep_hours * 60
+    params = _create_params(RequestType.FORECAST, timestep_minutes, place=place, parameters=parameters)
+    return await _send_request(params, RequestType.FORECAST)
+
+
+async def request_forecasts_by_coordinates(coordinates: Sequence[Tuple[float, float]],
+                                           timestep_hours: int = 24,
+                                           parameters: Optional[Iterable[str]] = None) -> str:
+    """
+    Get the latest forecasts for multiple coordinates in a single request asynchronously.
+
+    :param coordinates: Latitude and longitude pairs
+    :param timestep_hours: Forecast steps in hours
+    :param parameters: WeatherData fields or FMI parameters to request; all if None
+    :return: Forecast response with one location per point of unique_grid_points
+    """
+    timestep_minutes = timestep_hours * 60
+    params = _create_batch_params(RequestType.FORECAST, timestep_minutes, coordinates=coordinates,
+                                  parameters=parameters)
+    return await _send_request(params, RequestType.FORECAST)
+
+
+async def request_forecasts_by_places(places: Sequence[str],
+                                      timestep_hours: int = 24,
+                                      parameters: Optional[Iterable[str]] = None) -> str:
+    """
+    Get the latest forecasts for multiple place names in a single request asynchronously.
+
+    :param places: Place names (e.g. Kaisaniemi,Helsinki)
+    :param timestep_hours: Forecast steps in hours
+    :param parameters: WeatherData fields or FMI parameters to request; all if None
+    :return: Forecast response with one location per place
+    """
+    timestep_minutes = timestep_hours * 60
+    params = _create_batch_params(RequestType.FORECAST, timestep_minutes, places=places, parameters=parameters)
+    return await _send_request(params, RequestType.FORECAST)
+
+
+async def request_observations_by_station_ids(station_ids: Sequence[int],
+                                              timestep_minutes: int = 10,
+                                              parameters: Optional[Iterable[str]] = None,
+                                              *,
+                                              time_range: Optional[Tuple[datetime, datetime]] = None) -> str:
+    """
+    Get the latest observations of multiple weather stations in a single request asynchronously.
+
+    :param station_ids: FMI station ids (fmisid, e.g. 100971)
+    :param timestep_minutes: Observation steps in minutes
+    :param parameters: WeatherData fields or FMI observation parameters to request; all if None
+    :param time_range: Start and end time of observations; OBSERVATION_HISTORY until now if None
+    :return: Observation response with one location per station
+    """
+    params = _create_station_params(station_ids, timestep_minutes, parameters, time_range)
+    return await _send_request(params, RequestType.OBSERVATION, exact_times=time_range is not None)
+
+
+async def _send_request(params: Dict[str, Any], request_type: RequestType, *, exact_times: bool = False) -> str:
+    """
+    Send a request to FMI service using the default client and return the body.
+    Identical requests sent concurrently from the same event loop share a
+    single request. Response is served from the response cache when available.
+    :param params: Query parameters
+    :param request_type: Request type
+    :param exact_times: Share only requests with the same start and end time, as given by the caller
+    :return: Response body
+    """
+    return await _FLIGHTS.do(flight_key(request_type, params, exact_times), lambda: _fetch(params, request_type))
+
+
+async def _fetch(params: Dict[str, Any], request_type: RequestType) -> str:
+    """Get response body from the response cache or from FMI service"""
+    cache = http.get_cache()
+    if cache is None:
+        body = await _get(params)
+        _learn_grid_point(params, body)
+        return body
+
+    body = await _use_cache(cache, cache.get, request_type, params)
+    if body is None:
+        body = await _get(params)
+        await _use_cache(cache, _store, cache, request_type, params, body)
+    return body
+
+
+async def _use_cache(cache: Any, function: Callable[..., _T], *args: Any) -> _T:
+    """Call function of the response cache, in the default executor if it does file I/O"""
+    if isinstance(cache, DiskCache):
+        return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+    return function(*args)
+
+
+async def _get(params: Dict[str, Any]) -> str:
+    """Send a request using the default client, retrying it according to the retry policy"""
+    client = get_default_client()
+    policy = http.get_retry_policy()
+    if policy is None:
+        return await client.get(params)
+    return await retry.call_async(lambda: client.get(params), policy)
+
+
+def _query_items(params: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """Convert query parameters to key-value pairs accepted by aiohttp"""
+    items = []
+    for key, value in params.items():
+        if isinstance(value, list):
+            items.extend((key, str(item)) for item in value)
+        else:
+            items.append((key, str(value)))
+    return items
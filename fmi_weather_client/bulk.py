@@ -0,0 +1,121 @@
+from concurrent import futures
+from contextlib import nullcontext
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+from fmi_weather_client import http
+from fmi_weather_client.models import ForecastArray
+from fmi_weather_client.parsers import forecast as forecast_parser
+
+_T = TypeVar('_T')
+
+# Number of locations sent in a single request and parsed as one task
+DEFAULT_CHUNK_SIZE = 50
+
+# Number of requests in flight at the same time
+DEFAULT_FETCH_CONCURRENCY = 8
+
+
+def forecast_arrays_by_coordinates(coordinates: Sequence[Tuple[float, float]],
+                                   timestep_hours: int = 24,
+                                   parameters: Optional[Iterable[str]] = None,
+                                   *,
+                                   workers: Optional[int] = None,
+                                   chunk_size: int = DEFAULT_CHUNK_SIZE,
+                                   fetch_concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+                                   executor: Optional[futures.Executor] = None) -> List[ForecastArray]:
+    """
+    Get the latest forecasts for many coordinates, parsing them in worker processes.
+
+    Chunks of locations are fetched concurrently in threads and each response
+    is parsed in a worker process as soon as it arrives, so parsing is not
+    limited to a single core. Workers return columnar forecasts, which are
+    cheap to send between processes.
+    :param coordinates: Latitude and longitude pairs (e.g. [(25.67087, 62.39758)])
+    :param timestep_hours: Hours between forecasts
+    :param parameters: WeatherData fields to fetch; other fields are None. All fields if None
+    :param workers: Number of parsing processes; number of CPUs if None
+    :param chunk_size: Number of locations per request and parsing task
+    :param fetch_concurrency: Maximum number of requests in flight
+    :param executor: Executor to parse in instead of a new process pool; it is not shut down
+    :return: Columnar forecast for each location
+    """
+    # pylint: disable=too-many-arguments
+    parameters = None if parameters is None else list(parameters)
+
+    def request(chunk: Sequence[Tuple[float, float]]) -> Tuple[str, Sequence[int]]:
+        points, indices = http.unique_grid_points(chunk)
+        return http.request_forecasts_by_coordinates(points, timestep_hours, parameters), indices
+
+    return _fetch_and_parse(coordinates, request, workers=workers, chunk_size=chunk_size,
+                            fetch_concurrency=fetch_concurrency, executor=executor)
+
+
+def forecast_arrays_by_place_names(names: Sequence[str],
+                                   timestep_hours: int = 24,
+                                   parameters: Optional[Iterable[str]] = None,
+                                   *,
+                                   workers: Optional[int] = None,
+                                   chunk_size: int = DEFAULT_CHUNK_SIZE,
+                                   fetch_concurrency: int = DEFAULT_FETCH_CONCURRENCY,
+                                   executor: Optional[futures.Executor] = None) -> List[ForecastArray]:
+    """
+    Get the latest forecasts for many place names, parsing them in worker processes.
+    :param names: Place names (e.g. ["Kaisaniemi, Helsinki"])
+    :param timestep_hours: Hours between forecasts
+    :param parameters: WeatherData fields to fetch; other fields are None. All fields if None
+    :param workers: Number of parsing processes; number of CPUs if None
+    :param chunk_size: Number of locations per request and parsing task
+    :param fetch_concurrency: Maximum number of requests in flight
+    :param executor: Executor to parse in instead of a new process pool; it is not shut down
+    :return: Columnar forecast for each location
+    """
+    # pylint: disable=too-many-arguments
+    parameters = None if parameters is None else list(parameters)
+
+    def request(chunk: Sequence[str]) -> Tuple[str, Sequence[int]]:
+        return http.request_forecasts_by_places(chunk, timestep_hours, parameters), range(len(chunk))
+
+    return _fetch_and_parse(names, request, workers=workers, chunk_size=chunk_size,
+                            fetch_concurrency=fetch_concurrency, executor=executor)
+
+
+def _fetch_and_parse(locations: Sequence[_T],
+                     request: Callable[[Sequence[_T]], Tuple[str, Sequence[int]]],
+                     *,
+                     workers: Optional[int],
+                     chunk_size: int,
+                     fetch_concurrency: int,
+                     executor: Optional[futures.Executor]) -> List[ForecastArray]:
+    """
+    Fetch chunks of locations in threads and parse each response in the executor as soon as it arrives.
+    Request returns the response and index of the forecast of each location in it.
+    """
+    # pylint: disable=too-many-arguments
+    if chunk_size < 1:
+        raise ValueError(f"Invalid chunk_size {chunk_size}")
+
+    chunks = [locations[start:start + chunk_size] for start in range(0, len(locations), chunk_size)]
+    parsers = nullcontext(executor) if executor is not None else futures.ProcessPoolExecutor(workers)
+    with futures.ThreadPoolExecutor(fetch_concurrency, thread_name_prefix='fmi-bulk') as fetchers, \
+            parsers as parser_pool:
+        fetches: Dict[futures.Future, int] = {fetchers.submit(request, chunk): index
+                                              for index, chunk in enumerate(chunks)}
+        parses: List[Optional[futures.Future]] = [None] * len(chunks)
+        try:
+            for fetch in futures.as_completed(fetches):
+                parses[fetches[fetch]] = parser_pool.submit(_parse_chunk, *fetch.result())
+        except BaseException:
+            for pending in fetches:
+                pending.cancel()
+            raise
+
+        return [forecast for parse in parses for forecast in parse.result()]
+
+
+def _parse_chunk(body: str, indices: Sequence[int]) -> List[ForecastArray]:
+    """Parse response of a chunk and map its forecasts back to every location of the chunk"""
+    forecasts = forecast_parser.parse_forecast_arrays(body)
+    expected = max(indices, default=-1) + 1
+    if len(forecasts) != expected:
+        raise ValueError(f"Expected forecasts for {expected} locations, received {len(forecasts)}")
+    return [forecasts[index] for index in indices]
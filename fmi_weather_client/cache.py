@@ -0,0 +1,319 @@
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+from fmi_weather_client.http import RequestType
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Disk cache files start with the expiry time as a UNIX timestamp
+_DISK_HEADER = struct.Struct('<d')
+_DISK_SUFFIX = '.fmi.z'
+
+
+class CacheStats(NamedTuple):
+    """Represents cache counters"""
+    hits: int
+    misses: int
+    evictions: int
+
+
+class FixedExpiry(NamedTuple):
+    """Expire entries after a fixed time to live"""
+    ttl: timedelta
+
+    def __call__(self, now: datetime) -> datetime:
+        return now + self.ttl
+
+
+class ModelRunExpiry(NamedTuple):
+    """
+    Expire entries when the next forecast model run is published.
+
+    Model runs start every interval (counted from midnight UTC) and their
+    data is published delay after the run has started.
+    """
+    interval: timedelta = timedelta(hours=3)
+    delay: timedelta = timedelta(hours=2)
+
+    def __call__(self, now: datetime) -> datetime:
+        # Find the run whose publication is the first one after now
+        run = _floor(now - self.delay, self.interval)
+        return run + self.interval + self.delay
+
+
+DEFAULT_EXPIRY: Dict[RequestType, Callable[[datetime], datetime]] = {
+    RequestType.WEATHER: FixedExpiry(timedelta(minutes=5)),
+    RequestType.FORECAST: ModelRunExpiry(),
+    RequestType.OBSERVATION: FixedExpiry(timedelta(minutes=5)),
+}
+
+DEFAULT_TIME_BUCKETS: Dict[RequestType, timedelta] = {
+    RequestType.WEATHER: timedelta(minutes=10),
+    RequestType.FORECAST: timedelta(hours=1),
+    RequestType.OBSERVATION: timedelta(minutes=10),
+}
+
+
+class ResponseCache:
+    """
+    In-memory LRU cache of FMI response bodies.
+
+    Entries are keyed by normalized query parameters. Start and end times
+    are rounded down to a time bucket of the request type, so that repeated
+    queries made within the same bucket share an entry.
+    """
+
+    def __init__(self,
+                 max_size: int = 256,
+                 expiry: Optional[Dict[RequestType, Callable[[datetime], datetime]]] = None,
+                 time_buckets: Optional[Dict[RequestType, timedelta]] = None,
+                 clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc)):
+        """
+        :param max_size: Maximum number of cached responses
+        :param expiry: Function returning expiry time of a new entry for each request type
+        :param time_buckets: Rounding of start and end times in cache keys for each request type
+        :param clock: Function returning the current time
+        """
+        self.max_size = max_size
+        self.expiry = {**DEFAULT_EXPIRY, **(expiry or {})}
+        self.time_buckets = {**DEFAULT_TIME_BUCKETS, **(time_buckets or {})}
+        self._clock = clock
+        self._entries: 'OrderedDict[Hashable, Tuple[datetime, str]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters: Counter = Counter()
+
+    @property
+    def stats(self) -> CacheStats:
+        """Get hit, miss and eviction counters"""
+        return CacheStats(self._counters['hits'], self._counters['misses'], self._counters['evictions'])
+
+    def get(self, request_type: RequestType, params: Dict[str, Any]) -> Optional[str]:
+        """
+        Get cached response body.
+        :param request_type: Request type
+        :param params: Query parameters
+        :return: Response body if cached and not expired; None otherwise
+        """
+        key = self.key(request_type, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters['misses'] += 1
+                return None
+
+            expires_at, body = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self._counters['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return body
+
+    def set(self, request_type: RequestType, params: Dict[str, Any], body: str):
+        """
+        Store response body.
+        :param request_type: Request type
+        :param params: Query parameters
+        :param body: Response body
+        """
+        key = self.key(request_type, params)
+        expires_at = self.expiry[request_type](self._clock())
+        with self._lock:
+            self._entries[key] = (expires_at, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def discard(self, request_type: RequestType, params: Dict[str, Any]):
+        """
+        Remove response body from cache.
+        :param request_type: Request type
+        :param params: Query parameters
+        """
+        with self._lock:
+            self._entries.pop(self.key(request_type, params), None)
+
+    def clear(self):
+        """Remove all entries and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+    def key(self, request_type: RequestType, params: Dict[str, Any]) -> Hashable:
+        """
+        Create cache key from query parameters.
+        :param request_type: Request type
+        :param params: Query parameters
+        :return: Normalized key
+        """
+        return _normalize(request_type, params, self.time_buckets[request_type])
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskCache:
+    """
+    Compressed on-disk cache of FMI response bodies.
+
+    Each response is stored to its own file named after the normalized
+    query. Files are written to a temporary file first and then renamed,
+    so concurrent readers in other processes never see partial entries.
+    Expired entries are misses; call prune to remove their files.
+    """
+
+    def __init__(self,
+                 directory: str,
+                 expiry: Optional[Dict[RequestType, Callable[[datetime], datetime]]] = None,
+                 time_buckets: Optional[Dict[RequestType, timedelta]] = None,
+                 compression_level: int = 6,
+                 clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc)):
+        """
+        :param directory: Directory of cache files; created if missing
+        :param expiry: Function returning expiry time of a new entry for each request type
+        :param time_buckets: Rounding of start and end times in cache keys for each request type
+        :param compression_level: Zlib compression level from 1 to 9
+        :param clock: Function returning the current time
+        """
+        # pylint: disable=too-many-arguments
+        self.directory = directory
+        self.expiry = {**DEFAULT_EXPIRY, **(expiry or {})}
+        self.time_buckets = {**DEFAULT_TIME_BUCKETS, **(time_buckets or {})}
+        self.compression_level = compression_level
+        self._clock = clock
+        self._counters: Counter = Counter()
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def stats(self) -> CacheStats:
+        """Get hit, miss and eviction counters of this process"""
+        return CacheStats(self._counters['hits'], self._counters['misses'], self._counters['evictions'])
+
+    def get(self, request_type: RequestType, params: Dict[str, Any]) -> Optional[str]:
+        """
+        Get cached response body.
+        :param request_type: Request type
+        :param params: Query parameters
+        :return: Response body if cached and not expired; None otherwise
+        """
+        path = self.path(request_type, params)
+        try:
+            with open(path, 'rb') as cache_file:
+                data = cache_file.read()
+            expires_at, = _DISK_HEADER.unpack_from(data)
+            if expires_at <= self._clock().timestamp():
+                # Another process may have replaced the entry since it was read, so
+                # expired entries are left for prune to remove
+                self._counters['misses'] += 1
+                return None
+            body = zlib.decompress(data[_DISK_HEADER.size:]).decode('utf-8')
+        except (OSError, struct.error, zlib.error, UnicodeDecodeError):
+            self._counters['misses'] += 1
+            return None
+
+        self._counters['hits'] += 1
+        return body
+
+    def set(self, request_type: RequestType, params: Dict[str, Any], body: str):
+        """
+        Store response body.
+        :param request_type: Request type
+        :param params: Query parameters
+        :param body: Response body
+        """
+        expires_at = self.expiry[request_type](self._clock())
+        data = _DISK_HEADER.pack(expires_at.timestamp()) + zlib.compress(body.encode('utf-8'), self.compression_level)
+
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                temp_file.write(data)
+            os.replace(temp_path, self.path(request_type, params))
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def discard(self, request_type: RequestType, params: Dict[str, Any]):
+        """
+        Remove response body from cache.
+        :param request_type: Request type
+        :param params: Query parameters
+        """
+        try:
+            os.remove(self.path(request_type, params))
+        except FileNotFoundError:
+            pass
+
+    def prune(self):
+        """Remove expired entries"""
+        now = self._clock().timestamp()
+        for name in os.listdir(self.directory):
+            if not name.endswith(_DISK_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, 'rb') as cache_file:
+                    expires_at, = _DISK_HEADER.unpack(cache_file.read(_DISK_HEADER.size))
+                    read = os.fstat(cache_file.fileno())
+                if expires_at <= now and _same_file(read, os.stat(path)):
+                    self._remove(path)
+            except (OSError, struct.error):
+                continue
+
+    def clear(self):
+        """Remove all entries and reset counters"""
+        for name in os.listdir(self.directory):
+            if name.endswith(_DISK_SUFFIX):
+                self._remove(os.path.join(self.directory, name))
+        self._counters.clear()
+
+    def path(self, request_type: RequestType, params: Dict[str, Any]) -> str:
+        """
+        Get path of the cache file of a query.
+        :param request_type: Request type
+        :param params: Query parameters
+        :return: Path of the cache file
+        """
+        key = _normalize(request_type, params, self.time_buckets[request_type])
+        digest = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest + _DISK_SUFFIX)
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+            self._counters['evictions'] += 1
+        except FileNotFoundError:
+            pass
+
+
+def _same_file(first: os.stat_result, second: os.stat_result) -> bool:
+    """Check that a path still refers to the file that was read; os.replace swaps in a new file"""
+    return (first.st_dev, first.st_ino, first.st_mtime_ns) == (second.st_dev, second.st_ino, second.st_mtime_ns)
+
+
+def _normalize(request_type: RequestType, params: Dict[str, Any], bucket: timedelta) -> Hashable:
+    """Create cache key from query parameters with start and end time rounded down to bucket"""
+    items = []
+    for name, value in sorted(params.items()):
+        if name in ('starttime', 'endtime'):
+            value = _floor(datetime.fromisoformat(value), bucket).isoformat()
+        elif isinstance(value, list):
+            value = tuple(value)
+        items.append((name, value))
+    return request_type, tuple(items)
+
+
+def _floor(time: datetime, step: timedelta) -> datetime:
+    """Round time down to a multiple of step counted from the epoch"""
+    return _EPOCH + (time - _EPOCH) // step * step
@@ -0,0 +1,115 @@
+import math
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+# Mean length of a degree of latitude in kilometers
+_KM_PER_DEGREE = 111.195
+
+# Distance between HARMONIE grid points in kilometers
+HARMONIE_GRID_SPACING_KM = 2.5
+
+Coordinates = Tuple[float, float]
+
+
+class GridIndex:
+    """
+    Spatial index of known forecast model grid points.
+
+    Learns which grid point FMI service returns for requested coordinates.
+    A grid point is the nearest one for every location closer to it than
+    half of the grid spacing, so such locations can be snapped to the known
+    point without asking FMI service. Points are kept in buckets of about
+    the snapping radius, so a lookup only checks the neighbouring buckets.
+    Grid points returned for locations outside the radius are remembered
+    for the max_learned most recently used locations.
+    """
+
+    def __init__(self, radius_km: float = HARMONIE_GRID_SPACING_KM / 2 * 0.9, max_learned: int = 4096):
+        """
+        :param radius_km: Distance within which locations are snapped to a known grid point
+        :param max_learned: Maximum number of remembered locations outside the radius
+        """
+        if radius_km <= 0:
+            raise ValueError(f"Invalid radius_km {radius_km}")
+        self.radius_km = radius_km
+        self.max_learned = max_learned
+        self._cell = radius_km / _KM_PER_DEGREE
+        self._buckets: Dict[Tuple[int, int], List[Coordinates]] = defaultdict(list)
+        self._learned: 'OrderedDict[Coordinates, Coordinates]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def snap(self, lat: float, lon: float) -> Optional[Coordinates]:
+        """
+        Find the grid point of a location.
+        :param lat: Latitude
+        :param lon: Longitude
+        :return: Latitude and longitude of the grid point if known; None otherwise
+        """
+        with self._lock:
+            learned = self._learned.get((lat, lon))
+            if learned is not None:
+                self._learned.move_to_end((lat, lon))
+                return learned
+
+            nearest = None
+            nearest_distance = self.radius_km
+            for key in self._neighbours(lat, lon):
+                for point in self._buckets.get(key, ()):
+                    distance = _distance_km((lat, lon), point)
+                    if distance < nearest_distance:
+                        nearest, nearest_distance = point, distance
+            return nearest
+
+    def add(self, lat: float, lon: float, grid_lat: float, grid_lon: float):
+        """
+        Store grid point returned for a location.
+        :param lat: Requested latitude
+        :param lon: Requested longitude
+        :param grid_lat: Latitude of the returned grid point
+        :param grid_lon: Longitude of the returned grid point
+        """
+        point = (grid_lat, grid_lon)
+        with self._lock:
+            if _distance_km((lat, lon), point) >= self.radius_km and self.max_learned > 0:
+                self._learned[(lat, lon)] = point
+                self._learned.move_to_end((lat, lon))
+                while len(self._learned) > self.max_learned:
+                    self._learned.popitem(last=False)
+            bucket = self._buckets[self._key(grid_lat, grid_lon)]
+            if point not in bucket:
+                bucket.append(point)
+
+    def clear(self):
+        """Forget all grid points"""
+        with self._lock:
+            self._buckets.clear()
+            self._learned.clear()
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self._buckets.values())
+
+    def _key(self, lat: float, lon: float) -> Tuple[int, int]:
+        row = math.floor(lat / self._cell)
+        return row, math.floor(lon / self._lon_cell(row))
+
+    def _lon_cell(self, row: int) -> float:
+        """Get width of buckets in a row, so that they are about as wide as they are high"""
+        latitude = math.radians(min(89.0, abs((row + 0.5) * self._cell)))
+        return self._cell / math.cos(latitude)
+
+    def _neighbours(self, lat: float, lon: float) -> List[Tuple[int, int]]:
+        row = math.floor(lat / self._cell)
+        keys = []
+        for neighbour_row in (row - 1, row, row + 1):
+            column = math.floor(lon / self._lon_cell(neighbour_row))
+            keys.extend((neighbour_row, neighbour_column) for neighbour_column in (column - 1, column, column + 1))
+        return keys
+
+
+def _distance_km(first: Coordinates, second: Coordinates) -> float:
+    """Get approximate distance between nearby points using equirectangular projection"""
+    mean_latitude = math.radians((first[0] + second[0]) / 2)
+    dlat = second[0] - first[0]
+    dlon = (second[1] - first[1]) * math.cos(mean_latitude)
+    return math.hypot(dlat, dlon) * _KM_PER_DEGREE
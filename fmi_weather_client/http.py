@@ -1,153 +1,705 @@
 import logging
+import time
 from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple, Union
 
 import requests
 import xmltodict
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from fmi_weather_client import instrumentation, retry
 from fmi_weather_client.errors import ClientError, ServerError
+from fmi_weather_client.grid import GridIndex
+from fmi_weather_client.models import DERIVED_PARAMETERS, FIELD_PARAMETERS, OBSERVATION_PARAMETERS
+from fmi_weather_client.parsers import stream
+from fmi_weather_client.places import PlaceCache
+from fmi_weather_client.singleflight import SingleFlight, call_key
+from fmi_weather_client.stale import StaleWhileRevalidate
+from fmi_weather_client.throttle import Throttle
+
+if TYPE_CHECKING:
+    from fmi_weather_client.cache import DiskCache, ResponseCache
 
 _LOGGER = logging.getLogger(__name__)
 
+URL = 'http://opendata.fmi.fi/wfs'
+
+# Length of forecasts requested when no time range is given
+FORECAST_HORIZON = timedelta(days=4)
+
+# Length of observation history requested when no time range is given
+OBSERVATION_HISTORY = timedelta(hours=1)
+
+# Parameters available in HARMONIE forecasts, in request order
+FORECAST_PARAMETERS = [
+    'Temperature', 'DewPoint', 'Pressure', 'Humidity', 'WindDirection', 'WindSpeedMS',
+    'WindUMS', 'WindVMS', 'WindGust', 'WeatherSymbol3', 'TotalCloudCover', 'LowCloudCover',
+    'MediumCloudCover', 'HighCloudCover', 'Precipitation1h', 'RadiationGlobalAccumulation',
+    'RadiationNetSurfaceSWAccumulation', 'RadiationNetSurfaceLWAccumulation', 'GeopHeight', 'LandSeaMask',
+]
+
 
 class RequestType(Enum):
     """Possible request types"""
     WEATHER = 0
     FORECAST = 1
+    OBSERVATION = 2
+
+
+# Stored query of each request type
+STORED_QUERIES = {
+    RequestType.WEATHER: 'fmi::forecast::harmonie::surface::point::multipointcoverage',
+    RequestType.FORECAST: 'fmi::forecast::harmonie::surface::point::multipointcoverage',
+    RequestType.OBSERVATION: 'fmi::observations::weather::multipointcoverage',
+}
+
+
+class FMIClient:
+    """
+    HTTP client for FMI service.
+
+    Holds a requests session so that connections are kept alive and
+    reused between requests instead of doing a new handshake every time.
+    """
+
+    def __init__(self,
+                 pool_size: int = 10,
+                 timeout: float = 10,
+                 max_retries: Union[int, Retry] = 0,
+                 session: Optional[requests.Session] = None,
+                 throttle: Optional[Throttle] = None,
+                 *,
+                 url: str = URL):
+        """
+        :param pool_size: Maximum number of connections kept open to FMI service
+        :param timeout: Timeout of a single request in seconds
+        :param max_retries: Number of retries or urllib3 retry policy for failed connections
+        :param session: Session to use; a new session is created if None
+        :param throttle: Rate and concurrency limits of requests; unlimited if None
+        :param url: URL of FMI WFS service
+        """
+        # pylint: disable=too-many-arguments
+        self.url = url
+        self.timeout = timeout
+        self.throttle = throttle
+        self.session = session if session is not None else requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=max_retries)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, params: Dict[str, Any]) -> str:
+        """
+        Send a request to FMI service and return the body
+        :param params: Query parameters
+        :return: Response body
+        """
+        _LOGGER.debug("GET request to %s. Parameters: %s", self.url, params)
+        started = time.perf_counter()
+        response = self._send(params)
+        if instrumentation.enabled():
+            _record_response(response, time.perf_counter() - started)
+
+        if response.status_code == 200:
+            _LOGGER.debug("GET response from %s in %d ms. Status: %d.",
+                          self.url,
+                          response.elapsed.total_seconds() * 1000,
+                          response.status_code)
+        else:
+            _handle_errors(response)
+
+        return response.text
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+    def _send(self, params: Dict[str, Any]) -> requests.Response:
+        if self.throttle is None:
+            return self.session.get(self.url, params=params, timeout=self.timeout)
+
+        self.throttle.acquire()
+        status_code = None
+        try:
+            response = self.session.get(self.url, params=params, timeout=self.timeout)
+            status_code = response.status_code
+            return response
+        finally:
+            self.throttle.release(status_code)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+_DEFAULT_CLIENT: Optional[FMIClient] = None
+
+
+def get_default_client() -> FMIClient:
+    """
+    Get the client used by the module level request functions.
+    :return: Default client
+    """
+    global _DEFAULT_CLIENT  # pylint: disable=global-statement
+    if _DEFAULT_CLIENT is None:
+        _DEFAULT_CLIENT = FMIClient()
+    return _DEFAULT_CLIENT
+
+
+def set_default_client(client: Optional[FMIClient]):
+    """
+    Set the client used by the module level request functions.
+    :param client: Client to use; None restores a default client
+    """
+    global _DEFAULT_CLIENT  # pylint: disable=global-statement
+    _DEFAULT_CLIENT = client
+
+
+_FLIGHTS = SingleFlight()
+
+_CACHE: Optional[Union['ResponseCache', 'DiskCache']] = None
+
+_RETRY_POLICY: Optional[retry.RetryPolicy] = None
+
+_GRID_INDEX: Optional[GridIndex] = None
+
+_PLACE_CACHE: Optional[PlaceCache] = None
+
+_STALE_WEATHER: Optional[StaleWhileRevalidate] = None
+
+
+def get_cache() -> Optional[Union['ResponseCache', 'DiskCache']]:
+    """
+    Get the response cache used by request functions.
+    :return: Response cache; None if caching is disabled
+    """
+    return _CACHE
+
+
+def set_cache(cache: Optional[Union['ResponseCache', 'DiskCache']]):
+    """
+    Set the response cache used by request functions.
+    :param cache: Response cache; None disables caching
+    """
+    global _CACHE  # pylint: disable=global-statement
+    _CACHE = cache
+
+
+def get_grid_index() -> Optional[GridIndex]:
+    """
+    Get the index of known grid points used to snap requested coordinates.
+    :return: Grid index; None if coordinates are sent as requested
+    """
+    return _GRID_INDEX
+
+
+def set_grid_index(index: Optional[GridIndex]):
+    """
+    Set the index of known grid points used to snap requested coordinates.
+    Coordinates close to a known grid point are replaced with the grid point,
+    so that requests for nearby locations share cache entries.
+    :param index: Grid index; None sends coordinates as requested
+    """
+    global _GRID_INDEX  # pylint: disable=global-statement
+    _GRID_INDEX = index
 
 
-def request_weather_by_coordinates(lat: float, lon: float) -> str:
+def unique_grid_points(coordinates: Sequence[Tuple[float, float]]) -> Tuple[List[Tuple[float, float]], List[int]]:
+    """
+    Snap coordinates to known grid points and leave out duplicates.
+    Forecasts of a batch request are returned for the unique points only.
+    :param coordinates: Latitude and longitude pairs
+    :return: Unique points in order of first appearance, and index of the point of each coordinate pair
+    """
+    points: Dict[Tuple[float, float], int] = {}
+    indices = [points.setdefault(_snap(lat, lon), len(points)) for lat, lon in coordinates]
+    return list(points), indices
+
+
+def get_place_cache() -> Optional[PlaceCache]:
+    """
+    Get the cache of places that place names have been resolved to.
+    :return: Place cache; None if place names are always sent to FMI service
+    """
+    return _PLACE_CACHE
+
+
+def set_place_cache(cache: Optional[PlaceCache]):
+    """
+    Set the cache of places that place names have been resolved to.
+    Forecasts for known place names are requested by coordinates.
+    :param cache: Place cache; None always sends place names to FMI service
+    """
+    global _PLACE_CACHE  # pylint: disable=global-statement
+    _PLACE_CACHE = cache
+
+
+def get_stale_while_revalidate() -> Optional[StaleWhileRevalidate]:
+    """
+    Get the store serving the last good weather information while it is refreshed.
+    :return: Store; None if weather information is always fetched before returning
+    """
+    return _STALE_WEATHER
+
+
+def set_stale_while_revalidate(store: Optional[StaleWhileRevalidate]):
+    """
+    Set the store serving the last good weather information while it is refreshed.
+    Weather functions return the stored weather immediately and refresh it
+    in the background, also when FMI service fails.
+    :param store: Store; None always fetches weather information before returning
+    """
+    global _STALE_WEATHER  # pylint: disable=global-statement
+    _STALE_WEATHER = store
+
+
+def get_retry_policy() -> Optional[retry.RetryPolicy]:
+    """
+    Get the retry policy used by request functions.
+    :return: Retry policy; None if failed requests are not retried
+    """
+    return _RETRY_POLICY
+
+
+def set_retry_policy(policy: Optional[retry.RetryPolicy]):
+    """
+    Set the retry policy used by request functions.
+    :param policy: Retry policy; None disables retries
+    """
+    global _RETRY_POLICY  # pylint: disable=global-statement
+    _RETRY_POLICY = policy
+
+
+def request_weather_by_coordinates(lat: float, lon: float, parameters: Optional[Iterable[str]] = None) -> str:
     """
     Get the latest weather information by coordinates.
 
     :param lat: Latitude (e.g. 25.67087)
     :param lon: Longitude (e.g. 62.39758)
+    :param parameters: WeatherData fields or FMI parameters to request; all if None
     :return: Latest weather information
     """
-    params = _create_params(RequestType.WEATHER, 10, lat=lat, lon=lon)
-    return _send_request(params)
+    params = _create_params(RequestType.WEATHER, 10, lat=lat, lon=lon, parameters=parameters)
+    return _send_request(params, RequestType.WEATHER)
 
 
-def request_weather_by_place(place: str) -> str:
+def request_weather_by_place(place: str, parameters: Optional[Iterable[str]] = None) -> str:
     """
     Get the latest weather information by place name.
 
     :param place: Place name (e.g. Kaisaniemi, Helsinki)
+    :param parameters: WeatherData fields or FMI parameters to request; all if None
     :return: Latest weather information
     """
-    params = _create_params(RequestType.WEATHER, 10, place=place)
-    return _send_request(params)
+    params = _create_params(RequestType.WEATHER, 10, place=place, parameters=parameters)
+    return _send_request(params, RequestType.WEATHER)
 
 
-def request_forecast_by_coordinates(lat: float, lon: float, timestep_hours: int = 24) -> str:
+def request_forecast_by_coordinates(lat: float,
+                                    lon: float,
+                                    timestep_hours: int = 24,
+                                    parameters: Optional[Iterable[str]] = None,
+                                    *,
+                                    time_range: Optional[Tuple[datetime, datetime]] = None) -> str:
     """
     Get the latest forecast by place coordinates
 
     :param lat: Latitude (e.g. 25.67087)
     :param lon: Longitude (e.g. 62.39758)
     :param timestep_hours: Forecast steps in hours
+    :param parameters: WeatherData fields or FMI parameters to request; all if None
+    :param time_range: Start and end time of forecast; FORECAST_HORIZON from now if None
     :return: Forecast response
     """
     timestep_minutes = timestep_hours * 60
-    params = _create_params(RequestType.FORECAST, timestep_minutes, lat=lat, lon=lon)
-    return _send_request(params)
+    params = _create_params(RequestType.FORECAST, timestep_minutes, lat=lat, lon=lon, parameters=parameters,
+                            time_range=time_range)
+    return _send_request(params, RequestType.FORECAST, exact_times=time_range is not None)
 
 
-def request_forecast_by_place(place: str, timestep_hours: int = 24) -> str:
+def request_forecast_by_place(place: str,
+                              timestep_hours: int = 24,
+                              parameters: Optional[Iterable[str]] = None) -> str:
     """
     Get the latest forecast by place name
 
     :param place: Place name (e.g. Kaisaniemi,Helsinki)
     :param timestep_hours: Forecast steps in hours
+    :param parameters: WeatherData fields or FMI parameters to request; all if None
     :return: Forecast response
     """
     timestep_minutes = timestep_hours * 60
-    params = _create_params(RequestType.FORECAST, timestep_minutes, place=place)
-    return _send_request(params)
+    params = _create_params(RequestType.FORECAST, timestep_minutes, place=place, parameters=parameters)
+    return _send_request(params, RequestType.FORECAST)
+
+
+def request_forecasts_by_coordinates(coordinates: Sequence[Tuple[float, float]],
+                                     timestep_hours: int = 24,
+                                     parameters: Optional[Iterable[str]] = None) -> str:
+    """
+    Get the latest forecasts for multiple coordinates in a single request
+
+    :param coordinates: Latitude and longitude pairs
+    :param timestep_hours: Forecast steps in hours
+    :param parameters: WeatherData fields or FMI parameters to request; all if None
+    :return: Forecast response with one location per point of unique_grid_points
+    """
+    timestep_minutes = timestep_hours * 60
+    params = _create_batch_params(RequestType.FORECAST, timestep_minutes, coordinates=coordinates,
+                                  parameters=parameters)
+    return _send_request(params, RequestType.FORECAST)
+
+
+def request_forecasts_by_places(places: Sequence[str],
+                                timestep_hours: int = 24,
+                                parameters: Optional[Iterable[str]] = None) -> str:
+    """
+    Get the latest forecasts for multiple place names in a single request
+
+    :param places: Place names (e.g. Kaisaniemi,Helsinki)
+    :param timestep_hours: Forecast steps in hours
+    :param parameters: WeatherData fields or FMI parameters to request; all if None
+    :return: Forecast response with one location per place
+    """
+    timestep_minutes = timestep_hours * 60
+    params = _create_batch_params(RequestType.FORECAST, timestep_minutes, places=places, parameters=parameters)
+    return _send_request(params, RequestType.FORECAST)
+
+
+def request_observations_by_station_ids(station_ids: Sequence[int],
+                                        timestep_minutes: int = 10,
+                                        parameters: Optional[Iterable[str]] = None,
+                                        *,
+                                        time_range: Optional[Tuple[datetime, datetime]] = None) -> str:
+    """
+    Get the latest observations of multiple weather stations in a single request
+
+    :param station_ids: FMI station ids (fmisid, e.g. 100971)
+    :param timestep_minutes: Observation steps in minutes
+    :param parameters: WeatherData fields or FMI observation parameters to request; all if None
+    :param time_range: Start and end time of observations; OBSERVATION_HISTORY until now if None
+    :return: Observation response with one location per station
+    """
+    params = _create_station_params(station_ids, timestep_minutes, parameters, time_range)
+    return _send_request(params, RequestType.OBSERVATION, exact_times=time_range is not None)
+
+
+def resolve_parameters(parameters: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    Resolve FMI parameters to request.
+
+    WeatherData field names are converted to FMI parameters and fields that
+    are calculated while parsing are replaced with the parameters they are
+    calculated from. Fields that are not available in HARMONIE forecasts
+    are skipped.
+    :param parameters: WeatherData fields or FMI parameters; all parameters if None
+    :return: FMI parameters in request order
+    """
+    if parameters is None:
+        return list(FORECAST_PARAMETERS)
+
+    names = [parameters] if isinstance(parameters, str) else list(parameters)
+    selected = set()
+    for name in names:
+        parameter = FIELD_PARAMETERS[name][0] if name in FIELD_PARAMETERS else name
+        if parameter in DERIVED_PARAMETERS:
+            selected.update(DERIVED_PARAMETERS[parameter])
+        elif parameter in FORECAST_PARAMETERS or name in FIELD_PARAMETERS:
+            selected.add(parameter)
+        else:
+            raise ValueError(f"Unknown parameter {name}")
+
+    resolved = [parameter for parameter in FORECAST_PARAMETERS if parameter in selected]
+    if not resolved:
+        raise ValueError(f"None of parameters {names} is available in forecasts")
+    return resolved
+
+
+def resolve_observation_parameters(parameters: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    Resolve FMI observation parameters to request.
+
+    WeatherData field names are converted to the observation parameters
+    they are read from and fields that are calculated while parsing are
+    replaced with the parameters they are calculated from.
+    :param parameters: WeatherData fields or FMI observation parameters; all parameters if None
+    :return: FMI observation parameters in request order
+    """
+    if parameters is None:
+        return list(OBSERVATION_PARAMETERS)
+
+    observed = {forecast_parameter: parameter for parameter, forecast_parameter in OBSERVATION_PARAMETERS.items()}
+    names = [parameters] if isinstance(parameters, str) else list(parameters)
+    selected = set()
+    for name in names:
+        parameter = FIELD_PARAMETERS[name][0] if name in FIELD_PARAMETERS else name
+        if parameter in DERIVED_PARAMETERS:
+            selected.update(observed[derived] for derived in DERIVED_PARAMETERS[parameter])
+        elif parameter in observed:
+            selected.add(observed[parameter])
+        elif parameter in OBSERVATION_PARAMETERS or name in FIELD_PARAMETERS:
+            selected.add(parameter)
+        else:
+            raise ValueError(f"Unknown parameter {name}")
+
+    resolved = [parameter for parameter in OBSERVATION_PARAMETERS if parameter in selected]
+    if not resolved:
+        raise ValueError(f"None of parameters {names} is available in observations")
+    return resolved
 
 
 def _create_params(request_type: RequestType,
                    timestep_minutes: int,
                    place: Optional[str] = None,
                    lat: Optional[float] = None,
-                   lon: Optional[float] = None) -> Dict[str, Any]:
+                   lon: Optional[float] = None,
+                   *,
+                   parameters: Optional[Iterable[str]] = None,
+                   time_range: Optional[Tuple[datetime, datetime]] = None) -> Dict[str, Any]:
     """
     Create query parameters
     :param timestep_minutes: Timestamp minutes
     :param place: Place name
     :param lat: Latitude
     :param lon: Longitude
+    :param parameters: WeatherData fields or FMI parameters to request; all if None
+    :param time_range: Start and end time; default window of the request type if None
     :return: Parameters
     """
+    # pylint: disable=too-many-arguments
 
     if place is None and lat is None and lon is None:
         raise ValueError("Missing location parameter")
 
+    params = _create_base_params(request_type, timestep_minutes, parameters, time_range)
+
+    if lat is not None and lon is not None:
+        params['latlon'] = _format_latlon(*_snap(lat, lon))
+
+    if place is not None:
+        params['place'] = _normalize_place(place)
+
+    return params
+
+
+def _create_batch_params(request_type: RequestType,
+                         timestep_minutes: int,
+                         places: Sequence[str] = (),
+                         coordinates: Sequence[Tuple[float, float]] = (),
+                         parameters: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Create query parameters for multiple locations
+    :param timestep_minutes: Timestamp minutes
+    :param places: Place names
+    :param coordinates: Latitude and longitude pairs
+    :param parameters: WeatherData fields or FMI parameters to request; all if None
+    :return: Parameters with repeated location values
+    """
+    if not places and not coordinates:
+        raise ValueError("Missing location parameter")
+
+    params = _create_base_params(request_type, timestep_minutes, parameters)
+
+    if coordinates:
+        params['latlon'] = [_format_latlon(lat, lon) for lat, lon in unique_grid_points(coordinates)[0]]
+
+    if places:
+        params['place'] = [_normalize_place(place) for place in places]
+
+    return params
+
+
+def _create_station_params(station_ids: Sequence[int],
+                           timestep_minutes: int,
+                           parameters: Optional[Iterable[str]] = None,
+                           time_range: Optional[Tuple[datetime, datetime]] = None) -> Dict[str, Any]:
+    """
+    Create observation query parameters for multiple weather stations
+    :param station_ids: FMI station ids
+    :param timestep_minutes: Timestamp minutes
+    :param parameters: WeatherData fields or FMI observation parameters to request; all if None
+    :param time_range: Start and end time; OBSERVATION_HISTORY until now if None
+    :return: Parameters with repeated station ids
+    """
+    if not station_ids:
+        raise ValueError("Missing station_ids parameter")
+
+    params = _create_base_params(RequestType.OBSERVATION, timestep_minutes, parameters, time_range)
+    params['fmisid'] = [str(int(station_id)) for station_id in station_ids]
+    return params
+
+
+def _create_base_params(request_type: RequestType,
+                        timestep_minutes: int,
+                        parameters: Optional[Iterable[str]] = None,
+                        time_range: Optional[Tuple[datetime, datetime]] = None) -> Dict[str, Any]:
+    """
+    Create query parameters shared by all locations
+    :param timestep_minutes: Timestamp minutes
+    :param parameters: WeatherData fields or FMI parameters to request; all if None
+    :param time_range: Start and end time; default window of the request type if None
+    :return: Parameters without location
+    """
     if request_type is RequestType.WEATHER:
         end_time = datetime.utcnow().replace(tzinfo=timezone.utc)
         start_time = end_time - timedelta(minutes=10)
     elif request_type is RequestType.FORECAST:
         start_time = datetime.utcnow().replace(tzinfo=timezone.utc)
-        end_time = start_time + timedelta(days=4)
+        end_time = start_time + FORECAST_HORIZON
+    elif request_type is RequestType.OBSERVATION:
+        end_time = datetime.utcnow().replace(tzinfo=timezone.utc)
+        start_time = end_time - OBSERVATION_HISTORY
     else:
         raise ValueError(f"Invalid request_type {request_type}")
 
-    params = {
+    if time_range is not None:
+        start_time, end_time = (time.astimezone(timezone.utc) for time in time_range)
+
+    if request_type is RequestType.OBSERVATION:
+        resolved = resolve_observation_parameters(parameters)
+    else:
+        resolved = resolve_parameters(parameters)
+
+    return {
         'service': 'WFS',
         'version': '2.0.0',
         'request': 'getFeature',
-        'storedquery_id': 'fmi::forecast::harmonie::surface::point::multipointcoverage',
+        'storedquery_id': STORED_QUERIES[request_type],
         'timestep': timestep_minutes,
         'starttime': start_time.isoformat(timespec='seconds'),
         'endtime': end_time.isoformat(timespec='seconds'),
-        'parameters': (
-            'Temperature,DewPoint,Pressure,Humidity,WindDirection,WindSpeedMS,'
-            'WindUMS,WindVMS,WindGust,WeatherSymbol3,TotalCloudCover,LowCloudCover,'
-            'MediumCloudCover,HighCloudCover,Precipitation1h,RadiationGlobalAccumulation,'
-            'RadiationNetSurfaceSWAccumulation,RadiationNetSurfaceLWAccumulation,GeopHeight,LandSeaMask'
-        )
+        'parameters': ','.join(resolved),
     }
 
-    if lat is not None and lon is not None:
-        params['latlon'] = f'{lat},{lon}'
 
-    if place is not None:
-        params['place'] = place.strip().replace(' ', '')
+def _snap(lat: float, lon: float) -> Tuple[float, float]:
+    """Replace coordinates with a known grid point near them"""
+    index = _GRID_INDEX
+    if index is None:
+        return lat, lon
+    return index.snap(lat, lon) or (lat, lon)
 
-    return params
+
+def _format_latlon(lat: float, lon: float) -> str:
+    return f'{lat},{lon}'
 
 
-def _send_request(params: Dict[str, Any]) -> str:
+def _learn_grid_point(params: Dict[str, Any], body: str) -> Optional[Dict[str, Any]]:
     """
-    Send a request to FMI service and return the body
+    Store grid point returned for a single coordinate request to the grid index.
     :param params: Query parameters
-    :return: Response body
+    :param body: Response body
+    :return: Query parameters with coordinates of the grid point if they differ from the requested ones
     """
-    url = 'http://opendata.fmi.fi/wfs'
+    index = _GRID_INDEX
+    latlon = params.get('latlon')
+    if index is None or not isinstance(latlon, str):
+        return None
 
-    _LOGGER.debug("GET request to %s. Parameters: %s", url, params)
-    response = requests.get(url, params=params, timeout=10)
+    point = stream.first_point(body)
+    if point is None or not point.pos:
+        return None
 
-    if response.status_code == 200:
-        _LOGGER.debug("GET response from %s in %d ms. Status: %d.",
-                      url,
-                      response.elapsed.microseconds / 1000,
-                      response.status_code)
-    else:
-        _handle_errors(response)
+    lat, lon = map(float, latlon.split(','))
+    grid_lat, grid_lon = map(float, point.pos.split()[:2])
+    index.add(lat, lon, grid_lat, grid_lon)
+    if (grid_lat, grid_lon) == (lat, lon):
+        return None
+    return {**params, 'latlon': _format_latlon(grid_lat, grid_lon)}
 
-    return response.text
+
+def _normalize_place(place: str) -> str:
+    return place.strip().replace(' ', '')
+
+
+def _send_request(params: Dict[str, Any], request_type: RequestType, *, exact_times: bool = False) -> str:
+    """
+    Send a request to FMI service using the default client and return the body.
+    Identical requests sent concurrently from multiple threads share a single
+    request. Response is served from the response cache when available.
+    :param params: Query parameters
+    :param request_type: Request type
+    :param exact_times: Share only requests with the same start and end time, as given by the caller
+    :return: Response body
+    """
+    return _FLIGHTS.do(flight_key(request_type, params, exact_times), lambda: _fetch(params, request_type))
+
+
+def flight_key(request_type: RequestType, params: Dict[str, Any], exact_times: bool = False) -> Hashable:
+    """
+    Create key identifying identical requests in flight.
+    Start and end times of default windows are left out, as requests in
+    flight at the same time differ only by the time they were created.
+    :param request_type: Request type
+    :param params: Query parameters
+    :param exact_times: Keep start and end time in the key; set when they were given by the caller
+    :return: Key
+    """
+    if exact_times:
+        return call_key(request_type, params)
+    return call_key(request_type, {name: value for name, value in params.items()
+                                   if name not in ('starttime', 'endtime')})
+
+
+def _fetch(params: Dict[str, Any], request_type: RequestType) -> str:
+    """Get response body from the response cache or from FMI service"""
+    cache = _CACHE
+    if cache is None:
+        body = _get(params)
+        _learn_grid_point(params, body)
+        return body
+
+    body = cache.get(request_type, params)
+    if body is None:
+        body = _get(params)
+        _store(cache, request_type, params, body)
+    return body
+
+
+def _store(cache: Union['ResponseCache', 'DiskCache'], request_type: RequestType, params: Dict[str, Any], body: str):
+    """Store response to cache, also for the grid point if coordinates were snapped to it"""
+    cache.set(request_type, params, body)
+    grid_params = _learn_grid_point(params, body)
+    if grid_params is not None:
+        cache.set(request_type, grid_params, body)
+
+
+def _get(params: Dict[str, Any]) -> str:
+    """Send a request using the default client, retrying it according to the retry policy"""
+    client = get_default_client()
+    policy = _RETRY_POLICY
+    if policy is None:
+        return client.get(params)
+    return retry.call(lambda: client.get(params), policy)
+
+
+def _record_response(response: requests.Response, duration: float):
+    """Emit spans and counters of a response read in duration seconds"""
+    # Elapsed time of requests ends when response headers have been parsed
+    wait = response.elapsed.total_seconds()
+    instrumentation.record_span(instrumentation.SPAN_HTTP_WAIT, wait)
+    instrumentation.record_span(instrumentation.SPAN_HTTP_TRANSFER, max(0.0, duration - wait))
+    instrumentation.record_span(instrumentation.SPAN_HTTP_REQUEST, duration, status_code=response.status_code)
+    instrumentation.count(instrumentation.COUNTER_BYTES_RECEIVED, len(response.content))
 
 
 def _handle_errors(response: requests.Response):
     """Handle error responses from FMI service"""
-    if 400 <= response.status_code < 500:
-        data = xmltodict.parse(response.text)
+    _raise_error(response.status_code, response.text)
+
+
+def _raise_error(status_code: int, body: str):
+    """Raise error matching the status code of FMI service response"""
+    instrumentation.count(instrumentation.COUNTER_ERRORS, status_code=status_code)
+    if 400 <= status_code < 500:
+        data = xmltodict.parse(body)
         try:
             error_message = data['ExceptionReport']['Exception']['ExceptionText'][0]
-            raise ClientError(response.status_code, error_message)
+            raise ClientError(status_code, error_message)
         except (KeyError, IndexError) as err:
-            raise ClientError(response.status_code, response.text) from err
+            raise ClientError(status_code, body) from err
 
-    raise ServerError(response.status_code, response.text)
+    raise ServerError(status_code, body)
@@ -0,0 +1,167 @@
+import logging
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple, TypeVar
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar('_T')
+
+# Spans. Durations are reported in seconds.
+SPAN_HTTP_REQUEST = 'fmi.http.request'  # Whole request from sending to reading the body
+SPAN_HTTP_DNS = 'fmi.http.dns'  # Resolving host name (asynchronous requests only)
+SPAN_HTTP_CONNECT = 'fmi.http.connect'  # Opening a new connection (asynchronous requests only)
+SPAN_HTTP_WAIT = 'fmi.http.wait'  # Sending request until response headers; includes DNS and connect for sync requests
+SPAN_HTTP_TRANSFER = 'fmi.http.transfer'  # Reading response body
+SPAN_PARSE_XML = 'fmi.parse.xml'  # Reading elements of response XML
+SPAN_PARSE_DECODE = 'fmi.parse.decode'  # Decoding times and values to columns
+SPAN_PARSE_BUILD = 'fmi.parse.build'  # Creating weather data rows from columns
+
+# Counters
+COUNTER_BYTES_RECEIVED = 'fmi.http.bytes_received'
+COUNTER_ERRORS = 'fmi.http.errors'  # Error responses, with status_code attribute
+COUNTER_ROWS_PARSED = 'fmi.parse.rows'
+COUNTER_NAN_ROWS_DROPPED = 'fmi.parse.nan_rows_dropped'
+
+# Callback receiving name, value and attributes of a span or a counter
+Callback = Callable[[str, float, Dict[str, Any]], None]
+
+
+class Listener(NamedTuple):
+    """
+    Callbacks receiving instrumentation events.
+
+    on_span is called with the span name, duration in seconds and attributes
+    when a span ends. on_counter is called with the counter name, increment
+    and attributes. Callbacks are called in the thread that emitted the event.
+    """
+    on_span: Optional[Callback] = None
+    on_counter: Optional[Callback] = None
+
+
+_LISTENERS: Tuple[Listener, ...] = ()
+_LOCK = threading.Lock()
+
+# Returned by span when there are no listeners
+_NO_SPAN = nullcontext()
+
+
+def add_listener(listener: Listener):
+    """
+    Start sending events to listener.
+    :param listener: Listener
+    """
+    global _LISTENERS  # pylint: disable=global-statement
+    with _LOCK:
+        _LISTENERS = (*_LISTENERS, listener)
+
+
+def remove_listener(listener: Listener):
+    """
+    Stop sending events to listener.
+    :param listener: Listener added with add_listener
+    """
+    global _LISTENERS  # pylint: disable=global-statement
+    with _LOCK:
+        _LISTENERS = tuple(added for added in _LISTENERS if added is not listener)
+
+
+def enabled() -> bool:
+    """
+    Check if events are sent anywhere.
+    Events that are expensive to measure are emitted only when enabled.
+    :return: True if there are listeners; False otherwise
+    """
+    return bool(_LISTENERS)
+
+
+def span(name: str, **attributes):
+    """
+    Measure duration of a with block as a span.
+    :param name: Span name
+    :param attributes: Span attributes
+    :return: Context manager
+    """
+    if not _LISTENERS:
+        return _NO_SPAN
+    return _Span(name, attributes)
+
+
+def record_span(name: str, duration: float, **attributes):
+    """
+    Emit a span measured elsewhere.
+    :param name: Span name
+    :param duration: Duration in seconds
+    :param attributes: Span attributes
+    """
+    _emit('on_span', name, duration, attributes)
+
+
+def count(name: str, value: float = 1, **attributes):
+    """
+    Increment a counter.
+    :param name: Counter name
+    :param value: Increment
+    :param attributes: Counter attributes
+    """
+    _emit('on_counter', name, value, attributes)
+
+
+def timed_iter(name: str, iterable: Iterable[_T], **attributes) -> Iterator[_T]:
+    """
+    Measure the total time spent producing items of an iterable as a span.
+    Time spent by the consumer between items is not included.
+    :param name: Span name
+    :param iterable: Iterable to measure
+    :param attributes: Span attributes
+    :return: Iterator of the same items
+    """
+    if not _LISTENERS:
+        return iter(iterable)
+    return _timed_iter(name, iter(iterable), attributes)
+
+
+class _Span:
+    """Context manager emitting its duration when it exits"""
+    __slots__ = ('name', 'attributes', 'started')
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        _emit('on_span', self.name, time.perf_counter() - self.started, self.attributes)
+
+
+def _timed_iter(name: str, iterator: Iterator[_T], attributes: Dict[str, Any]) -> Iterator[_T]:
+    duration = 0.0
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                duration += time.perf_counter() - started
+            yield item
+    finally:
+        _emit('on_span', name, duration, attributes)
+
+
+def _emit(callback: str, name: str, value: float, attributes: Dict[str, Any]):
+    """Send event to listeners; errors of listeners are logged and ignored"""
+    for listener in _LISTENERS:
+        function = getattr(listener, callback)
+        if function is None:
+            continue
+        try:
+            function(name, value, attributes)
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("Instrumentation listener failed on %s", name)
@@ -1,5 +1,8 @@
-from datetime import datetime
-from typing import List, Optional, NamedTuple
+import struct
+import sys
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, NamedTuple, Sequence, Tuple, Union
 
 
 class FMIPlace(NamedTuple):
@@ -83,3 +86,395 @@ class Forecast(NamedTuple):
     lat: float
     lon: float
     forecasts: List[WeatherData]
+
+    def to_bytes(self, float32: bool = False) -> bytes:
+        """
+        Serialize to compact binary form.
+        Values are stored in columns without units, so all values must have
+        the unit of their field in FIELD_PARAMETERS.
+        :param float32: Store values as 32-bit floats; rounds values, so the round trip is not exact
+        :return: Serialized forecast
+        """
+        columns: Dict[str, Sequence[Optional[float]]] = {}
+        if self.forecasts:
+            fields = list(zip(*self.forecasts))
+            for (field, (parameter, unit)), values in zip(FIELD_PARAMETERS.items(), fields[1:]):
+                if any(value.unit != unit for value in values):
+                    raise ValueError(f"Values of {field} must have unit {unit!r}")
+                column = [value.value for value in values]
+                if any(value is not None for value in column):
+                    columns[parameter] = column
+            times = array('q', (int(time.timestamp()) for time in fields[0]))
+        else:
+            times = array('q')
+        return _pack(FMIPlace(self.place, self.lat, self.lon), times, columns, 'f' if float32 else 'd')
+
+    @staticmethod
+    def from_bytes(data: Union[bytes, bytearray, memoryview]) -> 'Forecast':
+        """
+        Deserialize forecast serialized with to_bytes or ForecastArray.to_bytes.
+        :param data: Serialized forecast
+        :return: Forecast
+        """
+        place, times, columns, missing = _unpack(data)
+        fields = [[datetime.fromtimestamp(timestamp, timezone.utc) for timestamp in times]]
+        for parameter, unit in FIELD_PARAMETERS.values():
+            column = columns.get(parameter)
+            if column is None:
+                fields.append([Value(None, unit)] * len(times))
+                continue
+            values = [Value(value, unit) for value in column]
+            bitmap = missing.get(parameter)
+            if bitmap is not None:
+                values = [Value(None, unit) if _is_missing(bitmap, index) else value
+                          for index, value in enumerate(values)]
+            fields.append(values)
+        return Forecast(place.name, place.lat, place.lon, list(map(WeatherData, *fields)))
+
+
+class ForecastResult(NamedTuple):
+    """Represents the outcome of fetching a forecast for a location"""
+    location: Union[str, Tuple[float, float]]
+    forecast: Optional[Forecast]
+    error: Optional[Exception]
+
+
+class Observation(NamedTuple):
+    """Represents observations of a weather station"""
+    station_id: int
+    place: str
+    lat: float
+    lon: float
+    observations: List[WeatherData]
+
+
+# FMI parameter and unit of each WeatherData field. Some fields were
+# available in HIRLAM forecasts, but are not available in HARMONIE
+# forecasts. These fields are kept for backward compatibility. Value
+# of those fields will always be None.
+FIELD_PARAMETERS: Dict[str, Tuple[str, str]] = {
+    'temperature': ('Temperature', '°C'),
+    'dew_point': ('DewPoint', '°C'),
+    'pressure': ('Pressure', 'hPa'),
+    'humidity': ('Humidity', '%'),
+    'wind_direction': ('WindDirection', '°'),
+    'wind_speed': ('WindSpeedMS', 'm/s'),
+    'wind_u_component': ('WindUMS', 'm/s'),
+    'wind_v_component': ('WindVMS', 'm/s'),
+    'wind_max': ('MaximumWind', 'm/s'),  # Not supported
+    'wind_gust': ('WindGust', 'm/s'),
+    'symbol': ('WeatherSymbol3', ''),
+    'cloud_cover': ('TotalCloudCover', '%'),
+    'cloud_low_cover': ('LowCloudCover', '%'),
+    'cloud_mid_cover': ('MediumCloudCover', '%'),
+    'cloud_high_cover': ('HighCloudCover', '%'),
+    'precipitation_amount': ('Precipitation1h', 'mm/h'),
+    'radiation_short_wave_acc': ('RadiationGlobalAccumulation', 'J/m²'),
+    'radiation_short_wave_surface_net_acc': ('RadiationNetSurfaceSWAccumulation', 'J/m²'),
+    'radiation_long_wave_acc': ('RadiationLWAccumulation', 'J/m²'),  # Not supported
+    'radiation_long_wave_surface_net_acc': ('RadiationNetSurfaceLWAccumulation', 'J/m²'),
+    'radiation_short_wave_diff_surface_acc': ('RadiationDiffuseAccumulation', 'J/m²'),  # Not supported
+    'geopotential_height': ('GeopHeight', 'm'),
+    'land_sea_mask': ('LandSeaMask', ''),  # Not supported
+    # Calculated from other parameters while parsing
+    'feels_like': ('FeelsLike', '°C'),
+}
+
+# FMI parameters that each calculated parameter is calculated from
+DERIVED_PARAMETERS: Dict[str, Tuple[str, ...]] = {
+    'FeelsLike': ('Temperature', 'WindSpeedMS', 'Humidity'),
+}
+
+# FMI parameter of each observed parameter that has a matching WeatherData
+# field. Observations are stored under the forecast parameter names.
+OBSERVATION_PARAMETERS: Dict[str, str] = {
+    't2m': 'Temperature',
+    'td': 'DewPoint',
+    'p_sea': 'Pressure',
+    'rh': 'Humidity',
+    'wd_10min': 'WindDirection',
+    'ws_10min': 'WindSpeedMS',
+    'wg_10min': 'WindGust',
+    'r_1h': 'Precipitation1h',
+}
+
+
+class ForecastArray:
+    """
+    Represents a forecast in columnar form.
+
+    Times are stored as UNIX timestamps and each parameter as a column of
+    floats with NaN for missing values. Parameters that are not available
+    have no column. WeatherData rows are created only when accessed.
+    """
+    __slots__ = ('place', 'lat', 'lon', 'times', 'columns')
+
+    def __init__(self, place: str, lat: float, lon: float, times: array, columns: Dict[str, array]):
+        """
+        :param place: Place name
+        :param lat: Latitude
+        :param lon: Longitude
+        :param times: UNIX timestamps of rows as int64 array or memoryview
+        :param columns: Float64 array or float memoryview of each parameter by FMI parameter name
+        """
+        self.place = place
+        self.lat = lat
+        self.lon = lon
+        self.times = times
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def __getitem__(self, index: int) -> 'WeatherDataView':
+        if index < 0:
+            index += len(self.times)
+        if not 0 <= index < len(self.times):
+            raise IndexError("ForecastArray index out of range")
+        return WeatherDataView(self, index)
+
+    def __iter__(self) -> Iterator['WeatherDataView']:
+        for index in range(len(self.times)):
+            yield WeatherDataView(self, index)
+
+    def __repr__(self) -> str:
+        return f"ForecastArray(place={self.place!r}, lat={self.lat}, lon={self.lon}, rows={len(self)})"
+
+    @property
+    def forecasts(self) -> List['WeatherDataView']:
+        """Get all rows as lazy weather data views"""
+        return list(self)
+
+    def row(self, index: int) -> WeatherData:
+        """
+        Get a row as weather data with all values created.
+        :param index: Row index
+        :return: Weather data
+        """
+        columns = self.columns
+        values = []
+        for parameter, unit in FIELD_PARAMETERS.values():
+            column = columns.get(parameter)
+            values.append(Value(column[index] if column is not None else None, unit))
+
+        time = datetime.fromtimestamp(self.times[index], timezone.utc)
+        return WeatherData(time, *values)
+
+    def to_forecast(self) -> Forecast:
+        """Convert to forecast with materialized weather data rows"""
+        return Forecast(self.place, self.lat, self.lon, [self.row(index) for index in range(len(self.times))])
+
+    def to_bytes(self, float32: bool = False) -> bytes:
+        """
+        Serialize to compact binary form.
+        :param float32: Store values as 32-bit floats; rounds values, so the round trip is not exact
+        :return: Serialized forecast
+        """
+        return _pack(FMIPlace(self.place, self.lat, self.lon), self.times, self.columns, 'f' if float32 else 'd')
+
+    @staticmethod
+    def from_bytes(data: Union[bytes, bytearray, memoryview]) -> 'ForecastArray':
+        """
+        Deserialize forecast serialized with to_bytes or Forecast.to_bytes.
+        Times and columns are memoryviews of data, so nothing is copied. Missing
+        values of a Forecast are read as NaN.
+        :param data: Serialized forecast
+        :return: Columnar forecast
+        """
+        place, times, columns, _ = _unpack(data)
+        return ForecastArray(place.name, place.lat, place.lon, times, columns)
+
+
+# Serialized forecast starts with a header followed by the place name and
+# parameters. After padding to 8 bytes come int64 UNIX timestamps, a float
+# column of each parameter and a bitmap of missing (None) values for each
+# parameter flagged to have one. Numbers are little-endian.
+_BINARY_MAGIC = b'FMIF'
+_BINARY_VERSION = 1
+# Magic, version, float type code, place length, lat, lon, rows, parameter count
+_BINARY_HEADER = struct.Struct('<4sBcHddII')
+# Place length of a forecast without place name
+_NO_PLACE = 0xFFFF
+# Parameter name length and flags
+_BINARY_PARAMETER = struct.Struct('<BB')
+_HAS_MISSING = 1
+
+
+class _Header(NamedTuple):
+    """Header of a serialized forecast"""
+    place: FMIPlace
+    rows: int
+    typecode: str
+    parameters: List[Tuple[str, int]]  # Name and flags
+    offset: int  # Offset of timestamps
+
+
+def _pack(place: FMIPlace,
+          times: Sequence[int],
+          columns: Dict[str, Sequence[Optional[float]]],
+          typecode: str) -> bytes:
+    """Serialize forecast columns; None values are stored as NaN and flagged in a bitmap"""
+    place_bytes = b'' if place.name is None else place.name.encode('utf-8')
+    place_length = _NO_PLACE if place.name is None else len(place_bytes)
+    if len(place_bytes) >= _NO_PLACE:
+        raise ValueError(f"Place name of {len(place_bytes)} bytes is too long")
+    parts = [_BINARY_HEADER.pack(_BINARY_MAGIC, _BINARY_VERSION, typecode.encode('ascii'), place_length,
+                                 place.lat, place.lon, len(times), len(columns)), place_bytes]
+    bitmaps = []
+    for parameter, column in columns.items():
+        bitmap = _missing_bitmap(column)
+        name = parameter.encode('utf-8')
+        parts.append(_BINARY_PARAMETER.pack(len(name), _HAS_MISSING if bitmap else 0))
+        parts.append(name)
+        if bitmap:
+            bitmaps.append(bitmap)
+
+    parts.append(bytes(-sum(map(len, parts)) % 8))
+    parts.append(_little_endian(array('q', times)))
+    nan = float('nan')
+    for column in columns.values():
+        if _typecode(column) == typecode:
+            parts.append(_little_endian(column))
+        else:
+            parts.append(_little_endian(array(typecode, (nan if value is None else value for value in column))))
+    parts.extend(bitmaps)
+    return b''.join(parts)
+
+
+def _unpack(data: Union[bytes, bytearray, memoryview]) \
+        -> Tuple[FMIPlace, Sequence[int], Dict[str, Sequence[float]], Dict[str, memoryview]]:
+    """Deserialize forecast to place, times, columns and bitmaps of missing values"""
+    view = memoryview(data).cast('B')
+    header = _unpack_header(view)
+    rows, typecode = header.rows, header.typecode
+    item_size = struct.calcsize(typecode)
+    bitmap_size = (rows + 7) // 8
+    size = header.offset + rows * 8 + len(header.parameters) * rows * item_size \
+        + sum(bitmap_size for _, flags in header.parameters if flags & _HAS_MISSING)
+    if len(view) < size:
+        raise ValueError("Serialized forecast is truncated")
+
+    offset = header.offset
+    times = _native(view[offset:offset + rows * 8], 'q')
+    offset += rows * 8
+    columns = {}
+    for parameter, _ in header.parameters:
+        columns[parameter] = _native(view[offset:offset + rows * item_size], typecode)
+        offset += rows * item_size
+    missing = {}
+    for parameter, flags in header.parameters:
+        if flags & _HAS_MISSING:
+            missing[parameter] = view[offset:offset + bitmap_size]
+            offset += bitmap_size
+    return header.place, times, columns, missing
+
+
+def _unpack_header(view: memoryview) -> _Header:
+    try:
+        magic, version, typecode, place_length, lat, lon, rows, count = _BINARY_HEADER.unpack_from(view)
+        if magic != _BINARY_MAGIC:
+            raise ValueError("Data is not a serialized forecast")
+        if version != _BINARY_VERSION:
+            raise ValueError(f"Unsupported serialized forecast version {version}")
+        typecode = typecode.decode('ascii')
+        if typecode not in ('d', 'f'):
+            raise ValueError(f"Unsupported value type {typecode!r}")
+
+        offset = _BINARY_HEADER.size
+        place = None
+        if place_length != _NO_PLACE:
+            place = str(view[offset:offset + place_length], 'utf-8')
+            offset += place_length
+        parameters = []
+        for _ in range(count):
+            name_length, flags = _BINARY_PARAMETER.unpack_from(view, offset)
+            offset += _BINARY_PARAMETER.size
+            parameters.append((str(view[offset:offset + name_length], 'utf-8'), flags))
+            offset += name_length
+    except struct.error as err:
+        raise ValueError("Serialized forecast is truncated") from err
+
+    return _Header(FMIPlace(place, lat, lon), rows, typecode, parameters, offset + -offset % 8)
+
+
+def _missing_bitmap(column: Sequence[Optional[float]]) -> Optional[bytearray]:
+    """Create bitmap with a bit set for each None value; None if there are no None values"""
+    if isinstance(column, (array, memoryview)):
+        return None
+    bitmap = None
+    for index, value in enumerate(column):
+        if value is None:
+            if bitmap is None:
+                bitmap = bytearray((len(column) + 7) // 8)
+            bitmap[index >> 3] |= 1 << (index & 7)
+    return bitmap
+
+
+def _typecode(column: Sequence[Optional[float]]) -> Optional[str]:
+    if isinstance(column, array):
+        return column.typecode
+    if isinstance(column, memoryview):
+        return column.format
+    return None
+
+
+def _is_missing(bitmap: Optional[memoryview], index: int) -> bool:
+    return bitmap is not None and bool(bitmap[index >> 3] & (1 << (index & 7)))
+
+
+def _little_endian(values: Union[array, memoryview]) -> bytes:
+    if sys.byteorder == 'little':
+        return values.tobytes()
+    values = array(_typecode(values), values)
+    values.byteswap()
+    return values.tobytes()
+
+
+def _native(view: memoryview, typecode: str) -> Sequence:
+    """View little-endian bytes as numbers without copying on little-endian platforms"""
+    if sys.byteorder == 'little':
+        return view.cast(typecode)
+    values = array(typecode, view.tobytes())
+    values.byteswap()
+    return values
+
+
+class WeatherDataView:
+    """
+    Represents a weather as a lazy view of a ForecastArray row.
+
+    Has the same attributes as WeatherData. Values are created only when
+    an attribute is accessed.
+    """
+    __slots__ = ('forecast', 'index')
+
+    def __init__(self, forecast: ForecastArray, index: int):
+        self.forecast = forecast
+        self.index = index
+
+    @property
+    def time(self) -> datetime:
+        """Time of the row"""
+        return datetime.fromtimestamp(self.forecast.times[self.index], timezone.utc)
+
+    def to_weather_data(self) -> WeatherData:
+        """Create weather data with all values of the row"""
+        return self.forecast.row(self.index)
+
+    def __repr__(self) -> str:
+        return f"WeatherDataView(time={self.time.isoformat()}, place={self.forecast.place!r})"
+
+
+def _view_property(parameter: str, unit: str) -> property:
+    def get_value(view: WeatherDataView) -> Value:
+        column = view.forecast.columns.get(parameter)
+        return Value(column[view.index] if column is not None else None, unit)
+
+    get_value.__doc__ = f"{parameter} ({unit})" if unit else parameter
+    return property(get_value)
+
+
+# Units are shared by all views through the interned unit table
+for _field, (_parameter, _unit) in FIELD_PARAMETERS.items():
+    FIELD_PARAMETERS[_field] = (_parameter, sys.intern(_unit))
+    setattr(WeatherDataView, _field, _view_property(_parameter, FIELD_PARAMETERS[_field][1]))
@@ -1,33 +1,101 @@
 import logging
+from array import array
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from itertools import compress, repeat
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import math
 import xmltodict
 
-from fmi_weather_client.models import FMIPlace, Forecast, Value, WeatherData
+from fmi_weather_client import instrumentation
+from fmi_weather_client.models import (DERIVED_PARAMETERS, FIELD_PARAMETERS, FMIPlace, Forecast, ForecastArray, Value,
+                                       WeatherData)
+from fmi_weather_client.parsers import stream
 
 _LOGGER = logging.getLogger(__name__)
 
+# Parameters read directly from response, in WeatherData field order
+_MEASURED_PARAMETERS = [(parameter, unit) for field, (parameter, unit) in FIELD_PARAMETERS.items()
+                        if field != 'feels_like']
 
-def parse_forecast(body: str):
+# Constants of feels like temperature formulas
+_CHILL_TEMPERATURE = 1 - 15/37
+_CHILL_WIND = 15/37
+_SIMMER_REFERENCE = 0.55*(1-0.5)*26
+_SIMMER_DIVISOR = 1.8*(1 - 0.55*(1-0.5))
+
+
+def parse_forecast(body: str) -> Forecast:
     """
-    Parse FMI forecast response body to dictionary and check errors
+    Parse FMI forecast response body to forecast
     :param body: Forecast response body
-    :return: Response body as dictionary
+    :return: Forecast
     """
-    data = xmltodict.parse(body)
+    forecast = parse_forecast_array(body)
+    with instrumentation.span(instrumentation.SPAN_PARSE_BUILD):
+        return forecast.to_forecast()
 
-    station = _get_place(data)
-    _LOGGER.debug("Received place: %s (%d, %d)", station.name, station.lat, station.lon)
 
-    times = _get_datetimes(data)
-    _LOGGER.debug("Received time points: %d", len(times))
+def parse_forecasts(body: str) -> List[Forecast]:
+    """
+    Parse FMI forecast response body with one or more locations to forecasts
+    :param body: Forecast response body
+    :return: Forecast for each location in response order
+    """
+    forecasts = parse_forecast_arrays(body)
+    with instrumentation.span(instrumentation.SPAN_PARSE_BUILD):
+        return [forecast.to_forecast() for forecast in forecasts]
+
+
+def parse_forecast_array(body: str) -> ForecastArray:
+    """
+    Parse FMI forecast response body to columnar forecast
+    :param body: Forecast response body
+    :return: Columnar forecast
+    """
+    for member in instrumentation.timed_iter(instrumentation.SPAN_PARSE_XML, stream.iter_members(body)):
+        return create_member_arrays(member, member.points[:1])[0]
+
+    raise ValueError("Response does not contain forecast data")
+
+
+def parse_forecast_arrays(body: str) -> List[ForecastArray]:
+    """
+    Parse FMI forecast response body with one or more locations to columnar forecasts
+    :param body: Forecast response body
+    :return: Columnar forecast for each location in response order
+    """
+    forecasts = []
+    for member in instrumentation.timed_iter(instrumentation.SPAN_PARSE_XML, stream.iter_members(body)):
+        forecasts.extend(create_member_arrays(member, member.points))
+    return forecasts
 
-    types = _get_value_types(data)
-    _LOGGER.debug("Received types: %d", len(types))
 
-    value_sets = _get_values(data)
+def parse_forecast_xmltodict(body: str) -> Forecast:
+    """
+    Parse FMI forecast response body to forecast using xmltodict.
+
+    Produces the same result as parse_forecast, but builds a full
+    dictionary tree of the response first.
+    :param body: Forecast response body
+    :return: Forecast
+    """
+    with instrumentation.span(instrumentation.SPAN_PARSE_XML):
+        data = xmltodict.parse(body)
+    with instrumentation.span(instrumentation.SPAN_PARSE_DECODE):
+        place, times, types, values = _get_place(data), _get_datetimes(data), _get_value_types(data), _get_values(data)
+    with instrumentation.span(instrumentation.SPAN_PARSE_BUILD):
+        return _create_forecast(place, times, types, values)
+
+
+def _create_forecast(station: FMIPlace,
+                     times: List[datetime],
+                     types: List[str],
+                     value_sets: List[List[float]]) -> Forecast:
+    """Combine decoded response parts to forecast"""
+    _LOGGER.debug("Received place: %s (%d, %d)", station.name, station.lat, station.lon)
+    _LOGGER.debug("Received time points: %d", len(times))
+    _LOGGER.debug("Received types: %d", len(types))
     _LOGGER.debug("Received value sets: %d", len(value_sets))
 
     # Combine values with types
@@ -38,35 +106,168 @@ def parse_forecast(body: str):
             typed_value_set[types[idx]] = value
         typed_value_sets.append(typed_value_set)
 
+    # Calculate feels like temperature for the whole series at once
+    def column(name: str) -> Optional[List[float]]:
+        if name not in types:
+            return None
+        index = types.index(name)
+        return [value_set[index] for value_set in value_sets]
+
+    feels_like = None
+    if all(name in types for name in DERIVED_PARAMETERS['FeelsLike']):
+        feels_like = _feels_like_series(column('Temperature'), column('WindSpeedMS'),
+                                        column('Humidity'), column('RadiationGlobal'))
+
     # Combine typed values with times
     forecasts = []
     for idx, time in enumerate(times):
         if _is_non_empty_forecast(typed_value_sets[idx]):
-            forecasts.append(_create_weather_data(time, typed_value_sets[idx]))
+            forecasts.append(_create_weather_data(time, typed_value_sets[idx],
+                                                  feels_like[idx] if feels_like is not None else None))
 
     _LOGGER.debug("Received non-empty value sets: %d", len(forecasts))
 
     return Forecast(station.name, station.lat, station.lon, forecasts)
 
 
+def create_member_arrays(member: stream.CoverageMember,
+                         points: List[stream.CoveragePoint]) -> List[ForecastArray]:
+    """
+    Decode member values in one pass and split them to a columnar forecast for each point
+    :param member: Multipoint coverage member
+    :param points: Points of the member to create forecasts for
+    :return: Columnar forecast for each point
+    """
+    with instrumentation.span(instrumentation.SPAN_PARSE_DECODE):
+        return _decode_member_arrays(member, points)
+
+
+def _decode_member_arrays(member: stream.CoverageMember,
+                          points: List[stream.CoveragePoint]) -> List[ForecastArray]:
+    width = len(member.fields)
+    values = array('d', map(float, member.values.split()))
+    positions = member.positions.split()
+    times = array('q', map(int, positions[2::3]))
+    if len(values) != len(times) * width:
+        raise ValueError(f"Expected {len(times) * width} values, received {len(values)}")
+
+    empty = _empty_rows(values, width, len(times))
+    if instrumentation.enabled():
+        instrumentation.count(instrumentation.COUNTER_NAN_ROWS_DROPPED, sum(empty) if empty is not None else 0)
+
+    if len(member.points) == 1 or len(times) == 0:
+        ranges = [(0, len(times))] * len(member.points)
+    else:
+        # Rows of all points are in the same block, one run of rows after
+        # another in the order of the points. Points may share coordinates,
+        # so runs are told apart by their position in the block.
+        ranges = _point_ranges(positions, times)
+        if len(ranges) != len(member.points):
+            raise ValueError(f"Expected rows of {len(member.points)} points, received {len(ranges)}")
+
+    forecasts = []
+    for point, point_range in zip(points, ranges):
+        station_times, columns = _select_rows(times, member.fields, values, [point_range], empty)
+        forecasts.append(_create_forecast_array(_place_from_pos(point.name, point.pos), station_times, columns))
+    return forecasts
+
+
+def _empty_rows(values: array, width: int, rows: int) -> Optional[List[bool]]:
+    """Find rows with only NaN values; None if there are no such rows"""
+    if width == 0 or not any(map(math.isnan, values)):
+        return None
+
+    isnan = math.isnan
+    empty = [True] * rows
+    for col in range(width):
+        empty = [row_empty and isnan(value) for row_empty, value in zip(empty, values[col::width])]
+    return empty if any(empty) else None
+
+
+def _point_ranges(positions: List[str], times: array) -> List[Tuple[int, int]]:
+    """
+    Find start and end row of each point in one pass.
+    A new point starts when coordinates change or time does not increase.
+    """
+    ranges = []
+    lats, lons = positions[0::3], positions[1::3]
+    start = 0
+    for row in range(1, len(times) + 1):
+        if row == len(times) or lats[row] != lats[row - 1] or lons[row] != lons[row - 1] \
+                or times[row] <= times[row - 1]:
+            ranges.append((start, row))
+            start = row
+    return ranges
+
+
+def _select_rows(times: array,
+                 types: List[str],
+                 values: array,
+                 ranges: List[Tuple[int, int]],
+                 empty: Optional[List[bool]]) -> Tuple[array, Dict[str, array]]:
+    """Slice row ranges of flat value buffer to columns, leaving out empty rows"""
+    width = len(types)
+    if len(ranges) == 1 and ranges[0] == (0, len(times)) and empty is None:
+        return times, {name: values[col::width] for col, name in enumerate(types)}
+
+    selected_times = array('q')
+    columns = {name: array('d') for name in types}
+    for start, end in ranges:
+        keep = None if empty is None else [not row_empty for row_empty in empty[start:end]]
+        if keep is None or all(keep):
+            selected_times.extend(times[start:end])
+            for col, name in enumerate(types):
+                columns[name].extend(values[start * width + col:end * width:width])
+        else:
+            selected_times.extend(compress(times[start:end], keep))
+            for col, name in enumerate(types):
+                columns[name].extend(compress(values[start * width + col:end * width:width], keep))
+    return selected_times, columns
+
+
+def _create_forecast_array(station: FMIPlace, times: array, columns: Dict[str, array]) -> ForecastArray:
+    """Create columnar forecast of selected rows"""
+    if all(name in columns for name in DERIVED_PARAMETERS['FeelsLike']):
+        columns['FeelsLike'] = _feels_like_column(columns)
+
+    _LOGGER.debug("Received place: %s (%d, %d)", station.name, station.lat, station.lon)
+    _LOGGER.debug("Received non-empty value sets: %d", len(times))
+    if instrumentation.enabled():
+        instrumentation.count(instrumentation.COUNTER_ROWS_PARSED, len(times))
+
+    return ForecastArray(station.name, station.lat, station.lon, times, columns)
+
+
+def _feels_like_column(columns: Dict[str, array]) -> array:
+    return array('d', _feels_like_series(columns['Temperature'], columns.get('WindSpeedMS'),
+                                         columns.get('Humidity'), columns.get('RadiationGlobal')))
+
+
 def _get_place(data: Dict[str, Any]) -> FMIPlace:
     place_data = (data['wfs:FeatureCollection']['wfs:member']['omso:GridSeriesObservation']
                       ['om:featureOfInterest']['sams:SF_SpatialSamplingFeature']['sams:shape']
                       ['gml:MultiPoint']['gml:pointMembers']['gml:Point'])
 
-    coordinates = place_data['gml:pos'].split(' ', 1)
+    return _place_from_pos(place_data['gml:name'], place_data['gml:pos'])
+
+
+def _place_from_pos(name: str, pos: str) -> FMIPlace:
+    coordinates = pos.strip().split(' ', 1)
     lat = float(coordinates[0])
     lon = float(coordinates[1])
 
-    return FMIPlace(place_data['gml:name'], lat, lon)
+    return FMIPlace(name, lat, lon)
 
 
 def _get_datetimes(data: Dict[str, Any]) -> List[datetime]:
+    return _decode_datetimes(data['wfs:FeatureCollection']['wfs:member']['omso:GridSeriesObservation']
+                                 ['om:result']['gmlcov:MultiPointCoverage']['gml:domainSet']
+                                 ['gmlcov:SimpleMultiPoint']['gmlcov:positions'])
+
+
+def _decode_datetimes(positions: str) -> List[datetime]:
     result = []
-    forecast_datetimes = (data['wfs:FeatureCollection']['wfs:member']['omso:GridSeriesObservation']
-                              ['om:result']['gmlcov:MultiPointCoverage']['gml:domainSet']
-                              ['gmlcov:SimpleMultiPoint']['gmlcov:positions'].split('\n'))
-    for forecast_datetime in forecast_datetimes:
+    for forecast_datetime in positions.strip().split('\n'):
         parts = forecast_datetime.strip().replace('  ', ' ').split(' ')
         timestamp = datetime.utcfromtimestamp(int(parts[2])).replace(tzinfo=timezone.utc)
         result.append(timestamp)
@@ -79,6 +280,8 @@ def _get_value_types(data) -> List[str]:
     value_types = (data['wfs:FeatureCollection']['wfs:member']['omso:GridSeriesObservation']
                        ['om:result']['gmlcov:MultiPointCoverage']['gmlcov:rangeType']['swe:DataRecord']
                        ['swe:field'])
+    if isinstance(value_types, dict):
+        value_types = [value_types]
 
     for value_type in value_types:
         result.append(value_type['@name'])
@@ -87,12 +290,14 @@ def _get_value_types(data) -> List[str]:
 
 
 def _get_values(data: Dict[str, Any]) -> List[List[float]]:
-    result = []
-    value_sets = (data['wfs:FeatureCollection']['wfs:member']['omso:GridSeriesObservation']
-                      ['om:result']['gmlcov:MultiPointCoverage']['gml:rangeSet']['gml:DataBlock']
-                      ['gml:doubleOrNilReasonTupleList'].split('\n'))
+    return _decode_values(data['wfs:FeatureCollection']['wfs:member']['omso:GridSeriesObservation']
+                              ['om:result']['gmlcov:MultiPointCoverage']['gml:rangeSet']['gml:DataBlock']
+                              ['gml:doubleOrNilReasonTupleList'])
+
 
-    for forecast_value_set in value_sets:
+def _decode_values(tuple_list: str) -> List[List[float]]:
+    result = []
+    for forecast_value_set in tuple_list.strip().split('\n'):
         forecast_values = forecast_value_set.strip().split(' ')
         value_set = []
         for value in forecast_values:
@@ -103,44 +308,12 @@ def _get_values(data: Dict[str, Any]) -> List[List[float]]:
     return result
 
 
-def _create_weather_data(time, values: Dict[str, float]) -> WeatherData:
-    """Create weather data from raw values"""
-
-    def to_value(vals: Dict[str, float], variable_name: str, unit: str) -> Value:
-        value = vals.get(variable_name, None)
-        return Value(value, unit)
-
-    # Some fields were available in HIRLAM forecasts, but are not
-    # available in HARMONIE forecasts. These fields are kept here
-    # for backward compatibility. Value of those fields will
-    # always be None.
-    return WeatherData(
-        time=time,
-        temperature=to_value(values, 'Temperature', '°C'),
-        dew_point=to_value(values, 'DewPoint', '°C'),
-        pressure=to_value(values, 'Pressure', 'hPa'),
-        humidity=to_value(values, 'Humidity', '%'),
-        wind_direction=to_value(values, 'WindDirection', '°'),
-        wind_speed=to_value(values, 'WindSpeedMS', 'm/s'),
-        wind_u_component=to_value(values, 'WindUMS', 'm/s'),
-        wind_v_component=to_value(values, 'WindVMS', 'm/s'),
-        wind_max=to_value(values, 'MaximumWind', 'm/s'),  # Not supported
-        wind_gust=to_value(values, 'WindGust', 'm/s'),
-        symbol=to_value(values, 'WeatherSymbol3', ''),
-        cloud_cover=to_value(values, 'TotalCloudCover', '%'),
-        cloud_low_cover=to_value(values, 'LowCloudCover', '%'),
-        cloud_mid_cover=to_value(values, 'MediumCloudCover', '%'),
-        cloud_high_cover=to_value(values, 'HighCloudCover', '%'),
-        precipitation_amount=to_value(values, 'Precipitation1h', 'mm/h'),
-        radiation_short_wave_acc=to_value(values, 'RadiationGlobalAccumulation', 'J/m²'),
-        radiation_short_wave_surface_net_acc=to_value(values, 'RadiationNetSurfaceSWAccumulation', 'J/m²'),
-        radiation_long_wave_acc=to_value(values, 'RadiationLWAccumulation', 'J/m²'),  # Not supported
-        radiation_long_wave_surface_net_acc=to_value(values, 'RadiationNetSurfaceLWAccumulation', 'J/m²'),
-        radiation_short_wave_diff_surface_acc=to_value(values, 'RadiationDiffuseAccumulation', 'J/m²'),  # Not supported
-        geopotential_height=to_value(values, 'GeopHeight', 'm'),
-        land_sea_mask=to_value(values, 'LandSeaMask', ''),  # Not supported
-        feels_like=Value(_feels_like(values), '°C')
-        )
+def _create_weather_data(time, values: Dict[str, float], feels_like: Optional[float]) -> WeatherData:
+    """Create weather data from raw values and calculated feels like temperature"""
+    get = values.get
+    return WeatherData(time,
+                       *[Value(get(parameter, None), unit) for parameter, unit in _MEASURED_PARAMETERS],
+                       feels_like=Value(feels_like, '°C'))
 
 
 def _feels_like(vals: Dict[str, float]) -> float:
@@ -175,6 +348,43 @@ def _feels_like(vals: Dict[str, float]) -> float:
     return feels
 
 
+def _feels_like_series(temperature: Optional[Sequence[float]],
+                       wind_speed: Optional[Sequence[float]],
+                       humidity: Optional[Sequence[float]],
+                       radiation: Optional[Sequence[float]]) -> Optional[List[float]]:
+    """
+    Calculate feels like temperature for a whole series at once.
+    Uses the same formulas as _feels_like in a single pass over the
+    series, without looking values up by parameter name for each row.
+    :param temperature: Temperatures; None if not available
+    :param wind_speed: Wind speeds; None if not available
+    :param humidity: Humidities in percents; None if not available
+    :param radiation: Global radiation; None if not available
+    :return: Feels like temperatures; None if temperature is not available
+    """
+    if temperature is None:
+        return None
+    if wind_speed is None or humidity is None:
+        return list(temperature)
+
+    feels = []
+    append = feels.append
+    for temp, speed, humid, rad in zip(temperature, wind_speed, humidity, radiation or repeat(None)):
+        if speed < 0.0:
+            append(temp)
+            continue
+
+        chill = 15 + _CHILL_TEMPERATURE*temp + _CHILL_WIND*pow(speed+1, 0.16)*(temp-37)
+        heat = (1.8*temp - 0.55*(1-humid/100.0) * (1.8*temp - 26) - _SIMMER_REFERENCE) / _SIMMER_DIVISOR \
+            if temp > 14.5 else temp
+        feel = temp + (chill - temp) + (heat - temp)
+        if rad is not None:
+            feel += 0.7 * 0.07 * rad / (speed + 10) - 0.25
+        append(feel)
+
+    return feels
+
+
 def _summer_simmer(temperature: float, humidity_percent: float):
     if temperature <= 14.5:
         return temperature
@@ -0,0 +1,38 @@
+from typing import List
+
+from fmi_weather_client import instrumentation
+from fmi_weather_client.models import OBSERVATION_PARAMETERS, Observation
+from fmi_weather_client.parsers import forecast, stream
+
+# Prefix of point ids in FMI responses (e.g. point-100971)
+_POINT_PREFIX = 'point-'
+
+
+def parse_observations(body: str) -> List[Observation]:
+    """
+    Parse FMI observation response body with one or more stations to observations.
+
+    Observed parameters are stored in WeatherData fields of the matching
+    forecast parameters. Rows without any observed value are skipped.
+    :param body: Observation response body
+    :return: Observations of each station in response order
+    """
+    observations = []
+    for member in instrumentation.timed_iter(instrumentation.SPAN_PARSE_XML, stream.iter_members(body)):
+        renamed = member._replace(fields=[OBSERVATION_PARAMETERS.get(field, field) for field in member.fields])
+        arrays = forecast.create_member_arrays(renamed, member.points)
+        with instrumentation.span(instrumentation.SPAN_PARSE_BUILD):
+            for point, array in zip(member.points, arrays):
+                observations.append(Observation(_station_id(member, point), array.place, array.lat, array.lon,
+                                                array.to_forecast().forecasts))
+    return observations
+
+
+def _station_id(member: stream.CoverageMember, point: stream.CoveragePoint) -> int:
+    """Get FMI station id (fmisid) of a point"""
+    identifier = member.identifiers.get(point.point_id)
+    if identifier is None and point.point_id and point.point_id.startswith(_POINT_PREFIX):
+        identifier = point.point_id[len(_POINT_PREFIX):]
+    if identifier is None:
+        raise ValueError(f"Station id of point {point.point_id} not found")
+    return int(identifier)
@@ -0,0 +1,117 @@
+from typing import Dict, Iterator, List, NamedTuple, Optional
+from xml.etree.ElementTree import XMLPullParser
+
+_GML = '{http://www.opengis.net/gml/3.2}'
+_GMLCOV = '{http://www.opengis.net/gmlcov/1.0}'
+_SWE = '{http://www.opengis.net/swe/2.0}'
+_WFS = '{http://www.opengis.net/wfs/2.0}'
+_TARGET = '{http://xml.fmi.fi/namespace/om/atmosphericfeatures/1.1}'
+_XLINK = '{http://www.w3.org/1999/xlink}'
+
+_TAG_MEMBER = f'{_WFS}member'
+_TAG_POINT = f'{_GML}Point'
+_TAG_NAME = f'{_GML}name'
+_TAG_POS = f'{_GML}pos'
+_TAG_ID = f'{_GML}id'
+_TAG_POSITIONS = f'{_GMLCOV}positions'
+_TAG_FIELD = f'{_SWE}field'
+_TAG_VALUES = f'{_GML}doubleOrNilReasonTupleList'
+_TAG_LOCATION = f'{_TARGET}Location'
+_TAG_IDENTIFIER = f'{_GML}identifier'
+_TAG_REPRESENTATIVE_POINT = f'{_TARGET}representativePoint'
+_ATTR_HREF = f'{_XLINK}href'
+
+# Size of the slices fed to the XML parser. Events are consumed after
+# every slice so that finished elements can be released early.
+_CHUNK_SIZE = 16384
+
+
+class CoveragePoint(NamedTuple):
+    """Represents a gml:Point of a multipoint coverage"""
+    point_id: Optional[str]
+    name: Optional[str]
+    pos: str
+
+
+class CoverageMember(NamedTuple):
+    """Represents raw content of a single wfs:member"""
+    points: List[CoveragePoint]
+    positions: str
+    fields: List[str]
+    values: str
+    # Identifier of the location (e.g. fmisid or geoid) of each point by point id
+    identifiers: Dict[str, str]
+
+
+def iter_members(body: str) -> Iterator[CoverageMember]:
+    """
+    Read multipoint coverage members from response body in a single pass.
+
+    Only location identifiers, point names and positions, coverage
+    positions, field names and the value tuple list are picked up. Everything else is discarded as
+    soon as it has been parsed.
+    :param body: Response body
+    :return: Iterator of members in document order
+    """
+    parser = XMLPullParser(events=('end',))
+    member = _new_member()
+
+    for offset in range(0, len(body), _CHUNK_SIZE):
+        parser.feed(body[offset:offset + _CHUNK_SIZE])
+        for _, elem in parser.read_events():
+            if _collect(member, elem):
+                yield CoverageMember(**member)
+                member = _new_member()
+
+    parser.close()
+
+
+def first_point(body: str) -> Optional[CoveragePoint]:
+    """
+    Read the first coverage point of response body.
+    Parsing stops at the point, which comes before the values.
+    :param body: Response body
+    :return: First point; None if response has no points
+    """
+    parser = XMLPullParser(events=('end',))
+    for offset in range(0, len(body), _CHUNK_SIZE):
+        parser.feed(body[offset:offset + _CHUNK_SIZE])
+        for _, elem in parser.read_events():
+            if elem.tag == _TAG_POINT:
+                return CoveragePoint(elem.get(_TAG_ID), elem.findtext(_TAG_NAME), elem.findtext(_TAG_POS))
+
+    return None
+
+
+def _new_member() -> dict:
+    return {'points': [], 'positions': '', 'fields': [], 'values': '', 'identifiers': {}}
+
+
+def _collect(member: dict, elem) -> bool:
+    """
+    Store element content to member.
+    :return: True if element closed the member; False otherwise
+    """
+    tag = elem.tag
+    if tag == _TAG_FIELD:
+        member['fields'].append(elem.get('name'))
+    elif tag == _TAG_POINT:
+        member['points'].append(CoveragePoint(elem.get(_TAG_ID), elem.findtext(_TAG_NAME), elem.findtext(_TAG_POS)))
+        elem.clear()
+    elif tag == _TAG_LOCATION:
+        point = elem.find(_TAG_REPRESENTATIVE_POINT)
+        identifier = elem.findtext(_TAG_IDENTIFIER)
+        if point is not None and identifier is not None:
+            member['identifiers'][point.get(_ATTR_HREF, '').lstrip('#')] = identifier.strip()
+        elem.clear()
+    elif tag == _TAG_POSITIONS:
+        member['positions'] = elem.text or ''
+        elem.clear()
+    elif tag == _TAG_VALUES:
+        member['values'] = elem.text or ''
+        elem.clear()
+    elif tag == _TAG_MEMBER:
+        elem.clear()
+        return True
+
+    return False
@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, Mapping, Optional
+
+from fmi_weather_client.models import FMIPlace
+
+
+class PlaceCache:
+    """
+    Cache of places FMI service has resolved place names to.
+
+    Names are normalized, so that differences in case and spacing map to
+    the same entry. If a path is given, entries are loaded from the JSON
+    file and the file is rewritten atomically whenever new names are added.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        :param path: JSON file to persist places to; places are kept only in memory if None
+        """
+        self.path = path
+        self._places: Dict[str, FMIPlace] = {}
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            self._places = _load(path)
+
+    def get(self, name: str) -> Optional[FMIPlace]:
+        """
+        Get place resolved for a place name.
+        :param name: Place name (e.g. Kaisaniemi, Helsinki)
+        :return: Place if the name has been resolved; None otherwise
+        """
+        return self._places.get(normalize_name(name))
+
+    def set(self, name: str, place: FMIPlace):
+        """
+        Store place resolved for a place name.
+        :param name: Place name as requested
+        :param place: Place returned by FMI service
+        """
+        self.update({name: place})
+
+    def update(self, places: Mapping[str, FMIPlace]):
+        """
+        Store places resolved for several place names, writing the file only once.
+        :param places: Places returned by FMI service by place names as requested
+        """
+        with self._lock:
+            changed = False
+            for name, place in places.items():
+                key = normalize_name(name)
+                if self._places.get(key) != place:
+                    self._places[key] = place
+                    changed = True
+            if changed and self.path is not None:
+                _save(self.path, self._places)
+
+    def clear(self):
+        """Remove all places"""
+        with self._lock:
+            self._places.clear()
+            if self.path is not None and os.path.exists(self.path):
+                os.remove(self.path)
+
+    def __len__(self):
+        return len(self._places)
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normalize place name for comparison.
+    :param name: Place name (e.g. Kaisaniemi, Helsinki)
+    :return: Name without whitespace in lower case (e.g. kaisaniemi,helsinki)
+    """
+    return ''.join(name.split()).casefold()
+
+
+def _load(path: str) -> Dict[str, FMIPlace]:
+    with open(path, 'r', encoding='utf-8') as places_file:
+        data = json.load(places_file)
+    return {key: FMIPlace(value['name'], value['lat'], value['lon']) for key, value in data.items()}
+
+
+def _save(path: str, places: Dict[str, FMIPlace]):
+    """Write places to a temporary file first and then rename it over path"""
+    data = {key: place._asdict() for key, place in places.items()}
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as temp_file:
+            json.dump(data, temp_file, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
@@ -0,0 +1,174 @@
+import logging
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, List, NamedTuple, Optional, Set, Tuple, Union
+
+from fmi_weather_client import http
+from fmi_weather_client.cache import ModelRunExpiry
+from fmi_weather_client.http import RequestType
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Prefetch(NamedTuple):
+    """Forecast request refreshed by the scheduler"""
+    location: Union[str, Tuple[float, float]]
+    timestep_hours: int = 24
+    parameters: Optional[Tuple[str, ...]] = None
+
+
+class PrefetchScheduler:  # pylint: disable=too-many-instance-attributes
+    """
+    Refresh forecasts of registered locations in the background.
+
+    Forecasts change only when a new model run is published, so forecasts
+    are fetched shortly after each expected publication and stored to the
+    response cache by the request functions. Cache keys of forecasts roll
+    over every forecast time bucket of the cache, so forecasts are fetched
+    also at the start of each time bucket. Requests of a refresh are spread
+    randomly over the jitter window to avoid bursts to FMI service.
+    """
+
+    def __init__(self,
+                 model_runs: ModelRunExpiry = ModelRunExpiry(),
+                 jitter: timedelta = timedelta(minutes=5),
+                 *,
+                 clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+                 rng: Optional[random.Random] = None):
+        """
+        :param model_runs: Interval of model runs and delay of their publication
+        :param jitter: Window that requests of a refresh are spread over
+        :param clock: Function returning the current time
+        :param rng: Random number generator of request times
+        """
+        self.model_runs = model_runs
+        self.jitter = jitter
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._prefetches: Set[Prefetch] = set()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def prefetches(self) -> List[Prefetch]:
+        """Get registered forecast requests"""
+        with self._lock:
+            return list(self._prefetches)
+
+    def add(self,
+            location: Union[str, Tuple[float, float]],
+            timestep_hours: int = 24,
+            parameters: Optional[Iterable[str]] = None) -> Prefetch:
+        """
+        Register a location whose forecasts are refreshed.
+        Use the same arguments as in forecast_by_place_name or forecast_by_coordinates calls.
+        :param location: Place name or latitude and longitude pair
+        :param timestep_hours: Hours between forecasts
+        :param parameters: WeatherData fields to fetch; all fields if None
+        :return: Registered request
+        """
+        if not isinstance(location, str):
+            location = (location[0], location[1])
+        prefetch = Prefetch(location, timestep_hours, None if parameters is None else tuple(parameters))
+        with self._lock:
+            self._prefetches.add(prefetch)
+        return prefetch
+
+    def remove(self, prefetch: Prefetch):
+        """
+        Stop refreshing forecasts of a location.
+        :param prefetch: Request returned by add
+        """
+        with self._lock:
+            self._prefetches.discard(prefetch)
+
+    def next_refresh(self, now: datetime) -> datetime:
+        """
+        Get the time of the next refresh.
+        :param now: Current time
+        :return: Expected publication of the next model run or start of the next forecast time bucket
+        """
+        cache = http.get_cache()
+        refresh = self.model_runs(now)
+        if cache is not None:
+            bucket_start = ModelRunExpiry(cache.time_buckets[RequestType.FORECAST], timedelta(0))(now)
+            refresh = min(refresh, bucket_start)
+        return refresh
+
+    def plan(self, start: datetime) -> List[Tuple[datetime, Prefetch]]:
+        """
+        Spread requests of a refresh randomly over the jitter window.
+        :param start: Time of the refresh
+        :return: Request times and requests in order of time
+        """
+        window = self.jitter.total_seconds()
+        return sorted(((start + timedelta(seconds=self._rng.uniform(0, window)), prefetch)
+                       for prefetch in self.prefetches), key=lambda planned: planned[0])
+
+    def refresh(self, prefetch: Prefetch) -> bool:
+        """
+        Fetch forecast of a registered location to the response cache.
+        The request is the same as in forecast_by_place_name or forecast_by_coordinates,
+        but the response is not parsed.
+        :param prefetch: Registered request
+        :return: True if forecast was fetched; False if fetching failed
+        """
+        location, timestep_hours, parameters = prefetch
+        place_cache = http.get_place_cache()
+        if isinstance(location, str) and place_cache is not None:
+            place = place_cache.get(location)
+            if place is not None:
+                location = (place.lat, place.lon)
+        try:
+            if isinstance(location, str):
+                http.request_forecast_by_place(location, timestep_hours, parameters)
+            else:
+                http.request_forecast_by_coordinates(location[0], location[1], timestep_hours, parameters)
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.warning("Prefetching forecast for %s failed", prefetch.location, exc_info=True)
+            return False
+        return True
+
+    def start(self):
+        """
+        Start refreshing in a background thread.
+        Forecasts are fetched immediately and then after each refresh time.
+        """
+        if http.get_cache() is None:
+            raise ValueError("Prefetching requires a response cache; set one with http.set_cache")
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='fmi-prefetch', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop refreshing and wait for the background thread to finish"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _run(self):
+        start = self._clock()
+        while not self._stopped.is_set():
+            for time, prefetch in self.plan(start):
+                if self._wait_until(time):
+                    return
+                self.refresh(prefetch)
+            start = self.next_refresh(self._clock())
+            if self._wait_until(start):
+                return
+
+    def _wait_until(self, time: datetime) -> bool:
+        """Wait until time; return True if stopped before it"""
+        return self._stopped.wait(max(0.0, (time - self._clock()).total_seconds()))
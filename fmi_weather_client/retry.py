@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent import futures
+from typing import Awaitable, Callable, Deque, NamedTuple, Optional, TypeVar
+
+import aiohttp
+import requests
+
+from fmi_weather_client.errors import ServerError
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar('_T')
+
+# Errors worth another attempt: failed connections, timeouts and 5xx responses
+RETRYABLE_ERRORS = (
+    ServerError,
+    requests.ConnectionError,
+    requests.Timeout,
+    aiohttp.ClientConnectionError,
+    asyncio.TimeoutError,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class Hedging:
+    """
+    Send a duplicate request when the first one is slower than usual.
+
+    Latencies of recent successful requests are recorded. If a request has
+    not been answered when the given percentile of them has elapsed, the
+    same request is sent again and whichever answers first is used.
+    """
+
+    def __init__(self, percentile: float = 95, initial_delay: float = 1.0, window: int = 100, min_samples: int = 10):
+        """
+        :param percentile: Percentile of recent latencies to wait before sending a duplicate
+        :param initial_delay: Seconds to wait before min_samples latencies have been recorded
+        :param window: Number of recent latencies kept
+        :param min_samples: Number of latencies needed before the percentile is used
+        """
+        if not 0 < percentile <= 100:
+            raise ValueError(f"Invalid percentile {percentile}")
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._executor: Optional[futures.ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        """
+        Get seconds to wait for the first request before sending a duplicate.
+        :return: Delay in seconds
+        """
+        latencies = sorted(self._latencies)
+        if len(latencies) < self.min_samples:
+            return self.initial_delay
+        rank = max(0, int(round(self.percentile / 100 * len(latencies))) - 1)
+        return latencies[rank]
+
+    def record(self, latency: float):
+        """
+        Record latency of a successful request.
+        :param latency: Latency in seconds
+        """
+        self._latencies.append(latency)
+
+    def executor(self) -> futures.ThreadPoolExecutor:
+        """Get thread pool running hedged synchronous requests"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = futures.ThreadPoolExecutor(thread_name_prefix='fmi-hedging')
+            return self._executor
+
+
+class RetryPolicy(NamedTuple):
+    """
+    Retry failed requests with exponential backoff and full jitter.
+
+    The delay before retry n is a random time between zero and
+    backoff * 2^(n-1) seconds, at most max_backoff. No retry is started if
+    it could not start before the deadline, counted from the first attempt.
+    """
+    attempts: int = 3
+    backoff: float = 0.5
+    max_backoff: float = 8.0
+    deadline: Optional[float] = 30.0
+    hedging: Optional[Hedging] = None
+
+    def delay(self, retry: int) -> float:
+        """
+        Get delay before a retry.
+        :param retry: Number of the retry starting from 1
+        :return: Delay in seconds
+        """
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (retry - 1)))
+
+    def remaining(self, started: float, now: float) -> Optional[float]:
+        """
+        Get time left before the deadline.
+        :param started: Monotonic time of the first attempt
+        :param now: Current monotonic time
+        :return: Seconds left; None if there is no deadline
+        """
+        if self.deadline is None:
+            return None
+        return self.deadline - (now - started)
+
+
+def call(function: Callable[[], _T], policy: RetryPolicy) -> _T:
+    """
+    Call function, retrying it according to policy.
+    :param function: Function sending a request
+    :param policy: Retry policy
+    :return: Result of the first successful attempt
+    """
+    started = time.monotonic()
+    retry = 0
+    while True:
+        try:
+            if policy.hedging is None:
+                return function()
+            return _call_hedged(function, policy.hedging, policy.remaining(started, time.monotonic()))
+        except RETRYABLE_ERRORS as err:
+            retry += 1
+            delay = _retry_delay(policy, retry, started, err)
+        time.sleep(delay)
+
+
+async def call_async(function: Callable[[], Awaitable[_T]], policy: RetryPolicy) -> _T:
+    """
+    Call coroutine function, retrying it according to policy.
+    :param function: Coroutine function sending a request
+    :param policy: Retry policy
+    :return: Result of the first successful attempt
+    """
+    started = time.monotonic()
+    retry = 0
+    while True:
+        try:
+            if policy.hedging is None:
+                return await function()
+            return await _call_hedged_async(function, policy.hedging, policy.remaining(started, time.monotonic()))
+        except RETRYABLE_ERRORS as err:
+            retry += 1
+            delay = _retry_delay(policy, retry, started, err)
+        await asyncio.sleep(delay)
+
+
+def _retry_delay(policy: RetryPolicy, retry: int, started: float, error: BaseException) -> float:
+    """Get delay before the next retry; raise error if there should be no retry"""
+    delay = policy.delay(retry)
+    remaining = policy.remaining(started, time.monotonic())
+    if retry >= policy.attempts or (remaining is not None and delay >= remaining):
+        raise error
+
+    _LOGGER.debug("Request failed (%r). Retry %d in %.2f s.", error, retry, delay)
+    return delay
+
+
+def _call_hedged(function: Callable[[], _T], hedging: Hedging, timeout: Optional[float]) -> _T:
+    """Call function in a thread and call it again if the first call is slow"""
+    executor = hedging.executor()
+    started = time.monotonic()
+    pending = {executor.submit(_timed, function, hedging)}
+
+    hedge_delay = hedging.delay() if timeout is None else min(hedging.delay(), timeout)
+    done, _ = futures.wait(pending, timeout=hedge_delay)
+    if not done:
+        _LOGGER.debug("No response in %.2f s. Sending hedged request.", hedge_delay)
+        pending.add(executor.submit(_timed, function, hedging))
+
+    error: Optional[BaseException] = None
+    while pending:
+        remaining = None if timeout is None else max(0.0, timeout - (time.monotonic() - started))
+        done, pending = futures.wait(pending, timeout=remaining, return_when=futures.FIRST_COMPLETED)
+        if not done:
+            raise TimeoutError("Request deadline exceeded")
+        for future in done:
+            error = future.exception()
+            if error is None:
+                return future.result()
+
+    raise error
+
+
+async def _call_hedged_async(function: Callable[[], Awaitable[_T]],
+                             hedging: Hedging,
+                             timeout: Optional[float]) -> _T:
+    """Await coroutine function and start it again if the first call is slow"""
+    started = time.monotonic()
+    pending = {asyncio.ensure_future(_timed_async(function, hedging))}
+    try:
+        hedge_delay = hedging.delay() if timeout is None else min(hedging.delay(), timeout)
+        done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+        if not done:
+            _LOGGER.debug("No response in %.2f s. Sending hedged request.", hedge_delay)
+            pending.add(asyncio.ensure_future(_timed_async(function, hedging)))
+
+        error: Optional[BaseException] = None
+        while pending:
+            remaining = None if timeout is None else max(0.0, timeout - (time.monotonic() - started))
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                raise asyncio.TimeoutError("Request deadline exceeded")
+            for task in done:
+                error = task.exception()
+                if error is None:
+                    return task.result()
+
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _timed(function: Callable[[], _T], hedging: Hedging) -> _T:
+    started = time.monotonic()
+    result = function()
+    hedging.record(time.monotonic() - started)
+    return result
+
+
+async def _timed_async(function: Callable[[], Awaitable[_T]], hedging: Hedging) -> _T:
+    started = time.monotonic()
+    result = await function()
+    hedging.record(time.monotonic() - started)
+    return result
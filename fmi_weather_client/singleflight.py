@@ -0,0 +1,133 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+_T = TypeVar('_T')
+
+
+class _Call(Generic[_T]):
+    """Represents a call in flight"""
+    __slots__ = ('_done', '_result', '_error')
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._result: Optional[_T] = None
+        self._error: Optional[BaseException] = None
+
+    def finish(self, result: Optional[_T], error: Optional[BaseException]):
+        """Store outcome of the call and release waiting threads"""
+        self._result = result
+        self._error = error
+        self._done.set()
+
+    def wait(self) -> _T:
+        """Wait for the call to finish and return its result or raise its exception"""
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key to a single call.
+
+    The first caller of a key runs the function. Threads that call with
+    the same key while it is running wait for it and receive the same
+    result or exception. The key is forgotten as soon as the call ends.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, function: Callable[[], _T]) -> _T:
+        """
+        Run function unless a call with the same key is already running.
+        :param key: Key identifying identical calls
+        :param function: Function to call
+        :return: Result of the call in flight
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            return call.wait()
+
+        try:
+            result = function()
+        except BaseException as err:
+            self._finish(key, call, None, err)
+            raise
+        self._finish(key, call, result, None)
+        return result
+
+    def _finish(self, key: Hashable, call: _Call, result: Any, error: Optional[BaseException]):
+        with self._lock:
+            del self._calls[key]
+        call.finish(result, error)
+
+    def __len__(self):
+        return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """
+    Coalesce concurrent coroutines with the same key to a single task.
+
+    The first caller of a key starts a task. Coroutines that call with the
+    same key while the task is running await the same task. Callers await
+    the task through asyncio.shield, so cancelling a caller raises
+    CancelledError only in that caller: the task keeps running and the
+    other callers still get its result. The task runs to completion even
+    if every caller is cancelled.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, function: Callable[[], Awaitable[_T]]) -> _T:
+        """
+        Run coroutine function unless a call with the same key is already running.
+        :param key: Key identifying identical calls
+        :param function: Coroutine function to call
+        :return: Result of the call in flight
+        """
+        loop = asyncio.get_running_loop()
+        task = self._tasks.get(key)
+        if task is None or task.get_loop() is not loop:
+            task = self._tasks[key] = loop.create_task(function())
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            # Mark exception as retrieved even if every caller was cancelled
+            task.exception()
+
+    def __len__(self):
+        return len(self._tasks)
+
+
+def call_key(*parts: Any) -> Hashable:
+    """
+    Create a hashable key from call arguments.
+    Dictionaries are sorted by key and lists are converted to tuples.
+    :param parts: Call arguments
+    :return: Key
+    """
+    return tuple(_freeze(part) for part in parts)
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, dict):
+        return tuple((name, _freeze(item)) for name, item in sorted(value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
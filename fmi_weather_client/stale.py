@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent import futures
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Generic, Hashable, Optional, Set, Tuple, TypeVar
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar('_T')
+
+
+class StaleWhileRevalidate(Generic[_T]):  # pylint: disable=too-many-instance-attributes
+    """
+    Serve the last good result immediately and refresh it in the background.
+
+    A result younger than refresh_after is served as is. An older result is
+    served while a refresh runs in a background thread or task; if the
+    refresh fails, the old result keeps being served. Only results older
+    than max_staleness, and locations without a result, wait for FMI service.
+    """
+
+    def __init__(self,
+                 refresh_after: timedelta = timedelta(minutes=5),
+                 max_staleness: timedelta = timedelta(hours=1),
+                 max_size: int = 1024,
+                 clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc)):
+        """
+        :param refresh_after: Age after which a result is refreshed in the background
+        :param max_staleness: Age after which a result is not served anymore
+        :param max_size: Maximum number of stored results
+        :param clock: Function returning the current time
+        """
+        if max_staleness < refresh_after:
+            raise ValueError(f"max_staleness {max_staleness} is shorter than refresh_after {refresh_after}")
+        self.refresh_after = refresh_after
+        self.max_staleness = max_staleness
+        self.max_size = max_size
+        self._clock = clock
+        self._results: 'OrderedDict[Hashable, Tuple[datetime, _T]]' = OrderedDict()
+        self._refreshing: Set[Hashable] = set()
+        self._tasks: Set[asyncio.Future] = set()
+        self._executor: Optional[futures.ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, fetch: Callable[[], _T]) -> _T:
+        """
+        Get result, fetching it only if there is no result to serve.
+        :param key: Key identifying the request
+        :param fetch: Function fetching a new result
+        :return: Stored or fetched result
+        """
+        stored = self._get_stored(key)
+        if stored is not None:
+            fetched_at, result = stored
+            if self._clock() - fetched_at > self.refresh_after and self._start_refresh(key):
+                self._get_executor().submit(self._refresh, key, fetch)
+            return result
+
+        result = fetch()
+        self._store(key, result)
+        return result
+
+    async def get_async(self, key: Hashable, fetch: Callable[[], Awaitable[_T]]) -> _T:
+        """
+        Get result asynchronously, fetching it only if there is no result to serve.
+        :param key: Key identifying the request
+        :param fetch: Coroutine function fetching a new result
+        :return: Stored or fetched result
+        """
+        stored = self._get_stored(key)
+        if stored is not None:
+            fetched_at, result = stored
+            if self._clock() - fetched_at > self.refresh_after and self._start_refresh(key):
+                task = asyncio.ensure_future(self._refresh_async(key, fetch))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return result
+
+        result = await fetch()
+        self._store(key, result)
+        return result
+
+    def clear(self):
+        """Remove all results"""
+        with self._lock:
+            self._results.clear()
+
+    def __len__(self):
+        return len(self._results)
+
+    def _get_stored(self, key: Hashable) -> Optional[Tuple[datetime, _T]]:
+        """Get stored result and its fetch time if it may still be served"""
+        with self._lock:
+            stored = self._results.get(key)
+            if stored is None:
+                return None
+            if self._clock() - stored[0] > self.max_staleness:
+                del self._results[key]
+                return None
+            self._results.move_to_end(key)
+            return stored
+
+    def _store(self, key: Hashable, result: _T):
+        with self._lock:
+            self._results[key] = (self._clock(), result)
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+
+    def _start_refresh(self, key: Hashable) -> bool:
+        """Mark key refreshing; return False if a refresh is already running"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _refresh(self, key: Hashable, fetch: Callable[[], _T]):
+        try:
+            self._store(key, fetch())
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.warning("Refreshing %s failed. Serving the stored result.", key, exc_info=True)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    async def _refresh_async(self, key: Hashable, fetch: Callable[[], Awaitable[_T]]):
+        try:
+            self._store(key, await fetch())
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.warning("Refreshing %s failed. Serving the stored result.", key, exc_info=True)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _get_executor(self) -> futures.ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = futures.ThreadPoolExecutor(thread_name_prefix='fmi-revalidate')
+            return self._executor
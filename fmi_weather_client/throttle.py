@@ -0,0 +1,213 @@
+import asyncio
+import threading
+import time
+from functools import partial
+from typing import Callable, List, Optional
+
+# Status codes FMI service responds with when a client sends too many requests
+OVERLOAD_STATUS_CODES = (429, 503)
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter.
+
+    Tokens are added at a steady rate up to the burst size and every
+    request takes one. Requests are never refused; a request that finds
+    the bucket empty reserves a future token and waits until it is due.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, clock: Callable[[], float] = time.monotonic):
+        """
+        :param rate: Tokens added per second
+        :param burst: Maximum number of tokens in the bucket
+        :param clock: Function returning monotonic time in seconds
+        """
+        if rate <= 0 or burst < 1:
+            raise ValueError(f"Invalid rate {rate} or burst {burst}")
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take a token from the bucket.
+        :return: Seconds to wait before the token may be used
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self):
+        """Take a token from the bucket and sleep until it may be used"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        """Take a token from the bucket and sleep asynchronously until it may be used"""
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def drain(self):
+        """Remove all tokens, so that the next request waits for a new one"""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0.0)
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class AdaptiveConcurrency:
+    """
+    Concurrency limit adjusted with additive increase, multiplicative decrease.
+
+    Every successful request raises the limit so that it grows by about
+    one per round of limit requests. A response telling that the service
+    is overloaded multiplies the limit by the backoff factor.
+    """
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 32, backoff: float = 0.5):
+        """
+        :param initial: Initial number of concurrent requests
+        :param minimum: Lower bound of the limit
+        :param maximum: Upper bound of the limit
+        :param backoff: Factor the limit is multiplied with on overload
+        """
+        if not 1 <= minimum <= initial <= maximum or not 0 < backoff < 1:
+            raise ValueError("Invalid concurrency limits")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self._limit = float(initial)
+        self._in_flight = 0
+        self._waiters: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self) -> int:
+        """Current number of allowed concurrent requests"""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """Number of requests in flight"""
+        return self._in_flight
+
+    def acquire(self):
+        """Wait until a request may be sent"""
+        while True:
+            with self._lock:
+                if self._try_acquire():
+                    return
+                event = threading.Event()
+                self._waiters.append(event.set)
+            event.wait()
+
+    async def acquire_async(self):
+        """Wait asynchronously until a request may be sent"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._try_acquire():
+                    return
+                future = loop.create_future()
+                self._waiters.append(partial(_wake, loop, future))
+            await future
+
+    def release(self, overloaded: Optional[bool]):
+        """
+        Mark a request finished and adjust the limit.
+        :param overloaded: True if service was overloaded; False on success; None if unknown
+        """
+        with self._lock:
+            self._in_flight -= 1
+            if overloaded:
+                self._limit = max(self.minimum, self._limit * self.backoff)
+            elif overloaded is not None:
+                self._limit = min(self.maximum, self._limit + 1 / self._limit)
+            waiters, self._waiters = self._waiters, []
+
+        # Waiters check the limit again, so waking all of them is safe
+        for wake in waiters:
+            wake()
+
+    def _try_acquire(self) -> bool:
+        if self._in_flight < int(self._limit):
+            self._in_flight += 1
+            return True
+        return False
+
+
+class Throttle:
+    """
+    Request rate and concurrency limits of a client.
+
+    One throttle may be shared by synchronous and asynchronous clients
+    so that they stay within the same quota together.
+    """
+
+    def __init__(self,
+                 rate: Optional[float] = 2.0,
+                 burst: int = 10,
+                 concurrency: Optional[AdaptiveConcurrency] = None):
+        """
+        :param rate: Sustained requests per second; unlimited if None
+        :param burst: Number of requests that may be sent at once after being idle
+        :param concurrency: Adaptive concurrency limit; default limits if None
+        """
+        self.bucket = TokenBucket(rate, burst) if rate is not None else None
+        self.concurrency = concurrency if concurrency is not None else AdaptiveConcurrency()
+
+    def acquire(self):
+        """Wait until a request may be sent"""
+        self.concurrency.acquire()
+        if self.bucket is not None:
+            self.bucket.acquire()
+
+    async def acquire_async(self):
+        """Wait asynchronously until a request may be sent"""
+        await self.concurrency.acquire_async()
+        if self.bucket is not None:
+            try:
+                await self.bucket.acquire_async()
+            except asyncio.CancelledError:
+                self.concurrency.release(None)
+                raise
+
+    def release(self, status_code: Optional[int]):
+        """
+        Mark a request finished.
+        The concurrency limit is lowered on overload status codes and raised
+        only on successful responses; other responses leave it unchanged.
+        :param status_code: Response status code; None if no response was received
+        """
+        overloaded: Optional[bool] = None
+        if status_code in OVERLOAD_STATUS_CODES:
+            overloaded = True
+        elif status_code is not None and 200 <= status_code < 300:
+            overloaded = False
+        if overloaded and self.bucket is not None:
+            self.bucket.drain()
+        self.concurrency.release(overloaded)
+
+
+def _wake(loop: asyncio.AbstractEventLoop, future: asyncio.Future):
+    try:
+        loop.call_soon_threadsafe(_resolve, future)
+    except RuntimeError:
+        # Event loop of the waiter has been closed
+        pass
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
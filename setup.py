@@ -12,8 +12,9 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/saaste/fmi-weather-client",
-    packages=setuptools.find_packages(exclude=["*test", "*test.*"]),
+    packages=setuptools.find_packages(exclude=["*test", "*test.*", "benchmarks", "benchmarks.*"]),
     install_requires=[
+        'aiohttp>=3.9.0',
         'requests>=2.32.2',
         'xmltodict>=0.13.0'
     ],
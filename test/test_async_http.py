@@ -0,0 +1,77 @@
+import unittest
+from unittest import mock
+
+import asyncio
+
+import fmi_weather_client.async_http as async_http
+import test.test_data as test_data
+from fmi_weather_client.errors import ServerError
+from fmi_weather_client.throttle import AdaptiveConcurrency, Throttle
+
+
+class AsyncHTTPTest(unittest.TestCase):
+
+    def test_query_items(self):
+        items = async_http._query_items({'timestep': 10, 'place': 'Oulu'})
+        self.assertEqual(items, [('timestep', '10'), ('place', 'Oulu')])
+
+        items = async_http._query_items({'latlon': ['60.1,24.9', '65.0,25.4']})
+        self.assertEqual(items, [('latlon', '60.1,24.9'), ('latlon', '65.0,25.4')])
+
+    @mock.patch('aiohttp.ClientSession.get', side_effect=test_data.async_mock(test_data.mock_place_forecast_response))
+    def test_client_reuses_session(self, mock_get):
+        async def run(client):
+            await client.get({'place': 'Iisalmi'})
+            session = client._session
+            await client.get({'place': 'Iisalmi'})
+            self.assertIs(client._session, session)
+            await client.close()
+            self.assertIsNone(client._session)
+
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(run(async_http.AsyncFMIClient(max_concurrency=2)))
+        self.assertEqual(mock_get.call_count, 2)
+
+    @mock.patch('aiohttp.ClientSession.get', side_effect=test_data.async_mock(test_data.mock_place_forecast_response))
+    def test_client_closes_session_of_finished_loop(self, mock_get):
+        client = async_http.AsyncFMIClient()
+        sessions = []
+
+        async def run():
+            await client.get({'place': 'Iisalmi'})
+            sessions.append(client._session)
+
+        loop = asyncio.get_event_loop()
+        try:
+            with self.assertNoLogs('asyncio', 'ERROR'):
+                asyncio.run(run())
+                asyncio.run(run())
+        finally:
+            asyncio.set_event_loop(loop)
+
+        self.assertIsNot(sessions[0], sessions[1])
+        self.assertTrue(all(session.closed for session in sessions))
+        self.assertEqual(mock_get.call_count, 2)
+
+    @mock.patch('aiohttp.ClientSession.get', side_effect=test_data.async_mock(test_data.mock_server_error_response))
+    def test_client_server_error(self, mock_get):
+        async def run():
+            async with async_http.AsyncFMIClient() as client:
+                await client.get({'place': 'Iisalmi'})
+
+        loop = asyncio.get_event_loop()
+        with self.assertRaises(ServerError):
+            loop.run_until_complete(run())
+
+    @mock.patch('aiohttp.ClientSession.get', side_effect=test_data.async_mock(test_data.mock_place_forecast_response))
+    def test_client_throttle_ramps_up(self, mock_get):
+        throttle = Throttle(rate=None, concurrency=AdaptiveConcurrency(initial=1))
+
+        async def run():
+            async with async_http.AsyncFMIClient(throttle=throttle) as client:
+                await asyncio.gather(*[client.get({'place': 'Iisalmi'}) for _ in range(3)])
+
+        asyncio.get_event_loop().run_until_complete(run())
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(throttle.concurrency.limit, 2)
+        self.assertEqual(throttle.concurrency.in_flight, 0)
@@ -0,0 +1,67 @@
+import unittest
+from concurrent import futures
+from unittest import mock
+
+import test.test_data as test_data
+from fmi_weather_client import bulk
+from fmi_weather_client.models import ForecastArray
+
+
+class BulkTest(unittest.TestCase):
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_batch_forecast_response)
+    def test_forecast_arrays_by_coordinates(self, mock_get):
+        coordinates = [(63.55915, 27.19067), (62.89238, 27.67703), (60.1, 24.9)]
+        forecasts = bulk.forecast_arrays_by_coordinates(coordinates, workers=2, chunk_size=2)
+
+        self.assertEqual(mock_get.call_count, 2)
+        requested = sorted(call.kwargs['params']['latlon'] for call in mock_get.call_args_list)
+        self.assertEqual(requested, [['60.1,24.9'], ['63.55915,27.19067', '62.89238,27.67703']])
+
+        self.assertEqual(len(forecasts), 3)
+        self.assertTrue(all(isinstance(forecast, ForecastArray) for forecast in forecasts))
+        self.assertEqual([forecast.place for forecast in forecasts], ['Iisalmi', 'Kuopio', 'Iisalmi'])
+        self.assertEqual(forecasts[0][0].temperature.value, 12.3)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_multi_forecast_response)
+    def test_forecast_arrays_by_place_names_with_executor(self, mock_get):
+        with futures.ThreadPoolExecutor(1) as executor:
+            forecasts = bulk.forecast_arrays_by_place_names(['Iisalmi', 'Kuopio'], executor=executor)
+            # Given executor is not shut down
+            self.assertEqual(executor.submit(len, forecasts).result(), 2)
+
+        self.assertEqual(mock_get.call_count, 1)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_batch_forecast_response)
+    def test_parameters_generator_is_used_by_every_request(self, mock_get):
+        with futures.ThreadPoolExecutor(1) as executor:
+            forecasts = bulk.forecast_arrays_by_place_names(['Iisalmi', 'Kuopio'], chunk_size=1, executor=executor,
+                                                            parameters=(name for name in ['temperature']))
+
+        self.assertEqual(len(forecasts), 2)
+        self.assertEqual([call.kwargs['params']['parameters'] for call in mock_get.call_args_list],
+                         ['Temperature'] * 2)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_multi_forecast_response)
+    def test_duplicate_coordinates_are_requested_once(self, mock_get):
+        coordinates = [(63.55915, 27.19067), (62.89238, 27.67703), (63.55915, 27.19067)]
+        with futures.ThreadPoolExecutor(1) as executor:
+            forecasts = bulk.forecast_arrays_by_coordinates(coordinates, executor=executor)
+
+        self.assertEqual(mock_get.call_args.kwargs['params']['latlon'], ['63.55915,27.19067', '62.89238,27.67703'])
+        self.assertEqual([forecast.place for forecast in forecasts], ['Iisalmi', 'Kuopio', 'Iisalmi'])
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_multi_forecast_response)
+    def test_missing_forecasts_are_an_error(self, mock_get):
+        with futures.ThreadPoolExecutor(1) as executor, self.assertRaises(ValueError):
+            bulk.forecast_arrays_by_place_names(['Iisalmi'], executor=executor)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_server_error_response)
+    def test_fetch_error(self, mock_get):
+        with futures.ThreadPoolExecutor(1) as executor:
+            with self.assertRaises(Exception):
+                bulk.forecast_arrays_by_coordinates([(60.1, 24.9)], executor=executor)
+
+    def test_invalid_chunk_size(self):
+        with self.assertRaises(ValueError):
+            bulk.forecast_arrays_by_coordinates([(60.1, 24.9)], chunk_size=0)
@@ -0,0 +1,188 @@
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import asyncio
+
+import fmi_weather_client
+import fmi_weather_client.http as http
+import test.test_data as test_data
+from fmi_weather_client.cache import DiskCache, ModelRunExpiry, ResponseCache
+from fmi_weather_client.http import RequestType
+
+
+class MockClock:
+    def __init__(self):
+        self.now = datetime(2022, 9, 19, 10, 0, tzinfo=timezone.utc)
+
+    def __call__(self):
+        return self.now
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = MockClock()
+        self.cache = ResponseCache(max_size=2, clock=self.clock)
+
+    def test_time_bucketed_key(self):
+        params = http._create_params(RequestType.FORECAST, 60, place='Oulu')
+        later = dict(params, starttime='2099-01-01T00:00:00+00:00')
+        params['starttime'] = '2022-09-19T10:05:00+00:00'
+        later['starttime'] = '2022-09-19T10:55:00+00:00'
+        self.assertEqual(self.cache.key(RequestType.FORECAST, params), self.cache.key(RequestType.FORECAST, later))
+
+        later['starttime'] = '2022-09-19T11:00:00+00:00'
+        self.assertNotEqual(self.cache.key(RequestType.FORECAST, params), self.cache.key(RequestType.FORECAST, later))
+
+    def test_hit_miss_and_expiry(self):
+        params = {'place': 'Oulu'}
+        self.assertIsNone(self.cache.get(RequestType.WEATHER, params))
+        self.cache.set(RequestType.WEATHER, params, 'body')
+        self.assertEqual(self.cache.get(RequestType.WEATHER, params), 'body')
+
+        self.clock.now += timedelta(minutes=5)
+        self.assertIsNone(self.cache.get(RequestType.WEATHER, params))
+        self.assertEqual(self.cache.stats, (1, 2, 0))
+
+    def test_lru_eviction(self):
+        self.cache.set(RequestType.WEATHER, {'place': 'A'}, 'a')
+        self.cache.set(RequestType.WEATHER, {'place': 'B'}, 'b')
+        self.cache.get(RequestType.WEATHER, {'place': 'A'})
+        self.cache.set(RequestType.WEATHER, {'place': 'C'}, 'c')
+
+        self.assertEqual(len(self.cache), 2)
+        self.assertIsNone(self.cache.get(RequestType.WEATHER, {'place': 'B'}))
+        self.assertEqual(self.cache.get(RequestType.WEATHER, {'place': 'A'}), 'a')
+        self.assertEqual(self.cache.stats.evictions, 1)
+
+    def test_model_run_expiry(self):
+        expiry = ModelRunExpiry(interval=timedelta(hours=3), delay=timedelta(hours=2))
+        self.assertEqual(expiry(datetime(2022, 9, 19, 10, 0, tzinfo=timezone.utc)),
+                         datetime(2022, 9, 19, 11, 0, tzinfo=timezone.utc))
+        self.assertEqual(expiry(datetime(2022, 9, 19, 11, 0, tzinfo=timezone.utc)),
+                         datetime(2022, 9, 19, 14, 0, tzinfo=timezone.utc))
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_place_forecast_response)
+    def test_cached_requests(self, mock_get):
+        cache = ResponseCache()
+        http.set_cache(cache)
+        try:
+            fmi_weather_client.forecast_by_place_name('Iisalmi')
+            forecast = fmi_weather_client.forecast_by_place_name('Iisalmi')
+        finally:
+            http.set_cache(None)
+
+        self.assertEqual(forecast.place, 'Iisalmi')
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(cache.stats, (1, 1, 0))
+
+
+class DiskCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.clock = MockClock()
+        self.cache = DiskCache(self.directory.name, clock=self.clock)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip_and_expiry(self):
+        body = test_data.read_file('valid_place_forecast_response.xml')
+        params = {'place': 'Iisalmi'}
+        self.assertIsNone(self.cache.get(RequestType.WEATHER, params))
+        self.cache.set(RequestType.WEATHER, params, body)
+
+        # Entries are shared with other cache instances using the same directory
+        other = DiskCache(self.directory.name, clock=self.clock)
+        self.assertEqual(other.get(RequestType.WEATHER, params), body)
+        self.assertLess(os.path.getsize(self.cache.path(RequestType.WEATHER, params)), len(body))
+
+        self.clock.now += timedelta(minutes=5)
+        self.assertIsNone(self.cache.get(RequestType.WEATHER, params))
+        self.assertEqual(self.cache.stats, (0, 2, 0))
+
+        # Expired entries are removed only by prune
+        self.assertTrue(os.path.exists(self.cache.path(RequestType.WEATHER, params)))
+        self.cache.prune()
+        self.assertFalse(os.path.exists(self.cache.path(RequestType.WEATHER, params)))
+        self.assertEqual(self.cache.stats, (0, 2, 1))
+
+    def test_expired_read_keeps_replaced_entry(self):
+        params = {'place': 'Iisalmi'}
+        self.cache.set(RequestType.WEATHER, params, 'old')
+        self.clock.now += timedelta(minutes=5)
+        writer = DiskCache(self.directory.name, clock=self.clock)
+
+        # Another process replaces the entry while this one reads the expired entry
+        read = open
+
+        def read_and_replace(*args, **kwargs):
+            cache_file = read(*args, **kwargs)
+            writer.set(RequestType.WEATHER, params, 'new')
+            return cache_file
+
+        with mock.patch('builtins.open', side_effect=read_and_replace):
+            self.assertIsNone(self.cache.get(RequestType.WEATHER, params))
+        with mock.patch('builtins.open', side_effect=read_and_replace):
+            self.cache.prune()
+        self.assertEqual(self.cache.get(RequestType.WEATHER, params), 'new')
+
+    def test_corrupted_entry(self):
+        params = {'place': 'Iisalmi'}
+        with open(self.cache.path(RequestType.WEATHER, params), 'wb') as cache_file:
+            cache_file.write(b'broken')
+        self.assertIsNone(self.cache.get(RequestType.WEATHER, params))
+
+    def test_prune_and_clear(self):
+        self.cache.set(RequestType.WEATHER, {'place': 'A'}, 'a')
+        self.cache.set(RequestType.FORECAST, {'place': 'B'}, 'b')
+        self.clock.now += timedelta(minutes=5)
+        self.cache.prune()
+        self.assertEqual(len(os.listdir(self.directory.name)), 1)
+
+        self.cache.clear()
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    @mock.patch('aiohttp.ClientSession.get', side_effect=test_data.async_mock(test_data.mock_place_forecast_response))
+    def test_cached_async_requests(self, mock_get):
+        http.set_cache(self.cache)
+        try:
+            loop = asyncio.get_event_loop()
+            loop.run_until_complete(fmi_weather_client.async_forecast_by_place_name('Iisalmi'))
+            forecast = fmi_weather_client.forecast_by_place_name('Iisalmi')
+        finally:
+            http.set_cache(None)
+
+        self.assertEqual(forecast.place, 'Iisalmi')
+        self.assertEqual(mock_get.call_count, 1)
+
+    @mock.patch('aiohttp.ClientSession.get', side_effect=test_data.async_mock(test_data.mock_place_forecast_response))
+    def test_async_requests_use_disk_outside_event_loop(self, mock_get):
+        threads = []
+        get, store = DiskCache.get, DiskCache.set
+
+        def record(function):
+            def call(*args, **kwargs):
+                threads.append(threading.current_thread())
+                return function(*args, **kwargs)
+            return call
+
+        http.set_cache(self.cache)
+        try:
+            with mock.patch.object(DiskCache, 'get', record(get)), mock.patch.object(DiskCache, 'set', record(store)):
+                loop = asyncio.get_event_loop()
+                loop.run_until_complete(fmi_weather_client.async_forecast_by_coordinates(63.55915, 27.19067))
+                forecast = loop.run_until_complete(fmi_weather_client.async_forecast_by_coordinates(63.55915, 27.19067))
+        finally:
+            http.set_cache(None)
+
+        self.assertEqual(forecast.place, 'Iisalmi')
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(self.cache.stats.hits, 1)
+        self.assertEqual(len(threads), 3)
+        self.assertNotIn(threading.current_thread(), threads)
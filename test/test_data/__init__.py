@@ -1,19 +1,60 @@
 import os
 
+FORECAST_FILES = [
+    'valid_place_forecast_response.xml',
+    'valid_coordinate_forecast_response.xml',
+    'corner_nan_response.xml',
+    'valid_temperature_forecast_response.xml',
+]
+
 
 class MockElapsed:
     def __init__(self):
-        self.microseconds = 10000000
+        self.microseconds = 0
+        self.seconds = 10
+
+    def total_seconds(self):
+        return self.seconds + self.microseconds / 1000000
 
 
 class MockResponse:
 
     def __init__(self, xml: str, status_code: int):
         self.text: str = xml
+        self.content: bytes = xml.encode('utf-8')
         self.status_code: int = status_code
         self.elapsed: MockElapsed = MockElapsed()
 
 
+class MockAsyncResponse:
+
+    def __init__(self, response: MockResponse):
+        self.status: int = response.status_code
+        self._text: str = response.text
+
+    async def text(self):
+        return self._text
+
+    async def read(self):
+        return self._text.encode('utf-8')
+
+    def get_encoding(self):
+        return 'utf-8'
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return None
+
+
+def async_mock(mock_response):
+    """Wrap a mock response function to look like aiohttp.ClientSession.get"""
+    def get(*args, **kwargs):
+        return MockAsyncResponse(mock_response(*args, **kwargs))
+    return get
+
+
 def mock_place_forecast_response(*args, **kwargs):
     return __mock_response('valid_place_forecast_response.xml', 200, args, kwargs)
 
@@ -22,6 +63,37 @@ def mock_coordinate_forecast_response(*args, **kwargs):
     return __mock_response('valid_coordinate_forecast_response.xml', 200, args, kwargs)
 
 
+def mock_multi_forecast_response(*args, **kwargs):
+    return __mock_response('valid_multi_forecast_response.xml', 200, args, kwargs)
+
+
+def mock_shared_point_forecast_response(*args, **kwargs):
+    return MockResponse(read_file('valid_multi_forecast_response.xml').replace('62.89238 27.67703', '63.55915 27.19067'),
+                        200)
+
+
+def mock_batch_forecast_response(*args, **kwargs):
+    """Respond with a forecast of each requested location"""
+    params = kwargs['params']
+    if isinstance(params, list):
+        locations = [value for key, value in params if key in ('place', 'latlon')]
+    else:
+        locations = params.get('place', params.get('latlon'))
+    if isinstance(locations, str) or len(locations) == 1:
+        return mock_place_forecast_response(*args, **kwargs)
+    if len(locations) == 2:
+        return mock_multi_forecast_response(*args, **kwargs)
+    raise ValueError(f"No mock response for {len(locations)} locations")
+
+
+def mock_temperature_forecast_response(*args, **kwargs):
+    return __mock_response('valid_temperature_forecast_response.xml', 200, args, kwargs)
+
+
+def mock_observation_response(*args, **kwargs):
+    return __mock_response('valid_observation_response.xml', 200, args, kwargs)
+
+
 def mock_nan_response(*args, **kwargs):
     return __mock_response('corner_nan_response.xml', 200, args, kwargs)
 
@@ -42,10 +114,16 @@ def mock_server_error_response(*args, **kwargs):
     return MockResponse("Internal Server Error", 500)
 
 
-def __mock_response(filename, status_code, *args, **kwargs):
+def mock_service_unavailable_response(*args, **kwargs):
+    return MockResponse("Service Unavailable", 503)
+
+
+def read_file(filename):
     dirname = os.path.dirname(__file__)
     xml_file = os.path.join(dirname, filename)
     with open(xml_file, 'r') as mock_file:
-        xml = mock_file.read()
+        return mock_file.read()
+
 
-    return MockResponse(xml, status_code)
+def __mock_response(filename, status_code, *args, **kwargs):
+    return MockResponse(read_file(filename), status_code)
@@ -0,0 +1,108 @@
+import unittest
+from unittest import mock
+
+import fmi_weather_client
+import fmi_weather_client.http as http
+import test.test_data as test_data
+from fmi_weather_client.cache import ResponseCache
+from fmi_weather_client.grid import GridIndex
+from fmi_weather_client.http import RequestType
+
+
+class GridIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = GridIndex(radius_km=1.0)
+
+    def test_snap_unknown(self):
+        self.assertIsNone(self.index.snap(63.56, 27.19))
+
+    def test_snap_learned_coordinates(self):
+        self.index.add(63.57, 27.21, 63.55915, 27.19067)
+        self.assertEqual(self.index.snap(63.57, 27.21), (63.55915, 27.19067))
+
+    def test_learned_coordinates_are_bounded(self):
+        index = GridIndex(radius_km=1.0, max_learned=2)
+        index.add(63.57, 27.21, 63.55915, 27.19067)
+        index.add(63.58, 27.22, 63.55915, 27.19067)
+        self.assertEqual(index.snap(63.57, 27.21), (63.55915, 27.19067))
+        index.add(63.59, 27.23, 63.55915, 27.19067)
+
+        self.assertEqual(index.snap(63.57, 27.21), (63.55915, 27.19067))
+        self.assertIsNone(index.snap(63.58, 27.22))
+        # Locations within the radius are snapped by distance and not remembered
+        index.add(63.5600, 27.1900, 63.55915, 27.19067)
+        self.assertEqual(len(index._learned), 2)  # pylint: disable=protected-access
+
+    def test_snap_within_radius(self):
+        self.index.add(63.56, 27.19, 63.55915, 27.19067)
+        # About 0.5 km north east of the grid point
+        self.assertEqual(self.index.snap(63.5630, 27.1980), (63.55915, 27.19067))
+        # About 1.5 km east of the grid point
+        self.assertIsNone(self.index.snap(63.55915, 27.2210))
+        self.assertEqual(len(self.index), 1)
+
+    def test_snap_to_nearest_point(self):
+        self.index.add(60.0, 25.0, 60.0, 25.0)
+        self.index.add(60.01, 25.0, 60.01, 25.0)
+        self.assertEqual(self.index.snap(60.004, 25.001), (60.0, 25.0))
+        self.assertEqual(self.index.snap(60.006, 24.999), (60.01, 25.0))
+
+    def test_clear(self):
+        self.index.add(63.56, 27.19, 63.55915, 27.19067)
+        self.index.clear()
+        self.assertEqual(len(self.index), 0)
+        self.assertIsNone(self.index.snap(63.56, 27.19))
+
+    def test_invalid_radius(self):
+        with self.assertRaises(ValueError):
+            GridIndex(radius_km=0)
+
+
+class GridSnappingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ResponseCache()
+        http.set_grid_index(GridIndex())
+        http.set_cache(self.cache)
+
+    def tearDown(self):
+        http.set_grid_index(None)
+        http.set_cache(None)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_place_forecast_response)
+    def test_nearby_coordinates_share_cached_forecast(self, mock_get):
+        fmi_weather_client.forecast_by_coordinates(63.5600, 27.1900)
+        self.assertEqual(http.get_grid_index().snap(63.5600, 27.1900), (63.55915, 27.19067))
+
+        forecast = fmi_weather_client.forecast_by_coordinates(63.5610, 27.1950)
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(forecast.place, 'Iisalmi')
+
+        params = http._create_params(RequestType.FORECAST, 60, lat=63.5610, lon=27.1950)
+        self.assertEqual(params['latlon'], '63.55915,27.19067')
+
+    def test_unique_grid_points(self):
+        http.get_grid_index().add(63.5600, 27.1900, 63.55915, 27.19067)
+        points, indices = http.unique_grid_points([(63.5600, 27.1900), (62.89238, 27.67703), (63.5610, 27.1950)])
+        self.assertEqual(points, [(63.55915, 27.19067), (62.89238, 27.67703)])
+        self.assertEqual(indices, [0, 1, 0])
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_multi_forecast_response)
+    def test_batch_sends_each_grid_point_once(self, mock_get):
+        http.get_grid_index().add(63.5600, 27.1900, 63.55915, 27.19067)
+        coordinates = [(63.5600, 27.1900), (63.5610, 27.1950), (62.89238, 27.67703), (63.55915, 27.19067)]
+        forecasts = fmi_weather_client.forecasts_by_coordinates_batch(coordinates)
+
+        self.assertEqual(mock_get.call_args.kwargs['params']['latlon'], ['63.55915,27.19067', '62.89238,27.67703'])
+        self.assertEqual([forecast.place for forecast in forecasts], ['Iisalmi', 'Iisalmi', 'Kuopio', 'Iisalmi'])
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_place_forecast_response)
+    def test_batch_with_missing_forecasts_is_an_error(self, mock_get):
+        with self.assertRaises(ValueError):
+            fmi_weather_client.forecasts_by_coordinates_batch([(63.55915, 27.19067), (62.89238, 27.67703)])
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_place_forecast_response)
+    def test_place_requests_are_not_learned(self, mock_get):
+        fmi_weather_client.forecast_by_place_name('Iisalmi')
+        self.assertEqual(len(http.get_grid_index()), 0)
@@ -1,7 +1,14 @@
+import threading
 import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
 import fmi_weather_client.http as http
+import test.test_data as test_data
 from fmi_weather_client.http import RequestType
-from fmi_weather_client.errors import ClientError
+from fmi_weather_client.errors import ClientError, ServerError
+from fmi_weather_client.retry import RetryPolicy
+from fmi_weather_client.throttle import AdaptiveConcurrency, Throttle
 from collections import namedtuple
 
 
@@ -15,6 +22,54 @@ class HTTPTest(unittest.TestCase):
         with self.assertRaises(Exception):
             http._create_params("UNKNOWN", 10, "Test Place", None, None)
 
+    def test_create_batch_params(self):
+        params = http._create_batch_params(RequestType.FORECAST, 60, places=['Kaisaniemi, Helsinki', 'Oulu'],
+                                           coordinates=[(60.1, 24.9)])
+        self.assertEqual(params['place'], ['Kaisaniemi,Helsinki', 'Oulu'])
+        self.assertEqual(params['latlon'], ['60.1,24.9'])
+
+    def test_create_batch_params_missing_location(self):
+        with self.assertRaises(ValueError):
+            http._create_batch_params(RequestType.FORECAST, 60)
+
+    def test_create_params_with_parameters(self):
+        params = http._create_params(RequestType.FORECAST, 60, place='Oulu', parameters=['temperature'])
+        self.assertEqual(params['parameters'], 'Temperature')
+
+    def test_resolve_parameters(self):
+        self.assertEqual(http.resolve_parameters(), http.FORECAST_PARAMETERS)
+        self.assertEqual(http.resolve_parameters(['wind_speed', 'temperature']), ['Temperature', 'WindSpeedMS'])
+        self.assertEqual(http.resolve_parameters(['Pressure', 'pressure']), ['Pressure'])
+        self.assertEqual(http.resolve_parameters('feels_like'), ['Temperature', 'Humidity', 'WindSpeedMS'])
+        self.assertEqual(http.resolve_parameters(['temperature', 'wind_max']), ['Temperature'])
+
+    def test_resolve_parameters_invalid(self):
+        with self.assertRaises(ValueError):
+            http.resolve_parameters(['temperature', 'unknown'])
+        with self.assertRaises(ValueError):
+            http.resolve_parameters(['wind_max'])
+
+    def test_create_station_params(self):
+        params = http._create_station_params([100971, '101004'], 10, parameters=['temperature'])
+        self.assertEqual(params['storedquery_id'], 'fmi::observations::weather::multipointcoverage')
+        self.assertEqual(params['fmisid'], ['100971', '101004'])
+        self.assertEqual(params['parameters'], 't2m')
+        self.assertEqual(params['timestep'], 10)
+
+    def test_create_station_params_missing_station(self):
+        with self.assertRaises(ValueError):
+            http._create_station_params([], 10)
+
+    def test_resolve_observation_parameters(self):
+        self.assertEqual(http.resolve_observation_parameters(), list(http.OBSERVATION_PARAMETERS))
+        self.assertEqual(http.resolve_observation_parameters(['wind_speed', 't2m']), ['t2m', 'ws_10min'])
+        self.assertEqual(http.resolve_observation_parameters('feels_like'), ['t2m', 'rh', 'ws_10min'])
+        self.assertEqual(http.resolve_observation_parameters(['pressure', 'symbol']), ['p_sea'])
+        with self.assertRaises(ValueError):
+            http.resolve_observation_parameters(['symbol'])
+        with self.assertRaises(ValueError):
+            http.resolve_observation_parameters(['Temperature2'])
+
     def test_handle_errors_client_error_with_exception_text(self):
         with self.assertRaises(ClientError):
             status_code = 400
@@ -27,3 +82,116 @@ class HTTPTest(unittest.TestCase):
             Response = namedtuple("Response", ['status_code', 'text'])
             mock_response = Response(status_code=status_code, text=text)
             http._handle_errors(mock_response)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_place_forecast_response)
+    def test_client_reuses_session(self, mock_get):
+        with http.FMIClient(pool_size=2, timeout=5) as client:
+            client.get({'place': 'Iisalmi'})
+            client.get({'place': 'Iisalmi'})
+
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(mock_get.call_args.kwargs['timeout'], 5)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_place_forecast_response)
+    def test_client_url(self, mock_get):
+        with http.FMIClient() as client:
+            client.get({'place': 'Iisalmi'})
+        self.assertEqual(mock_get.call_args.args[0], http.URL)
+
+        with http.FMIClient(url='http://127.0.0.1:8080/wfs') as client:
+            client.get({'place': 'Iisalmi'})
+        self.assertEqual(mock_get.call_args.args[0], 'http://127.0.0.1:8080/wfs')
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_service_unavailable_response)
+    def test_client_throttle_backs_off(self, mock_get):
+        throttle = Throttle(rate=None, concurrency=AdaptiveConcurrency(initial=4))
+        with http.FMIClient(throttle=throttle) as client:
+            with self.assertRaises(ServerError):
+                client.get({'place': 'Iisalmi'})
+
+        self.assertEqual(throttle.concurrency.limit, 2)
+        self.assertEqual(throttle.concurrency.in_flight, 0)
+
+    @mock.patch('requests.Session.get', side_effect=[test_data.mock_server_error_response(),
+                                                     test_data.mock_place_forecast_response()])
+    def test_retry_policy(self, mock_get):
+        http.set_retry_policy(RetryPolicy(attempts=2, backoff=0.001))
+        try:
+            self.assertIsNotNone(http.get_retry_policy())
+            http.request_forecast_by_place('Iisalmi')
+        finally:
+            http.set_retry_policy(None)
+
+        self.assertEqual(mock_get.call_count, 2)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_place_forecast_response)
+    def test_default_client(self, mock_get):
+        client = http.FMIClient()
+        http.set_default_client(client)
+        try:
+            self.assertIs(http.get_default_client(), client)
+            http.request_forecast_by_place('Iisalmi')
+        finally:
+            http.set_default_client(None)
+
+        self.assertEqual(mock_get.call_count, 1)
+
+    def test_flight_key_time_range(self):
+        start = datetime(2022, 9, 19, 12, tzinfo=timezone.utc)
+        default = http._create_params(RequestType.FORECAST, 60, lat=60.1, lon=24.9)
+        refresh = http._create_params(RequestType.FORECAST, 60, lat=60.1, lon=24.9,
+                                      time_range=(start, start + timedelta(days=1)))
+        self.assertEqual(http.flight_key(RequestType.FORECAST, default), http.flight_key(RequestType.FORECAST, refresh))
+        self.assertNotEqual(http.flight_key(RequestType.FORECAST, default),
+                            http.flight_key(RequestType.FORECAST, refresh, exact_times=True))
+        self.assertEqual(http.flight_key(RequestType.FORECAST, refresh, exact_times=True),
+                         http.flight_key(RequestType.FORECAST, dict(refresh), exact_times=True))
+
+    def test_concurrent_requests_with_different_time_ranges(self):
+        both_sent = threading.Barrier(2, timeout=2)
+        sent_params = []
+
+        def get(*args, **kwargs):
+            sent_params.append(kwargs['params'])
+            try:
+                both_sent.wait()
+            except threading.BrokenBarrierError:
+                pass
+            return test_data.mock_coordinate_forecast_response()
+
+        start = datetime.now(timezone.utc) + timedelta(days=2)
+        with mock.patch('requests.Session.get', side_effect=get):
+            threads = [threading.Thread(target=http.request_forecast_by_coordinates, args=(27.0, 62.0, 1)),
+                       threading.Thread(target=http.request_forecast_by_coordinates, args=(27.0, 62.0, 1),
+                                        kwargs={'time_range': (start, start + timedelta(days=1))})]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(sent_params), 2)
+        self.assertIn(start.isoformat(timespec='seconds'), [params['starttime'] for params in sent_params])
+
+    def test_concurrent_observations_with_different_time_ranges(self):
+        both_sent = threading.Barrier(2, timeout=2)
+        sent_params = []
+
+        def get(*args, **kwargs):
+            sent_params.append(kwargs['params'])
+            try:
+                both_sent.wait()
+            except threading.BrokenBarrierError:
+                pass
+            return test_data.mock_observation_response()
+
+        end = datetime.now(timezone.utc) - timedelta(days=1)
+        with mock.patch('requests.Session.get', side_effect=get):
+            threads = [threading.Thread(target=http.request_observations_by_station_ids, args=([100971],)),
+                       threading.Thread(target=http.request_observations_by_station_ids, args=([100971],),
+                                        kwargs={'time_range': (end - timedelta(hours=1), end)})]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(sent_params), 2)
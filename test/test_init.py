@@ -2,68 +2,283 @@ import unittest
 from unittest import mock
 
 import asyncio
+from datetime import datetime, timedelta
 
 import fmi_weather_client
 import test.test_data as test_data
 from fmi_weather_client.errors import ClientError, ServerError
+from fmi_weather_client.parsers import forecast as forecast_parser
 
 
 class FMIWeatherTest(unittest.TestCase):
 
     # HAPPY CASES
-    @mock.patch('requests.get', side_effect=test_data.mock_place_forecast_response)
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_place_forecast_response)
     def test_get_weather_by_place(self, mock_get):
         weather = fmi_weather_client.weather_by_place_name('Iisalmi')
         self.assert_name_weather(weather)
 
-    @mock.patch('requests.get', side_effect=test_data.mock_place_forecast_response)
+    @mock.patch('aiohttp.ClientSession.get', side_effect=test_data.async_mock(test_data.mock_place_forecast_response))
     def test_async_get_weather_by_place(self, mock_get):
         loop = asyncio.get_event_loop()
         weather = loop.run_until_complete(fmi_weather_client.async_weather_by_place_name('Iisalmi'))
         self.assert_name_weather(weather)
 
-    @mock.patch('requests.get', side_effect=test_data.mock_coordinate_forecast_response)
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_coordinate_forecast_response)
     def test_get_weather_by_coordinates(self, mock_get):
         weather = fmi_weather_client.weather_by_coordinates(63.14343, 27.31317)
         self.assert_coordinate_weather(weather)
 
-    @mock.patch('requests.get', side_effect=test_data.mock_coordinate_forecast_response)
+    @mock.patch('aiohttp.ClientSession.get', side_effect=test_data.async_mock(test_data.mock_coordinate_forecast_response))
     def test_async_get_weather_by_coordinates(self, mock_get):
         loop = asyncio.get_event_loop()
         weather = loop.run_until_complete(fmi_weather_client.async_weather_by_coordinates(63.14343, 27.31317))
         self.assert_coordinate_weather(weather)
 
-    @mock.patch('requests.get', side_effect=test_data.mock_place_forecast_response)
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_place_forecast_response)
     def test_get_forecast_by_place_name(self, mock_get):
         forecast = fmi_weather_client.forecast_by_place_name('Iisalmi')
         self.assert_name_forecast(forecast)
 
-    @mock.patch('requests.get', side_effect=test_data.mock_place_forecast_response)
+    @mock.patch('aiohttp.ClientSession.get', side_effect=test_data.async_mock(test_data.mock_place_forecast_response))
     def test_async_get_forecast_by_place_name(self, mock_get):
         loop = asyncio.get_event_loop()
         forecast = loop.run_until_complete(fmi_weather_client.async_forecast_by_place_name('Iisalmi'))
         self.assert_name_forecast(forecast)
 
-    @mock.patch('requests.get', side_effect=test_data.mock_coordinate_forecast_response)
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_coordinate_forecast_response)
     def test_get_forecast_by_coordinates(self, mock_get):
         forecast = fmi_weather_client.forecast_by_coordinates(29.742731, 67.583988)
         self.assert_coordinate_forecast(forecast)
 
-    @mock.patch('requests.get', side_effect=test_data.mock_coordinate_forecast_response)
+    @mock.patch('aiohttp.ClientSession.get', side_effect=test_data.async_mock(test_data.mock_coordinate_forecast_response))
     def test_async_get_forecast_by_coordinates(self, mock_get):
         loop = asyncio.get_event_loop()
         forecast = loop.run_until_complete(fmi_weather_client.async_forecast_by_coordinates(67.583988, 29.742731))
         self.assert_coordinate_forecast(forecast)
 
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_multi_forecast_response)
+    def test_get_forecasts_by_coordinates_batch(self, mock_get):
+        forecasts = fmi_weather_client.forecasts_by_coordinates_batch([(63.55915, 27.19067), (62.89238, 27.67703)])
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(mock_get.call_args.kwargs['params']['latlon'], ['63.55915,27.19067', '62.89238,27.67703'])
+        self.assert_multi_forecasts(forecasts)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_batch_forecast_response)
+    def test_get_forecasts_by_place_names_in_batches(self, mock_get):
+        forecasts = fmi_weather_client.forecasts_by_place_names(['Iisalmi', 'Kuopio', 'Oulu'], batch_size=2)
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(mock_get.call_args_list[0].kwargs['params']['place'], ['Iisalmi', 'Kuopio'])
+        self.assertEqual(mock_get.call_args_list[1].kwargs['params']['place'], ['Oulu'])
+        self.assertEqual(len(forecasts), 3)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_shared_point_forecast_response)
+    def test_get_forecasts_by_place_names_sharing_coordinates(self, mock_get):
+        forecasts = fmi_weather_client.forecasts_by_place_names(['Iisalmi', 'Kuopio'])
+        self.assertEqual([(forecast.place, len(forecast.forecasts)) for forecast in forecasts],
+                         [('Iisalmi', 12), ('Kuopio', 12)])
+        self.assertEqual([forecast.forecasts[0].temperature.value for forecast in forecasts], [12.3, 13.3])
+
+    @mock.patch('aiohttp.ClientSession.get', side_effect=test_data.async_mock(test_data.mock_multi_forecast_response))
+    def test_async_get_forecasts_by_place_names(self, mock_get):
+        loop = asyncio.get_event_loop()
+        forecasts = loop.run_until_complete(fmi_weather_client.async_forecasts_by_place_names(['Iisalmi', 'Kuopio']))
+        self.assertEqual(mock_get.call_count, 1)
+        self.assert_multi_forecasts(forecasts)
+
+    @mock.patch('aiohttp.ClientSession.get', side_effect=test_data.async_mock(test_data.mock_place_forecast_response))
+    def test_async_concurrent_identical_requests_are_coalesced(self, mock_get):
+        async def run():
+            return await asyncio.gather(*[fmi_weather_client.async_forecast_by_place_name('Iisalmi') for _ in range(3)],
+                                        fmi_weather_client.async_forecast_by_place_name('Iisalmi', 1))
+
+        forecasts = asyncio.get_event_loop().run_until_complete(run())
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertIs(forecasts[1], forecasts[0])
+        self.assertIs(forecasts[2], forecasts[0])
+        self.assert_name_forecast(forecasts[0])
+
+    @mock.patch('aiohttp.ClientSession.get', side_effect=test_data.async_mock(test_data.mock_multi_forecast_response))
+    def test_async_get_forecasts_by_coordinates_batch(self, mock_get):
+        loop = asyncio.get_event_loop()
+        forecasts = loop.run_until_complete(fmi_weather_client.async_forecasts_by_coordinates_batch(
+            [(63.55915, 27.19067), (62.89238, 27.67703)]))
+        self.assert_multi_forecasts(forecasts)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_temperature_forecast_response)
+    def test_get_weather_by_place_with_parameters(self, mock_get):
+        weather = fmi_weather_client.weather_by_place_name('Iisalmi', parameters=['temperature'])
+        self.assertEqual(mock_get.call_args.kwargs['params']['parameters'], 'Temperature')
+        self.assertEqual(weather.data.temperature.value, 12.0)
+        self.assertIsNone(weather.data.humidity.value)
+        self.assertIsNone(weather.data.feels_like.value)
+
+    @mock.patch('aiohttp.ClientSession.get',
+                side_effect=test_data.async_mock(test_data.mock_temperature_forecast_response))
+    def test_async_get_forecast_by_coordinates_with_parameters(self, mock_get):
+        loop = asyncio.get_event_loop()
+        forecast = loop.run_until_complete(
+            fmi_weather_client.async_forecast_by_coordinates(63.55915, 27.19067, parameters=['temperature']))
+        self.assertIn(('parameters', 'Temperature'), mock_get.call_args.kwargs['params'])
+        self.assertEqual(len(forecast.forecasts), 12)
+        self.assertIsNone(forecast.forecasts[0].wind_speed.value)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_place_forecast_response)
+    def test_refresh_forecast_fetches_missing_rows(self, mock_get):
+        full = forecast_parser.parse_forecast(test_data.read_file('valid_place_forecast_response.xml'))
+        existing = full._replace(place='Home', forecasts=full.forecasts[:6])
+        with mock.patch('fmi_weather_client.datetime', wraps=datetime) as mock_datetime:
+            mock_datetime.now.return_value = full.forecasts[1].time
+            forecast = fmi_weather_client.refresh_forecast(existing, timestep_hours=1)
+
+        params = mock_get.call_args.kwargs['params']
+        self.assertEqual(params['latlon'], '63.55915,27.19067')
+        self.assertEqual(params['starttime'], '2022-09-19T11:10:00+00:00')
+        self.assertEqual(params['endtime'], '2022-09-23T09:30:00+00:00')
+        self.assertEqual(forecast.place, 'Home')
+        self.assertEqual([data.time for data in forecast.forecasts], [data.time for data in full.forecasts[1:]])
+        self.assertEqual(forecast.forecasts[-1].temperature, full.forecasts[-1].temperature)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_place_forecast_response)
+    def test_refresh_forecast_fetches_stale_rows(self, mock_get):
+        full = forecast_parser.parse_forecast(test_data.read_file('valid_place_forecast_response.xml'))
+        with mock.patch('fmi_weather_client.datetime', wraps=datetime) as mock_datetime:
+            mock_datetime.now.return_value = full.forecasts[0].time
+            forecast = fmi_weather_client.refresh_forecast(full, 1, stale_from=full.forecasts[3].time)
+
+        self.assertEqual(mock_get.call_args.kwargs['params']['starttime'], '2022-09-19T10:40:00+00:00')
+        self.assertEqual(forecast.forecasts[:3], full.forecasts[:3])
+        self.assertEqual([data.time for data in forecast.forecasts], [data.time for data in full.forecasts])
+
+    @mock.patch('aiohttp.ClientSession.get', side_effect=test_data.async_mock(test_data.mock_place_forecast_response))
+    def test_async_refresh_forecast_without_missing_rows(self, mock_get):
+        full = forecast_parser.parse_forecast(test_data.read_file('valid_place_forecast_response.xml'))
+        loop = asyncio.get_event_loop()
+        with mock.patch('fmi_weather_client.datetime', wraps=datetime) as mock_datetime:
+            mock_datetime.now.return_value = full.forecasts[0].time - timedelta(days=4)
+            forecast = loop.run_until_complete(fmi_weather_client.async_refresh_forecast(full, 1))
+
+        mock_get.assert_not_called()
+        self.assertEqual(forecast, full)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_observation_response)
+    def test_get_observations_by_station_ids_in_batches(self, mock_get):
+        observations = fmi_weather_client.observations_by_station_ids([101004, 100971, 100968], batch_size=2)
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(mock_get.call_args_list[0].kwargs['params']['fmisid'], ['101004', '100971'])
+        self.assertEqual(mock_get.call_args_list[1].kwargs['params']['fmisid'], ['100968'])
+        self.assertEqual([observation.station_id for observation in observations], [101004, 101004, 100971, 100971])
+
+    @mock.patch('aiohttp.ClientSession.get', side_effect=test_data.async_mock(test_data.mock_observation_response))
+    def test_async_get_observations_by_station_ids(self, mock_get):
+        loop = asyncio.get_event_loop()
+        observations = loop.run_until_complete(fmi_weather_client.async_observations_by_station_ids(
+            [100971, 101004], parameters=['temperature']))
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertIn(('parameters', 't2m'), mock_get.call_args.kwargs['params'])
+        self.assertEqual([observation.place for observation in observations],
+                         ['Helsinki Kaisaniemi', 'Helsinki Kumpula'])
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_batch_forecast_response)
+    def test_parameters_generator_is_used_by_every_request(self, mock_get):
+        def parameters():
+            return (parameter for parameter in ['temperature'])
+
+        fmi_weather_client.forecasts_by_coordinates_batch([(63.55915, 27.19067), (62.89238, 27.67703)],
+                                                          batch_size=1, parameters=parameters())
+        fmi_weather_client.forecasts_by_place_names(['Iisalmi', 'Kuopio'], batch_size=1, parameters=parameters())
+        results = list(fmi_weather_client.iter_forecasts([(63.55915, 27.19067), 'Kuopio'], parameters=parameters()))
+
+        self.assertEqual([result.error for result in results], [None, None])
+        self.assertEqual(mock_get.call_count, 6)
+        self.assertEqual({call.kwargs['params']['parameters'] for call in mock_get.call_args_list},
+                         {mock_get.call_args_list[0].kwargs['params']['parameters']})
+
+        with mock.patch('requests.Session.get', side_effect=test_data.mock_observation_response) as mock_observations:
+            fmi_weather_client.observations_by_station_ids([101004, 100971], batch_size=1, parameters=parameters())
+        self.assertEqual(mock_observations.call_args_list[1].kwargs['params']['parameters'], 't2m')
+
+    @mock.patch('aiohttp.ClientSession.get', side_effect=test_data.async_mock(test_data.mock_batch_forecast_response))
+    def test_async_parameters_generator_is_used_by_every_request(self, mock_get):
+        def parameters():
+            return (parameter for parameter in ['temperature'])
+
+        async def run():
+            await fmi_weather_client.async_forecasts_by_coordinates_batch(
+                [(63.55915, 27.19067), (62.89238, 27.67703)], batch_size=1, parameters=parameters())
+            await fmi_weather_client.async_forecasts_by_place_names(['Iisalmi', 'Kuopio'], batch_size=1,
+                                                                    parameters=parameters())
+            return [result async for result in fmi_weather_client.aiter_forecasts(
+                [(63.55915, 27.19067), 'Kuopio'], parameters=parameters())]
+
+        results = asyncio.get_event_loop().run_until_complete(run())
+        self.assertEqual([result.error for result in results], [None, None])
+        self.assertEqual(mock_get.call_count, 6)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_place_forecast_response)
+    def test_iter_forecasts(self, mock_get):
+        locations = ['Iisalmi', (63.55915, 27.19067), 'Iisalmi, Finland']
+        results = list(fmi_weather_client.iter_forecasts(iter(locations), concurrency=2))
+
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertCountEqual([result.location for result in results], locations)
+        for result in results:
+            self.assertIsNone(result.error)
+            self.assert_name_forecast(result.forecast)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_place_forecast_response)
+    def test_iter_forecasts_reads_locations_lazily(self, mock_get):
+        read = []
+
+        def locations():
+            for index in range(100):
+                read.append(index)
+                yield 60.0 + index / 100, 25.0
+
+        results = fmi_weather_client.iter_forecasts(locations(), concurrency=3)
+        next(results)
+        results.close()
+        self.assertLessEqual(len(read), 4)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_no_location_exception_response)
+    def test_iter_forecasts_returns_errors(self, mock_get):
+        results = list(fmi_weather_client.iter_forecasts(['Unknown', 'Missing']))
+        self.assertEqual(len(results), 2)
+        for result in results:
+            self.assertIsNone(result.forecast)
+            self.assertIsInstance(result.error, ClientError)
+
+    @mock.patch('aiohttp.ClientSession.get', side_effect=test_data.async_mock(test_data.mock_place_forecast_response))
+    def test_aiter_forecasts(self, mock_get):
+        async def collect():
+            return [result async for result in fmi_weather_client.aiter_forecasts(
+                ['Iisalmi', (63.55915, 27.19067), 'Kuopio'], concurrency=2)]
+
+        results = asyncio.get_event_loop().run_until_complete(collect())
+        self.assertEqual(len(results), 3)
+        for result in results:
+            self.assertIsNone(result.error)
+            self.assert_name_forecast(result.forecast)
+
+    @mock.patch('aiohttp.ClientSession.get',
+                side_effect=test_data.async_mock(test_data.mock_no_location_exception_response))
+    def test_aiter_forecasts_returns_errors(self, mock_get):
+        async def collect():
+            return [result async for result in fmi_weather_client.aiter_forecasts(['Unknown'])]
+
+        results = asyncio.get_event_loop().run_until_complete(collect())
+        self.assertEqual(results[0].location, 'Unknown')
+        self.assertIsInstance(results[0].error, ClientError)
+
     # CORNER CASES
-    @mock.patch('requests.get', side_effect=test_data.mock_nan_response)
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_nan_response)
     def test_nil_weather_response(self, mock_get):
         weather_coord = fmi_weather_client.weather_by_coordinates(25.46816, 65.01236)
         weather_name = fmi_weather_client.weather_by_place_name('Oulu')
         self.assertIsNone(weather_coord)
         self.assertIsNone(weather_name)
 
-    @mock.patch('requests.get', side_effect=test_data.mock_nan_response)
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_nan_response)
     def test_nil_forecast_response(self, mock_get):
         forecast_coord = fmi_weather_client.forecast_by_coordinates(25.46816, 65.01236, 24)
         forecast_name = fmi_weather_client.forecast_by_place_name('Oulu', 24)
@@ -73,26 +288,39 @@ class FMIWeatherTest(unittest.TestCase):
         self.assertEqual(forecast_name.forecasts, [])
 
     # ERROR CASES
-    @mock.patch('requests.get', side_effect=test_data.mock_no_location_exception_response)
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_no_location_exception_response)
     def test_no_location_exception_response(self, mock_get):
         with self.assertRaises(ClientError):
             fmi_weather_client.weather_by_coordinates(27.31317, 63.14343)
 
-    @mock.patch('requests.get', side_effect=test_data.mock_invalid_lat_lon_exception_response)
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_invalid_lat_lon_exception_response)
     def test_invalid_lat_lon_exception_response(self, mock_get):
         with self.assertRaises(ClientError):
             fmi_weather_client.weather_by_coordinates(27.31317, 63.14343)
 
-    @mock.patch('requests.get', side_effect=test_data.mock_no_data_available_exception_response)
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_no_data_available_exception_response)
     def test_no_data_available_exception_response(self, mock_get):
         with self.assertRaises(ClientError):
             fmi_weather_client.weather_by_coordinates(27.31317, 63.14343)
 
-    @mock.patch('requests.get', side_effect=test_data.mock_server_error_response)
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_server_error_response)
     def test_server_error_response(self, mock_get):
         with self.assertRaises(ServerError):
             fmi_weather_client.weather_by_coordinates(27.31317, 63.14343)
 
+    @mock.patch('aiohttp.ClientSession.get', side_effect=test_data.async_mock(test_data.mock_server_error_response))
+    def test_async_server_error_response(self, mock_get):
+        loop = asyncio.get_event_loop()
+        with self.assertRaises(ServerError):
+            loop.run_until_complete(fmi_weather_client.async_weather_by_coordinates(27.31317, 63.14343))
+
+    @mock.patch('aiohttp.ClientSession.get',
+                side_effect=test_data.async_mock(test_data.mock_no_location_exception_response))
+    def test_async_no_location_exception_response(self, mock_get):
+        loop = asyncio.get_event_loop()
+        with self.assertRaises(ClientError):
+            loop.run_until_complete(fmi_weather_client.async_weather_by_coordinates(27.31317, 63.14343))
+
     def assert_name_weather(self, weather):
         self.assertEqual(weather.place, 'Iisalmi')
         self.assertEqual(weather.data.time.timestamp(), 1663585800.0)
@@ -144,6 +372,15 @@ class FMIWeatherTest(unittest.TestCase):
         self.assertEqual(forecast.forecasts[1].pressure.value, 1005.8)
         self.assertEqual(forecast.forecasts[4].humidity.value, 97.9)
 
+    def assert_multi_forecasts(self, forecasts):
+        self.assertEqual(len(forecasts), 2)
+        self.assert_name_forecast(forecasts[0])
+        self.assertEqual(forecasts[1].place, 'Kuopio')
+        self.assertEqual(forecasts[1].lat, 62.89238)
+        self.assertEqual(forecasts[1].lon, 27.67703)
+        self.assertEqual(len(forecasts[1].forecasts), 12)
+        self.assertEqual(forecasts[1].forecasts[0].temperature.value, 13.3)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+from unittest import mock
+
+import asyncio
+
+import fmi_weather_client
+import test.test_data as test_data
+from fmi_weather_client import instrumentation
+from fmi_weather_client.errors import ServerError
+from fmi_weather_client.instrumentation import Listener
+
+
+class Recorder:
+    """Listener callbacks storing received events"""
+
+    def __init__(self):
+        self.spans = []
+        self.counters = []
+        self.listener = Listener(on_span=lambda *event: self.spans.append(event),
+                                 on_counter=lambda *event: self.counters.append(event))
+
+    def span_names(self):
+        return {name for name, _, _ in self.spans}
+
+    def total(self, counter):
+        return sum(value for name, value, _ in self.counters if name == counter)
+
+
+class InstrumentationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.recorder = Recorder()
+        instrumentation.add_listener(self.recorder.listener)
+
+    def tearDown(self):
+        instrumentation.remove_listener(self.recorder.listener)
+
+    def test_span(self):
+        with instrumentation.span('test', place='Iisalmi'):
+            pass
+        instrumentation.record_span('measured', 1.5)
+
+        (name, duration, attributes), measured = self.recorder.spans
+        self.assertEqual(name, 'test')
+        self.assertGreaterEqual(duration, 0)
+        self.assertEqual(attributes, {'place': 'Iisalmi'})
+        self.assertEqual(measured, ('measured', 1.5, {}))
+
+    def test_count(self):
+        instrumentation.count('test')
+        instrumentation.count('test', 2, status_code=500)
+        self.assertEqual(self.recorder.counters, [('test', 1, {}), ('test', 2, {'status_code': 500})])
+
+    def test_timed_iter(self):
+        self.assertEqual(list(instrumentation.timed_iter('iteration', range(3))), [0, 1, 2])
+        self.assertEqual([name for name, _, _ in self.recorder.spans], ['iteration'])
+
+    def test_no_listeners(self):
+        instrumentation.remove_listener(self.recorder.listener)
+        self.assertFalse(instrumentation.enabled())
+        with instrumentation.span('test'):
+            instrumentation.count('test')
+        self.assertEqual(self.recorder.spans, [])
+        self.assertEqual(self.recorder.counters, [])
+
+    def test_failing_listener_is_ignored(self):
+        def fail(*args):
+            raise RuntimeError("Listener failed")
+
+        failing = Listener(on_counter=fail)
+        instrumentation.add_listener(failing)
+        try:
+            with self.assertLogs('fmi_weather_client.instrumentation', 'ERROR'):
+                instrumentation.count('test')
+        finally:
+            instrumentation.remove_listener(failing)
+        self.assertEqual(self.recorder.counters, [('test', 1, {})])
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_coordinate_forecast_response)
+    def test_forecast_request(self, mock_get):
+        forecast = fmi_weather_client.forecast_by_coordinates(27.0, 62.0)
+
+        self.assertTrue({instrumentation.SPAN_HTTP_WAIT, instrumentation.SPAN_HTTP_TRANSFER,
+                         instrumentation.SPAN_HTTP_REQUEST, instrumentation.SPAN_PARSE_XML,
+                         instrumentation.SPAN_PARSE_DECODE, instrumentation.SPAN_PARSE_BUILD}
+                        <= self.recorder.span_names())
+        self.assertIn((instrumentation.SPAN_HTTP_WAIT, 10.0, {}), self.recorder.spans)
+        body = test_data.read_file('valid_coordinate_forecast_response.xml')
+        self.assertEqual(self.recorder.total(instrumentation.COUNTER_BYTES_RECEIVED), len(body.encode('utf-8')))
+        self.assertEqual(self.recorder.total(instrumentation.COUNTER_ROWS_PARSED), len(forecast.forecasts))
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_nan_response)
+    def test_nan_rows_dropped(self, mock_get):
+        forecast = fmi_weather_client.forecast_by_coordinates(25.46816, 65.01236)
+        self.assertEqual(self.recorder.total(instrumentation.COUNTER_ROWS_PARSED), len(forecast.forecasts))
+        self.assertGreater(self.recorder.total(instrumentation.COUNTER_NAN_ROWS_DROPPED), 0)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_server_error_response)
+    def test_error_counter(self, mock_get):
+        with self.assertRaises(ServerError):
+            fmi_weather_client.forecast_by_coordinates(27.0, 62.0)
+        self.assertIn((instrumentation.COUNTER_ERRORS, 1, {'status_code': 500}), self.recorder.counters)
+
+    @mock.patch('aiohttp.ClientSession.get',
+                side_effect=test_data.async_mock(test_data.mock_coordinate_forecast_response))
+    def test_async_forecast_request(self, mock_get):
+        asyncio.get_event_loop().run_until_complete(fmi_weather_client.async_forecast_by_coordinates(27.0, 62.0))
+
+        self.assertTrue({instrumentation.SPAN_HTTP_WAIT, instrumentation.SPAN_HTTP_TRANSFER,
+                         instrumentation.SPAN_HTTP_REQUEST, instrumentation.SPAN_PARSE_XML}
+                        <= self.recorder.span_names())
+        self.assertIn((instrumentation.SPAN_HTTP_REQUEST, mock.ANY, {'status_code': 200}), self.recorder.spans)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_coordinate_forecast_response)
+    def test_logged_elapsed_time_includes_seconds(self, mock_get):
+        with self.assertLogs('fmi_weather_client.http', 'DEBUG') as logs:
+            fmi_weather_client.forecast_by_coordinates(27.0, 62.0)
+        self.assertTrue(any('in 10000 ms' in line for line in logs.output))
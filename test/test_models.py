@@ -1,5 +1,12 @@
+import math
+import pickle
 import unittest
-from fmi_weather_client.models import FMIPlace, Value
+from array import array
+from datetime import datetime, timezone
+
+import test.test_data as test_data
+from fmi_weather_client.models import FIELD_PARAMETERS, FMIPlace, Forecast, ForecastArray, Value, WeatherData
+from fmi_weather_client.parsers import forecast as forecast_parser
 
 
 class ModelsTest(unittest.TestCase):
@@ -20,3 +27,93 @@ class ModelsTest(unittest.TestCase):
 
         subject = Value(value=None, unit="")
         self.assertEqual(f"{subject}", "-")
+
+    def test_weather_data_view(self):
+        forecast = ForecastArray("Helsinki", 60.1, 24.9, array('q', [1663579200, 1663582800]),
+                                 {'Temperature': array('d', [12.3, 11.0]), 'Humidity': array('d', [80.0, float('nan')])})
+        view = forecast[-1]
+        self.assertFalse(hasattr(view, '__dict__'))
+        self.assertEqual(view.time, datetime(2022, 9, 19, 10, 20, tzinfo=timezone.utc))
+        self.assertEqual(view.temperature, Value(11.0, '°C'))
+        self.assertEqual(view.wind_max, Value(None, 'm/s'))
+        self.assertIs(view.temperature.unit, forecast[0].dew_point.unit)
+
+        weather_data = view.to_weather_data()
+        self.assertIsInstance(weather_data, WeatherData)
+        for field in FIELD_PARAMETERS:
+            self.assertEqual(getattr(view, field).unit, getattr(weather_data, field).unit)
+
+        with self.assertRaises(IndexError):
+            forecast[2]
+
+    def test_forecast_bytes_round_trip(self):
+        forecast = forecast_parser.parse_forecast(test_data.read_file('valid_coordinate_forecast_response.xml'))
+        data = forecast.to_bytes()
+        self.assertLess(len(data), len(pickle.dumps(forecast)) / 2)
+
+        # Values are compared as text, as NaN is not equal to itself
+        self.assertEqual(repr(Forecast.from_bytes(data)), repr(forecast))
+        self.assertEqual(repr(Forecast.from_bytes(memoryview(data))), repr(forecast))
+
+    def test_forecast_bytes_missing_values(self):
+        time = datetime(2022, 9, 19, 10, tzinfo=timezone.utc)
+        rows = [WeatherData(time, *[Value(None, unit) for _, unit in FIELD_PARAMETERS.values()]),
+                WeatherData(time, *[Value(1.5, unit) for _, unit in FIELD_PARAMETERS.values()])]
+        rows[1] = rows[1]._replace(pressure=Value(None, 'hPa'), humidity=Value(None, '%'))
+        forecast = Forecast("Helsinki", 60.1, 24.9, rows)
+
+        self.assertEqual(Forecast.from_bytes(forecast.to_bytes()), forecast)
+        self.assertEqual(Forecast.from_bytes(Forecast("", 0.0, 0.0, []).to_bytes()), Forecast("", 0.0, 0.0, []))
+
+        with self.assertRaises(ValueError):
+            Forecast("Helsinki", 60.1, 24.9, [rows[1]._replace(temperature=Value(1.5, 'K'))]).to_bytes()
+
+    def test_forecast_array_bytes_round_trip(self):
+        forecast = forecast_parser.parse_forecast_array(test_data.read_file('valid_coordinate_forecast_response.xml'))
+        data = bytearray(forecast.to_bytes())
+        loaded = ForecastArray.from_bytes(data)
+
+        self.assertEqual((loaded.place, loaded.lat, loaded.lon), (forecast.place, forecast.lat, forecast.lon))
+        self.assertEqual(list(loaded.times), list(forecast.times))
+        self.assertEqual(loaded.columns.keys(), forecast.columns.keys())
+        for parameter, column in forecast.columns.items():
+            self.assertEqual([value for value in loaded.columns[parameter] if not math.isnan(value)],
+                             [value for value in column if not math.isnan(value)])
+        self.assertEqual(repr(loaded.to_forecast()), repr(forecast.to_forecast()))
+
+        # Loaded columns are views of the data
+        self.assertIsInstance(loaded.columns['Temperature'], memoryview)
+        self.assertEqual(Forecast.from_bytes(loaded.to_bytes()).place, forecast.place)
+
+    def test_bytes_without_place_name(self):
+        forecast = forecast_parser.parse_forecast(test_data.read_file('valid_coordinate_forecast_response.xml'))
+        forecast = forecast._replace(place=None)
+        self.assertEqual(repr(Forecast.from_bytes(forecast.to_bytes())), repr(forecast))
+        # Empty name is kept apart from a missing one
+        self.assertEqual(Forecast.from_bytes(forecast._replace(place='').to_bytes()).place, '')
+
+        forecast_array = ForecastArray(None, 60.1, 24.9, array('q', [1663579200]), {'Temperature': array('d', [12.3])})
+        loaded = ForecastArray.from_bytes(forecast_array.to_bytes())
+        self.assertIsNone(loaded.place)
+        self.assertEqual(loaded[0].temperature.value, 12.3)
+
+    def test_forecast_array_float32(self):
+        forecast = ForecastArray("Helsinki", 60.1, 24.9, array('q', [1663579200, 1663582800]),
+                                 {'Temperature': array('d', [12.3, 11.0])})
+        data = forecast.to_bytes(float32=True)
+        self.assertLess(len(data), len(forecast.to_bytes()))
+
+        loaded = ForecastArray.from_bytes(data)
+        self.assertAlmostEqual(loaded.columns['Temperature'][0], 12.3, places=5)
+        self.assertEqual(loaded.columns['Temperature'][1], 11.0)
+
+    def test_invalid_bytes(self):
+        data = Forecast("Helsinki", 60.1, 24.9, []).to_bytes()
+        for invalid in (b'', b'JSON' + data[4:], data[:-1], data[:20]):
+            with self.subTest(invalid=invalid), self.assertRaises(ValueError):
+                Forecast.from_bytes(invalid)
+
+        data = ForecastArray("Helsinki", 60.1, 24.9, array('q', [1663579200]),
+                             {'Temperature': array('d', [12.3])}).to_bytes()
+        with self.assertRaises(ValueError):
+            ForecastArray.from_bytes(data[:-1])
@@ -1,6 +1,14 @@
+import math
+import pickle
 import unittest
+from array import array
+
+import test.test_data as test_data
+from fmi_weather_client.parsers.forecast import parse_forecast, parse_forecasts, parse_forecast_xmltodict
+from fmi_weather_client.parsers.forecast import parse_forecast_array, parse_forecast_arrays
 from fmi_weather_client.parsers.forecast import _float_or_none
-from fmi_weather_client.parsers.forecast import _feels_like
+from fmi_weather_client.parsers.forecast import _feels_like, _feels_like_series
+from fmi_weather_client.parsers.forecast import _empty_rows, _point_ranges
 
 
 class ForecastParserTest(unittest.TestCase):
@@ -37,3 +45,131 @@ class ForecastParserTest(unittest.TestCase):
         self.assertAlmostEqual(
             _feels_like({"WindSpeedMS": 5, "Humidity": 50, "Temperature": 25, "RadiationGlobal": 425}),
             24.523, places=3)
+
+    def test_feels_like_series_matches_scalar(self):
+        temperatures = [-20.0, 0.0, 14.5, 14.6, 25.0, 32.0, float('nan')]
+        wind_speeds = [-1.5, 0.0, 5.0, 12.0, float('nan')]
+        humidities = [10.0, 50.0, 90.0]
+        rows = [(temp, speed, humid, rad)
+                for temp in temperatures for speed in wind_speeds for humid in humidities for rad in (0.0, 425.0)]
+        columns = list(zip(*rows))
+
+        for with_radiation in (False, True):
+            names = ['Temperature', 'WindSpeedMS', 'Humidity', 'RadiationGlobal'][:4 if with_radiation else 3]
+            series = _feels_like_series(*columns[:3], columns[3] if with_radiation else None)
+            for row, actual in zip(rows, series):
+                expected = _feels_like(dict(zip(names, row)))
+                if math.isnan(expected):
+                    self.assertTrue(math.isnan(actual))
+                else:
+                    self.assertAlmostEqual(actual, expected, places=12)
+
+    def test_feels_like_series_partial_data(self):
+        self.assertIsNone(_feels_like_series(None, [1.0], [50.0], None))
+        self.assertEqual(_feels_like_series([10.0], None, [50.0], None), [10.0])
+        self.assertEqual(_feels_like_series([10.0], [5.0], None, None), [10.0])
+
+    def test_parse_forecast_matches_xmltodict(self):
+        for filename in test_data.FORECAST_FILES:
+            with self.subTest(filename=filename):
+                body = test_data.read_file(filename)
+                self.assert_forecast_equal(parse_forecast(body), parse_forecast_xmltodict(body))
+
+    def test_parse_forecasts_splits_points(self):
+        forecasts = parse_forecasts(test_data.read_file('valid_multi_forecast_response.xml'))
+        single = parse_forecast(test_data.read_file('valid_place_forecast_response.xml'))
+        self.assertEqual([forecast.place for forecast in forecasts], ['Iisalmi', 'Kuopio'])
+        self.assert_forecast_equal(forecasts[0], single)
+        self.assertEqual([data.time for data in forecasts[1].forecasts], [data.time for data in single.forecasts])
+
+    def test_parse_forecasts_multiple_members(self):
+        body = test_data.read_file('valid_coordinate_forecast_response.xml')
+        start = body.index('<wfs:member>')
+        end = body.index('</wfs:member>') + len('</wfs:member>')
+        body = body[:end] + body[start:end] + body[end:]
+        forecasts = parse_forecasts(body)
+        self.assertEqual(len(forecasts), 2)
+        self.assert_forecast_equal(forecasts[0], forecasts[1])
+
+    def test_parse_forecast_array_matches_forecast(self):
+        for filename in test_data.FORECAST_FILES:
+            with self.subTest(filename=filename):
+                body = test_data.read_file(filename)
+                forecast_array = parse_forecast_array(body)
+                self.assertEqual(forecast_array.times.typecode, 'q')
+                self.assertTrue(all(column.typecode == 'd' for column in forecast_array.columns.values()))
+                self.assert_forecast_equal(forecast_array.to_forecast(), parse_forecast(body))
+
+    def test_parse_forecast_arrays(self):
+        body = test_data.read_file('valid_multi_forecast_response.xml')
+        forecast_arrays = parse_forecast_arrays(body)
+        self.assertEqual(len(forecast_arrays), 2)
+        for forecast_array, forecast in zip(forecast_arrays, parse_forecasts(body)):
+            self.assertEqual(len(forecast_array), len(forecast.forecasts))
+            self.assertEqual(forecast_array[3].temperature, forecast.forecasts[3].temperature)
+            self.assert_forecast_equal(forecast_array.to_forecast(), forecast)
+
+    def test_point_ranges(self):
+        positions = '60.1 24.9 1 60.1 24.9 2 61.0 25.0 1 61.0 25.0 2 61.0 25.0 1 61.0 25.0 2'.split()
+        self.assertEqual(_point_ranges(positions, array('q', map(int, positions[2::3]))), [(0, 2), (2, 4), (4, 6)])
+
+    def test_parse_forecasts_points_sharing_coordinates(self):
+        body = test_data.read_file('valid_multi_forecast_response.xml')
+        forecasts = parse_forecasts(body.replace('62.89238 27.67703', '63.55915 27.19067'))
+        self.assertEqual([(forecast.place, len(forecast.forecasts)) for forecast in forecasts],
+                         [('Iisalmi', 12), ('Kuopio', 12)])
+        for forecast, expected in zip(forecasts, parse_forecasts(body)):
+            self.assertEqual([data.temperature for data in forecast.forecasts],
+                             [data.temperature for data in expected.forecasts])
+
+    def test_empty_rows(self):
+        nan = float('nan')
+        self.assertIsNone(_empty_rows(array('d', [1.0, 2.0, 3.0, 4.0]), 2, 2))
+        self.assertIsNone(_empty_rows(array('d', [nan, 2.0, 3.0, nan]), 2, 2))
+        self.assertEqual(_empty_rows(array('d', [1.0, nan, nan, nan, nan, 2.0]), 2, 3), [False, True, False])
+
+    def test_parse_forecast_arrays_drops_empty_rows_of_each_point(self):
+        body = test_data.read_file('valid_multi_forecast_response.xml')
+        start = body.index('<gml:doubleOrNilReasonTupleList>') + len('<gml:doubleOrNilReasonTupleList>')
+        end = body.index('</gml:doubleOrNilReasonTupleList>')
+        rows = body[start:end].strip().split('\n')
+        rows[1] = ' '.join(['NaN'] * len(rows[1].split()))
+        rows[-1] = rows[1]
+        body = body[:start] + '\n'.join(rows) + body[end:]
+
+        forecast_arrays = parse_forecast_arrays(body)
+        for forecast_array, forecast in zip(forecast_arrays, parse_forecasts(body)):
+            self.assert_forecast_equal(forecast_array.to_forecast(), forecast)
+        self.assertEqual(sum(map(len, forecast_arrays)), len(rows) - 2)
+
+    def test_parse_forecast_array_pickle(self):
+        forecast_array = parse_forecast_array(test_data.read_file('valid_place_forecast_response.xml'))
+        restored = pickle.loads(pickle.dumps(forecast_array))
+        self.assertEqual(restored.times, forecast_array.times)
+        self.assertEqual(restored.columns['Temperature'], forecast_array.columns['Temperature'])
+
+    def test_parse_forecast_without_feels_like_parameters(self):
+        forecast_array = parse_forecast_array(test_data.read_file('valid_temperature_forecast_response.xml'))
+        self.assertEqual(list(forecast_array.columns), ['Temperature'])
+        self.assertIsNone(forecast_array[0].feels_like.value)
+
+    def test_parse_forecast_value_count_mismatch(self):
+        body = test_data.read_file('valid_place_forecast_response.xml').replace('90.2 0.5 \n', '90.2 \n', 1)
+        with self.assertRaises(ValueError):
+            parse_forecast(body)
+
+    def test_parse_forecast_without_member(self):
+        with self.assertRaises(ValueError):
+            parse_forecast('<wfs:FeatureCollection xmlns:wfs="http://www.opengis.net/wfs/2.0"/>')
+
+    def assert_forecast_equal(self, actual, expected):
+        self.assertEqual(actual[:3], expected[:3])
+        self.assertEqual(len(actual.forecasts), len(expected.forecasts))
+        for actual_data, expected_data in zip(actual.forecasts, expected.forecasts):
+            self.assertEqual(actual_data.time, expected_data.time)
+            for actual_value, expected_value in zip(actual_data[1:], expected_data[1:]):
+                self.assertEqual(actual_value.unit, expected_value.unit)
+                if expected_value.value is not None and math.isnan(expected_value.value):
+                    self.assertTrue(math.isnan(actual_value.value))
+                else:
+                    self.assertEqual(actual_value.value, expected_value.value)
@@ -0,0 +1,45 @@
+import math
+import unittest
+from datetime import datetime, timezone
+
+import test.test_data as test_data
+from fmi_weather_client.parsers.observation import parse_observations
+
+
+class ObservationParserTest(unittest.TestCase):
+
+    def test_parse_observations(self):
+        observations = parse_observations(test_data.read_file('valid_observation_response.xml'))
+        self.assertEqual(len(observations), 2)
+
+        kaisaniemi, kumpula = observations
+        self.assertEqual(kaisaniemi.station_id, 100971)
+        self.assertEqual(kaisaniemi.place, 'Helsinki Kaisaniemi')
+        self.assertEqual((kaisaniemi.lat, kaisaniemi.lon), (60.17523, 24.94459))
+        self.assertEqual(len(kaisaniemi.observations), 3)
+
+        latest = kaisaniemi.observations[-1]
+        self.assertEqual(latest.time, datetime(2022, 9, 19, 12, 20, tzinfo=timezone.utc))
+        self.assertEqual(latest.temperature.value, 12.7)
+        self.assertEqual(latest.temperature.unit, '°C')
+        self.assertEqual(latest.dew_point.value, 7.0)
+        self.assertEqual(latest.pressure.value, 1013.1)
+        self.assertEqual(latest.humidity.value, 68.0)
+        self.assertEqual(latest.wind_direction.value, 252.0)
+        self.assertEqual(latest.wind_speed.value, 4.2)
+        self.assertEqual(latest.wind_gust.value, 7.1)
+        self.assertEqual(latest.precipitation_amount.value, 0.0)
+        self.assertIsNone(latest.symbol.value)
+        self.assertIsNotNone(latest.feels_like.value)
+        self.assertTrue(math.isnan(kaisaniemi.observations[0].precipitation_amount.value))
+
+        self.assertEqual(kumpula.station_id, 101004)
+        self.assertEqual(kumpula.place, 'Helsinki Kumpula')
+        # Row without any observed value is skipped
+        self.assertEqual([data.temperature.value for data in kumpula.observations], [12.0, 12.3])
+
+    def test_station_id_from_point_id(self):
+        body = test_data.read_file('valid_observation_response.xml')
+        body = body.replace('<target:representativePoint xlink:href="#point-100971"/>', '')
+        observations = parse_observations(body)
+        self.assertEqual([observation.station_id for observation in observations], [100971, 101004])
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import asyncio
+
+import fmi_weather_client
+import fmi_weather_client.http as http
+import test.test_data as test_data
+from fmi_weather_client.models import FMIPlace
+from fmi_weather_client.places import PlaceCache, normalize_name
+
+
+class PlaceCacheTest(unittest.TestCase):
+
+    def test_normalize_name(self):
+        self.assertEqual(normalize_name(' Kaisaniemi, Helsinki '), 'kaisaniemi,helsinki')
+        self.assertEqual(normalize_name('KAISANIEMI,helsinki'), 'kaisaniemi,helsinki')
+
+    def test_get_normalized_name(self):
+        cache = PlaceCache()
+        cache.set('Iisalmi', FMIPlace('Iisalmi', 63.55915, 27.19067))
+        self.assertEqual(cache.get(' iisalmi'), FMIPlace('Iisalmi', 63.55915, 27.19067))
+        self.assertIsNone(cache.get('Kuopio'))
+        self.assertEqual(len(cache), 1)
+
+    def test_persisted_places(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'places.json')
+            PlaceCache(path).set('Iisalmi', FMIPlace('Iisalmi', 63.55915, 27.19067))
+
+            cache = PlaceCache(path)
+            self.assertEqual(cache.get('Iisalmi'), FMIPlace('Iisalmi', 63.55915, 27.19067))
+            self.assertEqual(os.listdir(directory), ['places.json'])
+
+            cache.clear()
+            self.assertEqual(len(cache), 0)
+            self.assertFalse(os.path.exists(path))
+
+    def test_update_writes_file_once(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'places.json')
+            cache = PlaceCache(path)
+            places = {f'Place {index}': FMIPlace(f'Place {index}', 60.0 + index, 25.0) for index in range(10)}
+            with mock.patch('fmi_weather_client.places._save') as save:
+                cache.update(places)
+                cache.update({'place 1': FMIPlace('Place 1', 61.0, 25.0)})
+            save.assert_called_once()
+
+            cache.update({'Place 10': FMIPlace('Place 10', 70.0, 25.0)})
+            self.assertEqual(len(PlaceCache(path)), 11)
+
+
+class PlaceResolutionTest(unittest.TestCase):
+
+    def setUp(self):
+        http.set_place_cache(PlaceCache())
+
+    def tearDown(self):
+        http.set_place_cache(None)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_place_forecast_response)
+    def test_known_place_is_requested_by_coordinates(self, mock_get):
+        fmi_weather_client.forecast_by_place_name('Iisalmi')
+        self.assertEqual(mock_get.call_args.kwargs['params']['place'], 'Iisalmi')
+        self.assertEqual(http.get_place_cache().get('Iisalmi').name, 'Iisalmi')
+
+        forecast = fmi_weather_client.forecast_by_place_name('IISALMI')
+        params = mock_get.call_args.kwargs['params']
+        self.assertNotIn('place', params)
+        self.assertEqual(params['latlon'], '63.55915,27.19067')
+        self.assertEqual(forecast.place, 'Iisalmi')
+        self.assertEqual((forecast.lat, forecast.lon), (63.55915, 27.19067))
+
+    @mock.patch('aiohttp.ClientSession.get', side_effect=test_data.async_mock(test_data.mock_place_forecast_response))
+    def test_async_known_place_is_requested_by_coordinates(self, mock_get):
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(fmi_weather_client.async_weather_by_place_name('Iisalmi'))
+        weather = loop.run_until_complete(fmi_weather_client.async_weather_by_place_name('Iisalmi'))
+        self.assertIn(('latlon', '63.55915,27.19067'), mock_get.call_args.kwargs['params'])
+        self.assertEqual(weather.place, 'Iisalmi')
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_multi_forecast_response)
+    def test_known_places_in_batch(self, mock_get):
+        with mock.patch.object(PlaceCache, 'update', wraps=http.get_place_cache().update) as update:
+            forecasts = fmi_weather_client.forecasts_by_place_names(['Iisalmi', 'Kuopio'])
+        update.assert_called_once()
+        self.assertEqual(len(http.get_place_cache()), 2)
+
+        fmi_weather_client.forecasts_by_place_names(['Iisalmi', 'Kuopio'])
+        params = mock_get.call_args.kwargs['params']
+        self.assertNotIn('place', params)
+        self.assertEqual(params['latlon'], [f'{forecast.lat},{forecast.lon}' for forecast in forecasts])
+
+    def test_known_places_in_batch_with_missing_forecasts(self):
+        with mock.patch('requests.Session.get', side_effect=test_data.mock_place_forecast_response):
+            fmi_weather_client.forecast_by_place_name('Iisalmi')
+
+        # Response to the request by name has two places for one name
+        responses = [test_data.mock_multi_forecast_response(), test_data.mock_place_forecast_response()]
+        with mock.patch('requests.Session.get', side_effect=responses), self.assertRaises(ValueError):
+            fmi_weather_client.forecasts_by_place_names(['Kuopio', 'Iisalmi'])
+        self.assertIsNone(http.get_place_cache().get('Kuopio'))
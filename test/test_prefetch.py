@@ -0,0 +1,112 @@
+import random
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import fmi_weather_client
+import fmi_weather_client.http as http
+import test.test_data as test_data
+from fmi_weather_client.cache import ModelRunExpiry, ResponseCache
+from fmi_weather_client.places import PlaceCache
+from fmi_weather_client.prefetch import Prefetch, PrefetchScheduler
+
+NOW = datetime(2022, 9, 19, 12, 30, tzinfo=timezone.utc)
+
+
+class PrefetchSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        http.set_cache(ResponseCache())
+
+    def tearDown(self):
+        http.set_cache(None)
+
+    def test_add_and_remove(self):
+        scheduler = PrefetchScheduler()
+        prefetch = scheduler.add([63.55915, 27.19067], 1, ['temperature'])
+        self.assertEqual(prefetch, Prefetch((63.55915, 27.19067), 1, ('temperature',)))
+        self.assertEqual(scheduler.add((63.55915, 27.19067), 1, iter(['temperature'])), prefetch)
+        scheduler.add('Iisalmi')
+        self.assertEqual(len(scheduler.prefetches), 2)
+
+        scheduler.remove(prefetch)
+        self.assertEqual(scheduler.prefetches, [Prefetch('Iisalmi')])
+
+    def test_next_refresh(self):
+        scheduler = PrefetchScheduler(ModelRunExpiry(timedelta(hours=3), timedelta(hours=2)))
+        self.assertEqual(scheduler.next_refresh(NOW), datetime(2022, 9, 19, 13, tzinfo=timezone.utc))
+
+        http.set_cache(ResponseCache(time_buckets={http.RequestType.FORECAST: timedelta(hours=6)}))
+        self.assertEqual(scheduler.next_refresh(NOW), datetime(2022, 9, 19, 14, tzinfo=timezone.utc))
+
+    def test_plan_is_spread_over_jitter(self):
+        scheduler = PrefetchScheduler(jitter=timedelta(minutes=10), rng=random.Random(1))
+        for index in range(20):
+            scheduler.add((60.0 + index, 25.0))
+
+        times = [time for time, _ in scheduler.plan(NOW)]
+        self.assertEqual(len(times), 20)
+        self.assertEqual(times, sorted(times))
+        self.assertTrue(all(NOW <= time < NOW + timedelta(minutes=10) for time in times))
+        self.assertGreater(times[-1] - times[0], timedelta(minutes=5))
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_coordinate_forecast_response)
+    def test_refreshed_forecast_is_cache_hit(self, mock_get):
+        scheduler = PrefetchScheduler()
+        self.assertTrue(scheduler.refresh(scheduler.add((27.0, 62.0), 1)))
+
+        fmi_weather_client.forecast_by_coordinates(27.0, 62.0, 1)
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(http.get_cache().stats.hits, 1)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_place_forecast_response)
+    def test_refresh_does_not_parse(self, mock_get):
+        scheduler = PrefetchScheduler()
+        with mock.patch('fmi_weather_client.parsers.stream.iter_members') as iter_members:
+            self.assertTrue(scheduler.refresh(scheduler.add('Iisalmi', 1)))
+            self.assertTrue(scheduler.refresh(scheduler.add((27.0, 62.0), 1)))
+        iter_members.assert_not_called()
+        self.assertEqual(mock_get.call_count, 2)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_place_forecast_response)
+    def test_known_place_is_refreshed_by_coordinates(self, mock_get):
+        http.set_place_cache(PlaceCache())
+        try:
+            fmi_weather_client.forecast_by_place_name('Iisalmi', 1)
+            http.get_cache().clear()
+            scheduler = PrefetchScheduler()
+            self.assertTrue(scheduler.refresh(scheduler.add(' iisalmi', 1)))
+            self.assertEqual(mock_get.call_args.kwargs['params']['latlon'], '63.55915,27.19067')
+
+            fmi_weather_client.forecast_by_place_name('Iisalmi', 1)
+            self.assertEqual(mock_get.call_count, 2)
+        finally:
+            http.set_place_cache(None)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_server_error_response)
+    def test_failed_refresh_is_logged(self, mock_get):
+        scheduler = PrefetchScheduler()
+        with self.assertLogs('fmi_weather_client.prefetch', 'WARNING'):
+            self.assertFalse(scheduler.refresh(scheduler.add('Iisalmi')))
+
+    def test_background_refresh(self):
+        scheduler = PrefetchScheduler(jitter=timedelta(0))
+        scheduler.add('Iisalmi', 1)
+        scheduler.add((27.0, 62.0), 1)
+        calls = []
+        refreshed = threading.Event()
+
+        def refresh(prefetch):
+            calls.append(prefetch)
+            if len(calls) == 2:
+                refreshed.set()
+
+        with mock.patch.object(scheduler, 'refresh', side_effect=refresh), scheduler:
+            self.assertTrue(refreshed.wait(5))
+        self.assertEqual(set(calls), set(scheduler.prefetches))
+
+    def test_start_requires_cache(self):
+        http.set_cache(None)
+        with self.assertRaises(ValueError):
+            PrefetchScheduler().start()
@@ -0,0 +1,122 @@
+import threading
+import time
+import unittest
+
+import asyncio
+
+from fmi_weather_client import retry
+from fmi_weather_client.errors import ClientError, ServerError
+from fmi_weather_client.retry import Hedging, RetryPolicy
+
+
+class Attempts:
+    """Function failing with the given errors before returning a result"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return 'body'
+
+
+class RetryTest(unittest.TestCase):
+
+    def test_delay_is_jittered_exponential_backoff(self):
+        policy = RetryPolicy(backoff=1, max_backoff=4)
+        for retry_number, limit in [(1, 1), (2, 2), (3, 4), (10, 4)]:
+            delays = [policy.delay(retry_number) for _ in range(50)]
+            self.assertTrue(all(0 <= delay <= limit for delay in delays))
+
+    def test_retry_server_error(self):
+        function = Attempts(ServerError(503, ''), ServerError(500, ''))
+        self.assertEqual(retry.call(function, RetryPolicy(attempts=3, backoff=0.001)), 'body')
+        self.assertEqual(function.calls, 3)
+
+    def test_retry_attempts_exhausted(self):
+        function = Attempts(ServerError(503, ''), ServerError(500, ''))
+        with self.assertRaises(ServerError):
+            retry.call(function, RetryPolicy(attempts=2, backoff=0.001))
+        self.assertEqual(function.calls, 2)
+
+    def test_client_error_is_not_retried(self):
+        function = Attempts(ClientError(400, 'Invalid'))
+        with self.assertRaises(ClientError):
+            retry.call(function, RetryPolicy(attempts=3, backoff=0.001))
+        self.assertEqual(function.calls, 1)
+
+    def test_retry_deadline(self):
+        function = Attempts(ServerError(503, ''))
+        with self.assertRaises(ServerError):
+            retry.call(function, RetryPolicy(attempts=3, backoff=10, max_backoff=10, deadline=0))
+        self.assertEqual(function.calls, 1)
+
+    def test_async_retry(self):
+        function = Attempts(ConnectionError(), ServerError(500, ''))
+
+        async def attempt():
+            return function()
+
+        result = asyncio.get_event_loop().run_until_complete(
+            retry.call_async(attempt, RetryPolicy(attempts=3, backoff=0.001)))
+        self.assertEqual(result, 'body')
+        self.assertEqual(function.calls, 3)
+
+    def test_hedging_delay_percentile(self):
+        hedging = Hedging(percentile=90, initial_delay=2.0, min_samples=10)
+        self.assertEqual(hedging.delay(), 2.0)
+        for latency in range(1, 11):
+            hedging.record(latency / 10)
+        self.assertEqual(hedging.delay(), 0.9)
+
+    def test_hedged_request_answers_first(self):
+        lock = threading.Lock()
+        calls = []
+
+        def function():
+            with lock:
+                calls.append(1)
+                first = len(calls) == 1
+            if first:
+                time.sleep(0.5)
+                return 'slow'
+            return 'fast'
+
+        started = time.monotonic()
+        result = retry.call(function, RetryPolicy(hedging=Hedging(initial_delay=0.01)))
+        self.assertEqual(result, 'fast')
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual(len(calls), 2)
+
+    def test_hedged_request_not_sent_for_fast_response(self):
+        function = Attempts()
+        self.assertEqual(retry.call(function, RetryPolicy(hedging=Hedging(initial_delay=1))), 'body')
+        self.assertEqual(function.calls, 1)
+
+    def test_async_hedged_request_answers_first(self):
+        calls = []
+
+        async def function():
+            calls.append(1)
+            if len(calls) == 1:
+                await asyncio.sleep(0.5)
+                return 'slow'
+            return 'fast'
+
+        started = time.monotonic()
+        result = asyncio.get_event_loop().run_until_complete(
+            retry.call_async(function, RetryPolicy(hedging=Hedging(initial_delay=0.01))))
+        self.assertEqual(result, 'fast')
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual(len(calls), 2)
+
+    def test_hedged_request_deadline(self):
+        def function():
+            time.sleep(0.2)
+            return 'slow'
+
+        with self.assertRaises(TimeoutError):
+            retry.call(function, RetryPolicy(attempts=1, deadline=0.05, hedging=Hedging(initial_delay=0.01)))
@@ -0,0 +1,110 @@
+import threading
+import unittest
+
+import asyncio
+
+from fmi_weather_client.singleflight import AsyncSingleFlight, SingleFlight, call_key
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def test_concurrent_calls_share_result(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def function():
+            calls.append(1)
+            release.wait()
+            return object()
+
+        threads = [threading.Thread(target=lambda: results.append(flight.do('key', function))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        while len(calls) == 0:
+            release.wait(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(len(flight), 0)
+
+    def test_sequential_calls_are_not_shared(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do('key', lambda: 1), 1)
+        self.assertEqual(flight.do('key', lambda: 2), 2)
+
+    def test_error_is_raised(self):
+        flight = SingleFlight()
+        with self.assertRaises(ValueError):
+            flight.do('key', lambda: int('x'))
+        self.assertEqual(len(flight), 0)
+
+    def test_async_concurrent_calls_share_result(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def function():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return object()
+
+        async def run():
+            return await asyncio.gather(*[flight.do('key', function) for _ in range(5)],
+                                        flight.do('other', function))
+
+        results = asyncio.get_event_loop().run_until_complete(run())
+        self.assertEqual(len(calls), 2)
+        self.assertTrue(all(result is results[0] for result in results[:5]))
+        self.assertIsNot(results[5], results[0])
+        self.assertEqual(len(flight), 0)
+
+    def test_async_cancelled_caller_does_not_cancel_others(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def function():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return 'body'
+
+        async def run():
+            first = asyncio.ensure_future(flight.do('key', function))
+            second = asyncio.ensure_future(flight.do('key', function))
+            await asyncio.sleep(0)
+            first.cancel()
+            result = await second
+            with self.assertRaises(asyncio.CancelledError):
+                await first
+            return result
+
+        self.assertEqual(asyncio.get_event_loop().run_until_complete(run()), 'body')
+        self.assertEqual(len(calls), 1)
+
+    def test_async_call_finishes_when_every_caller_is_cancelled(self):
+        flight = AsyncSingleFlight()
+        finished = []
+
+        async def function():
+            await asyncio.sleep(0.01)
+            finished.append(1)
+            return 'body'
+
+        async def run():
+            caller = asyncio.ensure_future(flight.do('key', function))
+            await asyncio.sleep(0)
+            caller.cancel()
+            # A caller arriving while the call is still running shares it
+            late = await flight.do('key', function)
+            return caller.cancelled(), late
+
+        self.assertEqual(asyncio.get_event_loop().run_until_complete(run()), (True, 'body'))
+        self.assertEqual(finished, [1])
+
+    def test_call_key(self):
+        self.assertEqual(call_key('a', {'b': [1, 2], 'a': 1}), call_key('a', {'a': 1, 'b': (1, 2)}))
+        hash(call_key({'place': ['Oulu']}))
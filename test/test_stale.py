@@ -0,0 +1,165 @@
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import asyncio
+
+import fmi_weather_client
+import fmi_weather_client.http as http
+import test.test_data as test_data
+from fmi_weather_client.errors import ServerError
+from fmi_weather_client.stale import StaleWhileRevalidate
+
+
+class Clock:
+    """Clock that moves only when told to"""
+
+    def __init__(self):
+        self.now = datetime(2022, 9, 19, 12, tzinfo=timezone.utc)
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, **kwargs):
+        self.now += timedelta(**kwargs)
+
+
+def wait_for_refreshes(store: StaleWhileRevalidate):
+    """Wait until background refreshes of a store have finished"""
+    if store._executor is not None:  # pylint: disable=protected-access
+        store._executor.shutdown(wait=True)  # pylint: disable=protected-access
+        store._executor = None  # pylint: disable=protected-access
+
+
+class StaleWhileRevalidateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.store = StaleWhileRevalidate(timedelta(minutes=5), timedelta(hours=1), clock=self.clock)
+
+    def test_fresh_result_is_not_refreshed(self):
+        fetch = mock.Mock(side_effect=['first', 'second'])
+        self.assertEqual(self.store.get('key', fetch), 'first')
+        self.clock.advance(minutes=5)
+        self.assertEqual(self.store.get('key', fetch), 'first')
+        wait_for_refreshes(self.store)
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_stale_result_is_served_and_refreshed(self):
+        fetch = mock.Mock(side_effect=['first', 'second'])
+        self.store.get('key', fetch)
+        self.clock.advance(minutes=6)
+
+        self.assertEqual(self.store.get('key', fetch), 'first')
+        wait_for_refreshes(self.store)
+        self.assertEqual(self.store.get('key', fetch), 'second')
+        self.assertEqual(fetch.call_count, 2)
+
+    def test_stale_result_is_served_when_refresh_fails(self):
+        fetch = mock.Mock(side_effect=['first', ServerError(500, "Failed")])
+        self.store.get('key', fetch)
+        self.clock.advance(minutes=30)
+
+        with self.assertLogs('fmi_weather_client.stale', 'WARNING'):
+            self.assertEqual(self.store.get('key', fetch), 'first')
+            wait_for_refreshes(self.store)
+        self.assertEqual(self.store.get('key', mock.Mock(return_value='second')), 'first')
+
+    def test_result_older_than_max_staleness_is_fetched(self):
+        self.store.get('key', lambda: 'first')
+        self.clock.advance(hours=1, seconds=1)
+        self.assertEqual(self.store.get('key', lambda: 'second'), 'second')
+
+        self.clock.advance(hours=2)
+        with self.assertRaises(ServerError):
+            self.store.get('key', mock.Mock(side_effect=ServerError(500, "Failed")))
+
+    def test_single_refresh_at_a_time(self):
+        release = threading.Event()
+
+        def slow_fetch():
+            release.wait(5)
+            return 'second'
+
+        fetch = mock.Mock(side_effect=slow_fetch)
+        self.store.get('key', lambda: 'first')
+        self.clock.advance(minutes=6)
+        for _ in range(3):
+            self.assertEqual(self.store.get('key', fetch), 'first')
+        release.set()
+        wait_for_refreshes(self.store)
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_least_recently_used_is_removed(self):
+        store = StaleWhileRevalidate(max_size=2, clock=self.clock)
+        store.get('a', lambda: 1)
+        store.get('b', lambda: 2)
+        store.get('a', lambda: 3)
+        store.get('c', lambda: 4)
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.get('b', lambda: 5), 5)
+
+    def test_invalid_max_staleness(self):
+        with self.assertRaises(ValueError):
+            StaleWhileRevalidate(timedelta(hours=1), timedelta(minutes=5))
+
+    def test_async_stale_result_is_served_and_refreshed(self):
+        results = iter(['first', 'second'])
+
+        async def fetch():
+            return next(results)
+
+        async def run():
+            first = await self.store.get_async('key', fetch)
+            self.clock.advance(minutes=6)
+            stale = await self.store.get_async('key', fetch)
+            await asyncio.gather(*self.store._tasks)  # pylint: disable=protected-access
+            return first, stale, await self.store.get_async('key', fetch)
+
+        self.assertEqual(asyncio.get_event_loop().run_until_complete(run()), ('first', 'first', 'second'))
+
+
+class StaleWeatherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.store = StaleWhileRevalidate(clock=self.clock)
+        http.set_stale_while_revalidate(self.store)
+
+    def tearDown(self):
+        http.set_stale_while_revalidate(None)
+        wait_for_refreshes(self.store)
+
+    def test_weather_served_when_fmi_fails(self):
+        with mock.patch('requests.Session.get', side_effect=test_data.mock_coordinate_forecast_response):
+            weather = fmi_weather_client.weather_by_coordinates(27.0, 62.0)
+
+        self.clock.advance(minutes=10)
+        with mock.patch('requests.Session.get', side_effect=test_data.mock_server_error_response) as mock_get, \
+                self.assertLogs('fmi_weather_client.stale', 'WARNING'):
+            self.assertEqual(fmi_weather_client.weather_by_coordinates(27.0, 62.0), weather)
+            wait_for_refreshes(self.store)
+        mock_get.assert_called()
+
+        self.clock.advance(hours=1)
+        with mock.patch('requests.Session.get', side_effect=test_data.mock_server_error_response), \
+                self.assertRaises(ServerError):
+            fmi_weather_client.weather_by_coordinates(27.0, 62.0)
+
+    @mock.patch('requests.Session.get', side_effect=test_data.mock_place_forecast_response)
+    def test_place_names_share_stored_weather(self, mock_get):
+        weather = fmi_weather_client.weather_by_place_name('Iisalmi', iter(['temperature']))
+        self.assertEqual(fmi_weather_client.weather_by_place_name(' iisalmi', ['temperature']), weather)
+        self.assertEqual(mock_get.call_count, 1)
+
+    @mock.patch('aiohttp.ClientSession.get',
+                side_effect=test_data.async_mock(test_data.mock_coordinate_forecast_response))
+    def test_async_weather_is_stored(self, mock_get):
+        async def run():
+            first = await fmi_weather_client.async_weather_by_coordinates(27.0, 62.0)
+            return first, await fmi_weather_client.async_weather_by_coordinates(27.0, 62.0)
+
+        first, second = asyncio.get_event_loop().run_until_complete(run())
+        self.assertEqual(first, second)
+        self.assertEqual(mock_get.call_count, 1)
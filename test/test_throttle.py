@@ -0,0 +1,125 @@
+import threading
+import unittest
+
+import asyncio
+
+from fmi_weather_client.throttle import AdaptiveConcurrency, Throttle, TokenBucket
+
+
+class MockClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ThrottleTest(unittest.TestCase):
+
+    def test_token_bucket_burst_and_rate(self):
+        clock = MockClock()
+        bucket = TokenBucket(rate=2, burst=3, clock=clock)
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0, 0, 0])
+        self.assertEqual(bucket.reserve(), 0.5)
+        self.assertEqual(bucket.reserve(), 1.0)
+
+        clock.now = 1.0
+        self.assertEqual(bucket.reserve(), 0.5)
+
+    def test_token_bucket_refill_is_limited_to_burst(self):
+        clock = MockClock()
+        bucket = TokenBucket(rate=10, burst=2, clock=clock)
+        clock.now = 100.0
+        self.assertEqual([bucket.reserve() for _ in range(3)], [0, 0, 0.1])
+
+    def test_token_bucket_drain(self):
+        bucket = TokenBucket(rate=4, burst=10, clock=MockClock())
+        bucket.drain()
+        self.assertEqual(bucket.reserve(), 0.25)
+
+    def test_token_bucket_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0)
+
+    def test_concurrency_additive_increase(self):
+        concurrency = AdaptiveConcurrency(initial=2, maximum=3)
+        for _ in range(3):
+            concurrency.acquire()
+            concurrency.release(False)
+        self.assertEqual(concurrency.limit, 3)
+        for _ in range(10):
+            concurrency.acquire()
+            concurrency.release(False)
+        self.assertEqual(concurrency.limit, 3)
+
+    def test_concurrency_multiplicative_decrease(self):
+        concurrency = AdaptiveConcurrency(initial=8, minimum=3)
+        concurrency.acquire()
+        concurrency.release(True)
+        self.assertEqual(concurrency.limit, 4)
+        concurrency.acquire()
+        concurrency.release(True)
+        self.assertEqual(concurrency.limit, 3)
+
+    def test_concurrency_unknown_outcome_keeps_limit(self):
+        concurrency = AdaptiveConcurrency(initial=2)
+        concurrency.acquire()
+        concurrency.release(None)
+        self.assertEqual(concurrency.limit, 2)
+        self.assertEqual(concurrency.in_flight, 0)
+
+    def test_concurrency_blocks_threads_over_limit(self):
+        concurrency = AdaptiveConcurrency(initial=1)
+        concurrency.acquire()
+        acquired = threading.Event()
+
+        def acquire():
+            concurrency.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        self.assertFalse(acquired.wait(0.05))
+        concurrency.release(None)
+        self.assertTrue(acquired.wait(1))
+        thread.join()
+        self.assertEqual(concurrency.in_flight, 1)
+
+    def test_concurrency_blocks_coroutines_over_limit(self):
+        concurrency = AdaptiveConcurrency(initial=1)
+        order = []
+
+        async def request(name):
+            await concurrency.acquire_async()
+            order.append(name)
+            await asyncio.sleep(0.01)
+            order.append(name)
+            concurrency.release(False)
+
+        async def run():
+            await asyncio.gather(request('a'), request('b'))
+
+        asyncio.get_event_loop().run_until_complete(run())
+        self.assertEqual(order, ['a', 'a', 'b', 'b'])
+
+    def test_throttle_backs_off_on_overload(self):
+        throttle = Throttle(rate=100, burst=5, concurrency=AdaptiveConcurrency(initial=4))
+        throttle.acquire()
+        throttle.release(429)
+        self.assertEqual(throttle.concurrency.limit, 2)
+        self.assertGreater(throttle.bucket.reserve(), 0)
+
+    def test_throttle_ramps_up_on_success(self):
+        throttle = Throttle(rate=None, concurrency=AdaptiveConcurrency(initial=1))
+        throttle.acquire()
+        throttle.release(200)
+        self.assertEqual(throttle.concurrency.limit, 2)
+
+    def test_throttle_keeps_limit_on_other_errors(self):
+        throttle = Throttle(rate=None, concurrency=AdaptiveConcurrency(initial=2))
+        for status_code in (500, 502, 504, 400, 404, None):
+            throttle.acquire()
+            throttle.release(status_code)
+        self.assertEqual(throttle.concurrency.limit, 2)
+        self.assertEqual(throttle.concurrency.in_flight, 0)